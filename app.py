@@ -1,49 +1,78 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, Response, stream_with_context, abort, send_file
 import os
-import requests
-import secrets
+import json
+import itertools
+import click
 from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.http import parse_range_header
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 import re
+import database
 
 # Flask app setup
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "0x7338410F9c4335422e63ace32b4f7C7abb5C7C8A")  # More secure session key
 
-# Get database URL from environment variables
-db_url = os.getenv("DATABASE_URL")
-
-# Fix 'postgres://' to 'postgresql://' (required for SQLAlchemy)
-if db_url and db_url.startswith("postgres://"):
-    db_url = db_url.replace("postgres://", "postgresql://", 1)
-
-app.config["SQLALCHEMY_DATABASE_URI"] = db_url  
+# Get database URL from environment variables; pool settings and the optional read replica are in database.py
+db_url = database.database_url(os.getenv("DATABASE_URL"))
+database.configure(app, db_url, database.database_url(os.getenv("DATABASE_REPLICA_URL")))
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 # Initialize database and migration
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={"class_": database.RoutingSession})
 migrate = Migrate(app, db)
 
-from models import User, File
+from models import User, File, ChainEvent
 
 from blockchain_system import Blockchain, SecureIPFSStorage, UserManager  # Backend logic
-from blockchain.blockchain import log_transaction
+from ledger_store import SQLLedgerStore
+from blockchain.log_queue import enqueue_log, run_worker, start_background_worker
+from blockchain.blockchain import chain_health
+from streaming import MultipartFileStream, spool, CHUNK_SIZE
+from content_index import find_cid, remember_cid, attach_existing_log
+from content_cache import cache as content_cache
+from auth.hashing import hashing, HashingBusy
+import user_cache
+import resumable
+from ipfs import pin_queue
+from ipfs.backends import PinataBackend, LocalNodeBackend
+from ipfs.pin_queue import start_background_pin_worker, run_pin_worker
+import bulk
+from resumable import UploadError
+import requests
+import http_client
+import metrics
+from metrics import timed
 
-# System components
-blockchain = Blockchain()
-storage = SecureIPFSStorage()
-user_manager = UserManager()
+# Per-route latency histograms and the /metrics endpoint
+metrics.init_app(app)
 
 # Pinata API Credentials 
 PINATA_API_KEY = "cbcb0e4497940aa8aa0c"
 PINATA_SECRET_API_KEY = "5241e3eae68dcaad306ff1671fe3b42cd228a6b7266351f11a3e911f4c719184"
+PINATA_API_URL = os.getenv("PINATA_API_URL", "https://api.pinata.cloud")  # Overridden by the benchmark's fake Pinata
+PINATA_GATEWAY_URL = os.getenv("PINATA_GATEWAY_URL", "https://beige-actual-cattle-585.mypinata.cloud")
+
+# Storage backend for new pins: Pinata, or STORAGE_BACKEND=local for a Kubo node's HTTP API
+if os.getenv("STORAGE_BACKEND") == "local":
+    ipfs_backend = LocalNodeBackend(os.getenv("IPFS_API_URL", "http://127.0.0.1:5001"))
+else:
+    ipfs_backend = PinataBackend(PINATA_API_URL, PINATA_API_KEY, PINATA_SECRET_API_KEY)
+
+# System components
+blockchain = Blockchain(store=SQLLedgerStore())  # Shared by all workers through the database
+storage = SecureIPFSStorage(cache=content_cache, backend=ipfs_backend)
+user_manager = UserManager()
+
+# On-chain logging runs off the request path. Set CHAIN_WORKER_INLINE=1 to drain
+# the queue from a thread in this process instead of the separate worker dyno.
+if os.getenv("CHAIN_WORKER_INLINE") == "1":
+    start_background_worker(app)
+# Likewise for PIN_MODE=async pins (the pinner dyno otherwise)
+if os.getenv("PIN_WORKER_INLINE") == "1":
+    start_background_pin_worker(app, ipfs_backend)
 
-# Set Upload Folder
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif'}  # Restrict file types
 
 # Home Route
@@ -51,7 +80,6 @@ ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif'}  # Restrict fil
 def home():
     return redirect(url_for('login'))
 
-import csv
 import time # for testing
 
 # User Registration
@@ -65,18 +93,23 @@ def register():
         password = request.form['password']
 
         # Check if user already exists
-        existing_user = User.query.filter_by(wallet_address=wallet_address).first()
+        existing_user = user_cache.find_user(wallet_address)
         if existing_user:
             flash("Wallet already registered.")
             return redirect(url_for('register'))
 
-        # Hash password securely before saving
-        hashed_password = generate_password_hash(password)
+        # Hash password securely before saving (on the bounded hashing pool)
+        try:
+            hashed_password = hashing.hash_password(password)
+        except HashingBusy:
+            flash("The server is busy. Please try again in a moment.")
+            return redirect(url_for('register'))
 
         # Create new user and commit to DB
         new_user = User(first_name=first_name, last_name=last_name, wallet_address=wallet_address, password_hash=hashed_password)
         db.session.add(new_user)
         db.session.commit()  
+        user_cache.invalidate(wallet_address)
 
         flash("Registration successful. Please log in.")
         
@@ -90,15 +123,9 @@ def register():
     return render_template('register.html')
 
 
-# Function to log latency data into a CSV file
+# Record an action's latency in the in-memory metrics registry (served at /metrics)
 def log_latency(action, latency):
-    file_path = "latency_data.csv"
-    try:
-        with open(file_path, mode="a", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow([action, latency])
-    except Exception as e:
-        print(f"Error writing latency data: {e}")
+    metrics.registry.observe("action_duration_seconds", latency, action=action)
         
         
 # User Login
@@ -113,17 +140,24 @@ def login():
         wallet_address = request.form['wallet_address']
         password = request.form['password']
 
-        # Check if user exists
-        user = User.query.filter_by(wallet_address=wallet_address).first()
+        # Check if user exists (cached per worker, see user_cache.py)
+        user = user_cache.find_user(wallet_address)
 
         if not user:
             flash("User not found. Please register first.")
             return redirect(url_for('register'))
 
         # Check password hash
-        if not check_password_hash(user.password_hash, password):
+        try:
+            matches, new_hash = hashing.verify_password(user.password_hash, password)
+        except HashingBusy:
+            flash("The server is busy. Please try again in a moment.")
+            return redirect(url_for('login'))
+        if not matches:
             flash("Incorrect password. Please try again.")
             return redirect(url_for('login'))
+        if new_hash:  # Hashed with older cost parameters
+            user_cache.set_password_hash(wallet_address, new_hash)
 
         # If login successful, store user in session
         session['user'] = user.wallet_address  # Use wallet_address as session key
@@ -150,24 +184,41 @@ def dashboard():
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# Function to Upload File to Pinata
-def upload_to_ipfs(file_path):
-    url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
-    headers = {
-        "pinata_api_key": PINATA_API_KEY,
-        "pinata_secret_api_key": PINATA_SECRET_API_KEY
-    }
-
-    with open(file_path, "rb") as f:
-        response = requests.post(url, headers=headers, files={"file": f})
-
-    if response.status_code == 200:
-        return response.json()["IpfsHash"]
+# Pin a file through the configured backend and return its CID.
+# `source` is either a seekable file (replayed on retry) or a one-shot iterable of bytes.
+# With PIN_MODE=async the CID is computed here and the pin is queued instead.
+@timed("upload_to_ipfs")
+def upload_to_ipfs(source, filename, content_type="application/octet-stream"):
+    if pin_queue.ASYNC:
+        with app.app_context():  # Own session and commit; bulk uploads call this from worker threads
+            return pin_queue.enqueue_pin(source, filename, content_type)
+    return ipfs_backend.add(source, filename, content_type)
+
+def record_upload(user_wallet, digest, size, ipfs_cid, cached):
+    """Index the pinned CID, store the File row and queue its chain log in one commit; returns the File."""
+    if not pin_queue.ASYNC:  # A queued pin is indexed by the pin worker once it has succeeded
+        remember_cid(digest, ipfs_cid, size)
+
+    # The contract rejects a CID that is already logged, so only new CIDs get a job
+    logged_before = cached or File.query.filter_by(file_hash=ipfs_cid).first() is not None
+
+    # Store the file and queue its blockchain log in one commit; the worker fills in tx_hash
+    new_transaction = File(file_hash=ipfs_cid, owner_wallet=user_wallet)
+    db.session.add(new_transaction)
+    if logged_before:
+        attach_existing_log(new_transaction)
     else:
-        raise Exception(f"Failed to upload to IPFS: {response.text}")
+        job = enqueue_log(new_transaction)
+    with timed("db_commit"):
+        db.session.commit()
+
+    if not logged_before:
+        print(f"Blockchain Debug - Queued log job {job.id} for {ipfs_cid}")
+    return new_transaction
 
 # File Upload & Secure Blockchain Logging
 @app.route('/upload', methods=['GET', 'POST'])
+@timed("upload_file")
 def upload_file():
     if not session.get('user'):
         flash("Please log in first.")
@@ -176,17 +227,14 @@ def upload_file():
     start_time = time.time()  # Start time
 
     if request.method == "POST":
-        file = request.files["file"]
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)  # Secure filename
-            file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            file.save(file_path)
+        # Read the file part directly off the request stream (request.files would spool it first)
+        boundary = request.mimetype_params.get("boundary")
+        upload = MultipartFileStream(request.stream, boundary) if request.mimetype == "multipart/form-data" and boundary else None
+        client_filename = upload.open() if upload else None
+        if client_filename and allowed_file(client_filename):
+            filename = secure_filename(client_filename)  # Secure filename
 
             try:
-                # Upload file to Pinata (IPFS)
-                ipfs_cid = upload_to_ipfs(file_path)
-
-                # Blockchain Logging
                 user_wallet = session['user']  # This should be the real wallet address
                 private_key = session.get("private_key")  # Ensure private key is secure
 
@@ -198,23 +246,29 @@ def upload_file():
                     flash("Invalid wallet address. Please re-login with a valid address.")
                     return redirect(url_for("login"))
 
-                txn_hash = log_transaction(ipfs_cid, user_wallet)
-
-                print(f"Blockchain Debug - Transaction Hash: {txn_hash}")
-
-                # Store Transaction in the Database
-                new_transaction = File(file_hash=ipfs_cid, owner_wallet=user_wallet)
-                db.session.add(new_transaction)
-                db.session.commit()
-
-                print(f"Transaction Saved: {txn_hash}")
+                # Content dedup: identical bytes reuse the CID already pinned and logged.
+                # A client-supplied digest that is not indexed yet lets us pin in one pass;
+                # otherwise hash first (spooled in memory / anonymous temp file) and pin only on a miss.
+                claimed_digest = request.headers.get("X-Content-SHA256", "").lower()
+                if claimed_digest and not find_cid(claimed_digest):
+                    ipfs_cid = upload_to_ipfs(upload, filename, upload.content_type)
+                    cached = False
+                else:
+                    with timed("receive_and_hash"):
+                        spooled = spool(upload)
+                    with spooled:
+                        ipfs_cid = find_cid(upload.sha256)
+                        cached = ipfs_cid is not None
+                        if not cached:
+                            ipfs_cid = upload_to_ipfs(spooled, filename, upload.content_type)
+                new_transaction = record_upload(user_wallet, upload.sha256, upload.size, ipfs_cid, cached)
 
                 flash(f"File uploaded successfully. CID: {ipfs_cid}")
                 
                 end_time = time.time()  # End time
                 log_latency("upload_file", end_time - start_time)  # Log latency
                 
-                return render_template("upload.html", file_hash=ipfs_cid, txn_hash=txn_hash)
+                return render_template("upload.html", file_hash=ipfs_cid, tx_status=new_transaction.tx_status)
 
             except Exception as e:
                 flash(f"Upload failed: {str(e)}")
@@ -229,6 +283,79 @@ def upload_file():
     return render_template("upload.html")
 
 
+# Bulk upload: many files (or .zip/.tar archives) in one request, pinned in parallel
+# and recorded with bulk inserts; answers with a per-file manifest. See bulk.py.
+@app.route('/upload/bulk', methods=['POST'])
+def bulk_upload():
+    if not session.get('user'):
+        return {"error": "Please log in first."}, 401
+    uploads = request.files.getlist("files") + request.files.getlist("file")
+    if not uploads:
+        return {"error": "No files in the request."}, 400
+    sources = ((upload.filename or "", upload.stream) for upload in uploads)
+    return bulk.ingest(session['user'], sources, upload_to_ipfs, allowed_file)
+
+# Resumable uploads: open a session, PUT checksummed chunks (retrying only the ones that
+# failed), then finalize to assemble and pin. See resumable.py.
+@app.errorhandler(UploadError)
+def upload_error(e):
+    return {"error": str(e)}, e.status
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    if not session.get('user'):
+        return {"error": "Please log in first."}, 401
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get("filename") or "")
+    if not filename or not allowed_file(filename):
+        return {"error": "Invalid file type. Allowed types: txt, pdf, png, jpg, jpeg, gif."}, 400
+    upload = resumable.create_session(session['user'], filename, data.get("content_type"), data.get("size"), data.get("sha256"))
+    return resumable.describe(upload), 201
+
+@app.route('/uploads/<upload_id>')
+def upload_status(upload_id):
+    if not session.get('user'):
+        return {"error": "Please log in first."}, 401
+    return resumable.describe(resumable.get_session(upload_id, session['user']))
+
+@app.route('/uploads/<upload_id>/chunks/<int:position>', methods=['PUT'])
+@timed("upload_chunk")
+def put_upload_chunk(upload_id, position):
+    if not session.get('user'):
+        return {"error": "Please log in first."}, 401
+    upload = resumable.get_session(upload_id, session['user'])
+    return resumable.store_chunk(upload, position, request.stream, request.headers.get("X-Chunk-SHA256", ""))
+
+@app.route('/uploads/<upload_id>/finalize', methods=['POST'])
+@timed("upload_finalize")
+def finalize_upload(upload_id):
+    if not session.get('user'):
+        return {"error": "Please log in first."}, 401
+    upload = resumable.get_session(upload_id, session['user'])
+    if upload.status == "complete":
+        return resumable.describe(upload)  # A retried finalize whose response was lost
+    start_time = time.time()
+    resumable.claim(upload)
+    try:
+        with timed("receive_and_hash"):
+            assembled, digest, size = resumable.assemble(upload)
+        with assembled:
+            ipfs_cid = find_cid(digest)
+            cached = ipfs_cid is not None
+            if not cached:
+                ipfs_cid = upload_to_ipfs(assembled, upload.filename, upload.content_type)
+        new_transaction = record_upload(session['user'], digest, size, ipfs_cid, cached)
+    except Exception as e:
+        resumable.release(upload)  # Chunks stay; the client can finalize again
+        if isinstance(e, UploadError):
+            raise
+        print(f"Error: {e}")
+        return {"error": f"Upload failed: {e}"}, 502
+    resumable.complete(upload, new_transaction)
+    log_latency("upload_file", time.time() - start_time)
+    return resumable.describe(upload)
+
+
 # Retrieve File from IPFS
 @app.route('/retrieve', methods=['GET', 'POST'])
 def retrieve_file():
@@ -238,12 +365,153 @@ def retrieve_file():
 
 
     if request.method == "POST":
-        file_hash = request.form["file_hash"]
-        file_url = f"https://beige-actual-cattle-585.mypinata.cloud/ipfs/{file_hash}" if file_hash else None
+        file_hash = request.form["file_hash"].strip()
+        file_url = url_for("download_file", cid=file_hash) if CID_PATTERN.match(file_hash) else None
+        if not file_url:
+            flash("That does not look like an IPFS CID.")
         return render_template("retrieve.html", file_url=file_url)
 
     return render_template("retrieve.html")
 
+
+# Download proxy: streams content from a local IPFS node (IPFS_API_ADDR) or the Pinata gateway.
+# CIDs are immutable, so the CID is a strong ETag; Range / If-Range / If-None-Match are honoured
+# and the body is pulled from upstream only as fast as the client reads it. Complete bodies are
+# teed into content_cache, and cache hits are served locally (sendfile for the disk tier).
+CID_PATTERN = re.compile(r"^[A-Za-z0-9]{10,128}$")
+PROXIED_HEADERS = ("Content-Type", "Content-Length", "Content-Range", "Last-Modified")
+LOCAL_READ_WINDOW = 1024 * 1024  # Bytes requested from the local node per read
+
+def immutable_headers(cid):
+    return {"ETag": f'"{cid}"', "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=31536000, immutable"}
+
+def cache_headers(response, cid):
+    response.headers.update(immutable_headers(cid))
+    return response
+
+def usable_range(cid):
+    """The request's Range header, unless an If-Range validator says the client's copy is different."""
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and if_range and if_range.strip().removeprefix("W/").strip('"') != cid:
+        return None
+    return range_header
+
+def stream_local_node(cid, range_header):
+    total = storage.stat_size(cid)
+    requested = parse_range_header(range_header) if range_header else None
+    span = requested.range_for_length(total) if requested else None
+    if requested and span is None:
+        return Response(status=416, headers={"Content-Range": f"bytes */{total}"})
+    start, stop = span or (0, total)
+
+    def generate():
+        offset = start
+        while offset < stop:
+            length = min(LOCAL_READ_WINDOW, stop - offset)
+            yield storage.ipfs_client.cat(cid, offset=offset, length=length)
+            offset += length
+
+    body = generate() if span else content_cache.tee(cid, generate(), total)
+    response = Response(body, status=206 if span else 200, mimetype="application/octet-stream", direct_passthrough=True)
+    response.headers["Content-Length"] = str(stop - start)
+    if span:
+        response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{total}"
+    return response
+
+def stream_gateway(cid, range_header):
+    headers = {"Accept-Encoding": "identity"}  # keep Content-Length / Content-Range valid
+    if range_header:
+        headers["Range"] = range_header
+    try:
+        upstream = http_client.get_session("gateway").get(
+            f"{PINATA_GATEWAY_URL}/ipfs/{cid}", headers=headers, stream=True, timeout=http_client.TIMEOUT
+        )
+    except requests.RequestException as e:
+        print(f"Gateway error for {cid}: {e}")
+        abort(502)
+    if upstream.status_code not in (200, 206, 416):
+        upstream.close()
+        abort(404 if upstream.status_code == 404 else 502)
+
+    def generate():
+        try:
+            for chunk in upstream.iter_content(CHUNK_SIZE):
+                yield chunk
+        finally:
+            upstream.close()
+
+    body = generate()
+    if upstream.status_code == 200:
+        content_length = upstream.headers.get("Content-Length")
+        body = content_cache.tee(cid, body, int(content_length) if content_length else None,
+                                 upstream.headers.get("Content-Type", "application/octet-stream"))
+    response = Response(body, status=upstream.status_code, direct_passthrough=True)
+    for name in PROXIED_HEADERS:
+        if name in upstream.headers:
+            response.headers[name] = upstream.headers[name]
+    return response
+
+@app.route('/download/<cid>')
+def download_file(cid):
+    if not session.get('user'):
+        flash("Please log in first.")
+        return redirect(url_for('login'))
+    if not CID_PATTERN.match(cid):
+        abort(404)
+
+    if request.if_none_match.contains(cid):
+        return cache_headers(Response(status=304), cid)
+
+    # If-Range only allows the partial response when the client's validator still matches
+    range_header = usable_range(cid)
+
+    cached = content_cache.lookup(cid) or pin_queue.lookup(cid)  # The spool holds files still waiting for their pin
+    if cached:
+        source, size, content_type = cached
+        # send_file handles Range / If-Range itself and uses wsgi.file_wrapper (sendfile) for paths
+        response = send_file(source, mimetype=content_type, conditional=True, etag=cid, max_age=31536000)
+        return cache_headers(response, cid)
+
+    with timed("download_upstream"):
+        if storage.has_local_node:
+            response = stream_local_node(cid, range_header)
+        else:
+            response = stream_gateway(cid, range_header)
+    return cache_headers(response, cid)
+
+# Transaction history is keyset-paginated on File.id (newest first) so every page is
+# one index range scan on (owner_wallet, id), however many files the wallet owns
+TRANSACTIONS_PAGE_SIZE = 50
+
+def transaction_row(txn, event=None):
+    # Block number and time come from the chain indexer's copy of the log event, if it has seen it yet
+    created = txn.created_at.strftime("%Y-%m-%d %H:%M:%S UTC") if txn.created_at else "Stored in Database"
+    return {
+        "index": txn.id,
+        "timestamp": event.block_timestamp.strftime("%Y-%m-%d %H:%M:%S UTC") if event else created,
+        "block_number": event.block_number if event else None,
+        "user_wallet": txn.owner_wallet,
+        "cid": txn.file_hash,
+        "file_metadata": "File stored in IPFS",
+        "tx_hash": txn.tx_hash,
+        "tx_status": "confirmed" if event else txn.tx_status or "unknown"
+    }
+
+def chain_events_for(rows):
+    """Indexed chain events for a page of File rows, keyed by tx hash (one query, no RPC)."""
+    hashes = {txn.tx_hash for txn in rows if txn.tx_hash}
+    if not hashes:
+        return {}
+    events = ChainEvent.query.filter(ChainEvent.tx_hash.in_(hashes), ChainEvent.event != "FileRetrieved")
+    return {event.tx_hash: event for event in events}
+
+def history_query(wallet, before=None):
+    query = File.query.filter(File.owner_wallet == wallet)
+    if before:
+        query = query.filter(File.id < before)
+    return query.order_by(File.id.desc())
+
 @app.route('/transactions')
 def transactions():
     if not session.get('user'):
@@ -252,25 +520,46 @@ def transactions():
 
     start_time = time.time()  # Start time
 
-    # Retrieve transactions from DB
-    transactions = File.query.filter_by(owner_wallet=session['user']).all()
-
-    # Convert transactions to required format
-    transactions_data = [
-        {
-            "index": i + 1,
-            "timestamp": "Stored in Database",
-            "user_wallet": txn.owner_wallet,
-            "cid": txn.file_hash,
-            "file_metadata": "File stored in IPFS"
-        }
-        for i, txn in enumerate(transactions)
-    ]
+    # Fetch one extra row to know whether an older page exists
+    before = request.args.get("before", type=int)
+    with database.replica_reads(db.session):
+        rows = history_query(session['user'], before).limit(TRANSACTIONS_PAGE_SIZE + 1).all()
+        has_more = len(rows) > TRANSACTIONS_PAGE_SIZE
+        rows = rows[:TRANSACTIONS_PAGE_SIZE]
+        events = chain_events_for(rows)
+
+    transactions_data = [transaction_row(txn, events.get(txn.tx_hash)) for txn in rows]
+    next_cursor = rows[-1].id if has_more else None
 
     end_time = time.time()  # End time
     log_latency("retrieve_transactions", end_time - start_time)  # Log latency
 
-    return render_template("transactions.html", transactions=transactions_data)
+    return render_template("transactions.html", transactions=transactions_data, next_cursor=next_cursor)
+
+# Same history as newline-delimited JSON, streamed row by row.
+# ?before=<id> resumes after the last row received, ?limit=<n> bounds the response
+@app.route('/transactions.json')
+def transactions_json():
+    if not session.get('user'):
+        return {"error": "Please log in first."}, 401
+
+    query = history_query(session['user'], request.args.get("before", type=int))
+    limit = request.args.get("limit", type=int)
+    if limit:
+        query = query.limit(limit)
+
+    def generate():
+        with database.replica_reads(db.session):
+            rows = iter(query.yield_per(500))
+            while True:
+                page = list(itertools.islice(rows, 500))
+                if not page:
+                    return
+                events = chain_events_for(page)
+                for txn in page:
+                    yield json.dumps(transaction_row(txn, events.get(txn.tx_hash))) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
 # Logout
 @app.route('/logout')
@@ -279,6 +568,70 @@ def logout():
     flash("Logged out successfully.")
     return redirect(url_for('login'))
 
+# Liveness: the process is up and serving requests. Never touches the database or the chain.
+@app.route('/healthz')
+def healthz():
+    return {"status": "ok"}
+
+# Readiness: the database must answer. The chain endpoint is reported but only gates readiness
+# when READY_REQUIRES_CHAIN=1, so a degraded RPC does not take login and history pages down.
+def database_health():
+    try:
+        db.session.execute(db.text("SELECT 1"))
+    except Exception as e:
+        print(f"Readiness: database check failed: {e}")  # Details stay in the log; /readyz is public
+        return {"ok": False, "error": "unavailable"}
+    return {"ok": True}
+
+def readiness(checks):
+    ready = checks["database"]["ok"] and (checks["chain"]["ok"] or os.getenv("READY_REQUIRES_CHAIN") != "1")
+    return {"status": "ready" if ready else "unavailable", "checks": checks}, 200 if ready else 503
+
+@app.route('/readyz')
+def readyz():
+    return readiness({"database": database_health(), "chain": chain_health()})
+
+# Background submitter for queued blockchain logs: `flask --app app chain-worker`
+@app.cli.command("chain-worker")
+def chain_worker_command():
+    run_worker(app)
+
+# Pins and records local files for one wallet: `flask --app app bulk-upload --wallet 0x... PATHS`
+@app.cli.command("bulk-upload")
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--wallet", required=True, help="Wallet address that will own the files.")
+@click.option("--manifest", type=click.File("w"), default="-", help="Where to write the JSON manifest (default stdout).")
+def bulk_upload_command(paths, wallet, manifest):
+    """Pin files, directories and .zip/.tar archives in parallel and record them for one wallet."""
+    if not user_cache.find_user(wallet):
+        raise click.ClickException(f"No registered user with wallet {wallet}")
+    result = bulk.ingest(wallet, bulk.iter_paths(paths), upload_to_ipfs, allowed_file)
+    json.dump(result, manifest, indent=2)
+    manifest.write("\n")
+
+@app.cli.command("pin-worker")
+def pin_worker_command():
+    """Pin files queued by PIN_MODE=async uploads."""
+    run_pin_worker(app, ipfs_backend)
+
+@app.cli.command("prune-uploads")
+def prune_uploads_command():
+    """Delete resumable upload sessions that have been idle too long."""
+    print(f"Removed {resumable.prune_expired()} expired upload sessions")
+
+# Copies contract events into chain_event for the history pages: `flask --app app index-chain`
+@app.cli.command("index-chain")
+@click.option("--once", is_flag=True, help="Index up to the current head and exit.")
+def index_chain_command(once):
+    from blockchain.indexer import ChainIndexer, run_indexer
+    if once:
+        indexer = ChainIndexer()
+        while indexer.index_once():
+            pass
+        print(f"Indexed up to block {indexer.checkpoint().block_number if indexer.checkpoint() else '-'}")
+    else:
+        run_indexer(app)
+
 # Run Flask
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,530 @@
+"""Async serving mode: the I/O-bound routes on an aiohttp event loop, everything else on Flask.
+
+    SERVE_MODE=async gunicorn -c gunicorn.conf.py
+
+Uploads, downloads and the readiness probe spend nearly all their time waiting on
+Pinata, the IPFS gateway or the RPC node. Here they run as coroutines, so one worker
+process keeps hundreds of them in flight over a shared aiohttp connection pool instead
+of holding a thread each. Database work and template rendering stay in the Flask app
+and run on a bounded thread pool; every other route is handed to the Flask app as is.
+"""
+import asyncio
+import functools
+import os
+import secrets
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+from flask import flash, redirect, render_template, url_for
+from itsdangerous import BadSignature
+from werkzeug.http import parse_etags, parse_range_header
+from werkzeug.utils import secure_filename
+
+import http_client
+import metrics
+from app import (
+    app as flask_app, allowed_file, record_upload, log_latency, storage, ipfs_backend,
+    upload_to_ipfs as upload_to_backend, database_health, readiness, immutable_headers,
+    PINATA_GATEWAY_URL, CID_PATTERN, PROXIED_HEADERS,
+)
+from blockchain.blockchain import INFURA_URL, HEALTH_TTL, HEALTH_TIMEOUT
+from content_cache import cache as content_cache, DEFAULT_TYPE
+from content_index import find_cid
+from ipfs import pin_queue
+from ipfs.backends import PinataBackend
+from metrics import timed
+from streaming import AsyncPartStream, CHUNK_SIZE, SPOOL_MAX_MEMORY, amultipart_body, aiter_file
+
+EXECUTOR_THREADS = int(os.getenv("ASYNC_EXECUTOR_THREADS", "32"))  # Concurrent database / template calls
+HTTP_POOL_SIZE = int(os.getenv("ASYNC_HTTP_POOL_SIZE", "100"))  # Connections per upstream per worker
+RESPONSE_QUEUE = 8  # Chunks a Flask response may run ahead of a slow client
+HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "te", "trailer", "upgrade",
+              "proxy-authenticate", "proxy-authorization"}
+
+executor = ThreadPoolExecutor(EXECUTOR_THREADS, thread_name_prefix="flask")
+
+
+async def run_sync(func, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+def in_app_context(func, *args):
+    with flask_app.app_context():
+        return func(*args)
+
+
+# Flask session and views
+
+def session_user(request):
+    """Wallet stored in the Flask session cookie, or None."""
+    cookie = request.cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    if not cookie:
+        return None
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        data = serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return None
+    return data.get("user")
+
+
+def _call_view(path, base_url, cookie, view, args):
+    headers = {"Cookie": cookie} if cookie else {}
+    with flask_app.test_request_context(path, base_url=base_url, headers=headers) as ctx:
+        response = flask_app.make_response(view(*args))
+        flask_app.session_interface.save_session(flask_app, ctx.session, response)
+        return response.status_code, list(response.headers.items()), response.get_data()
+
+
+async def flask_view(request, view, *args):
+    """Run `view` in a Flask request context for `request` (flash, templates, session cookie all work)."""
+    status, headers, body = await run_sync(
+        _call_view, request.path_qs, f"{request.scheme}://{request.host}",
+        request.headers.get("Cookie"), view, args,
+    )
+    response = web.Response(status=status, body=body)
+    for name, value in headers:
+        if name.lower() != "content-length":
+            response.headers.add(name, value)
+    return response
+
+
+def upload_succeeded(user_wallet, digest, size, ipfs_cid, cached, start_time):
+    new_transaction = record_upload(user_wallet, digest, size, ipfs_cid, cached)
+    flash(f"File uploaded successfully. CID: {ipfs_cid}")
+    log_latency("upload_file", time.time() - start_time)
+    return render_template("upload.html", file_hash=ipfs_cid, tx_status=new_transaction.tx_status)
+
+
+def upload_failed(message):
+    flash(f"Upload failed: {message}")
+    return redirect(url_for('upload_file'))
+
+
+def upload_rejected():
+    flash("Invalid file type. Allowed types: txt, pdf, png, jpg, jpeg, gif.")
+    return redirect(url_for('upload_file'))
+
+
+# Upload
+
+@timed("upload_to_ipfs")
+async def upload_to_ipfs(http, source, filename, content_type="application/octet-stream"):
+    """Async PinataBackend.add: a seekable `source` is replayed on retry, an async iterable is sent once."""
+    url = f"{ipfs_backend.api_url}/pinning/pinFileToIPFS"
+    seekable = hasattr(source, "seek")
+    attempts = http_client.RETRIES + 1 if seekable else 1
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        boundary = secrets.token_hex(16)
+        if seekable:
+            source.seek(0)
+            chunks = aiter_file(source, executor=executor)
+        else:
+            chunks = source
+        body = amultipart_body(chunks, filename, content_type, boundary)
+        try:
+            async with http.post(url, data=body, headers=ipfs_backend.headers(boundary)) as response:
+                if response.status == 200:
+                    return (await response.json(content_type=None))["IpfsHash"]
+                if last_attempt or response.status not in http_client.RETRY_STATUSES:
+                    raise Exception(f"Failed to upload to IPFS: {await response.text()}")
+                delay = http_client.backoff_delay(attempt, response.headers.get("Retry-After"))
+                print(f"Pinata returned {response.status}; retrying in {delay:.2f}s")
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if last_attempt:
+                raise
+            delay = http_client.backoff_delay(attempt)
+            print(f"Pinata request failed ({e}); retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+async def upload(request):
+    user_wallet = session_user(request)
+    # Logged-out users and malformed requests get the Flask route's redirects and messages
+    if not user_wallet or user_wallet == "1" or request.content_type != "multipart/form-data":
+        return await wsgi_fallback(request)
+    return await receive_upload(request, user_wallet)
+
+
+@timed("upload_file")
+async def receive_upload(request, user_wallet):
+    start_time = time.time()
+
+    reader = await request.multipart()
+    part = await reader.next()
+    while part is not None and part.name != "file":
+        await part.release()
+        part = await reader.next()
+    if part is None or not part.filename or not allowed_file(part.filename):
+        return await flask_view(request, upload_rejected)
+    filename = secure_filename(part.filename)
+    content_type = part.headers.get(aiohttp.hdrs.CONTENT_TYPE, "application/octet-stream")
+    upload = AsyncPartStream(part)
+    http = request.app["pinata"]
+    # Only Pinata pins are made on the event loop; other backends and queued pins run on the executor
+    on_loop = isinstance(ipfs_backend, PinataBackend) and not pin_queue.ASYNC
+
+    try:
+        # Same dedup rules as the Flask route: pin in one pass for an unindexed client digest,
+        # otherwise hash first and pin only on a miss
+        claimed_digest = request.headers.get("X-Content-SHA256", "").lower() if on_loop else ""
+        if claimed_digest and not await run_sync(in_app_context, find_cid, claimed_digest):
+            ipfs_cid = await upload_to_ipfs(http, upload, filename, content_type)
+            cached = False
+        else:
+            with timed("receive_and_hash"):
+                spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+                async for chunk in upload:
+                    await run_sync(spooled.write, chunk)  # Rolls over to a temp file on disk
+            with spooled:
+                ipfs_cid = await run_sync(in_app_context, find_cid, upload.sha256)
+                cached = ipfs_cid is not None
+                if not cached and on_loop:
+                    ipfs_cid = await upload_to_ipfs(http, spooled, filename, content_type)
+                elif not cached:
+                    ipfs_cid = await run_sync(upload_to_backend, spooled, filename, content_type)
+    except Exception as e:
+        print(f"Error: {e}")
+        return await flask_view(request, upload_failed, str(e))
+
+    return await flask_view(request, upload_succeeded, user_wallet, upload.sha256, upload.size, ipfs_cid, cached, start_time)
+
+
+# Download
+
+def usable_range(request, cid):
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and if_range and if_range.strip().removeprefix("W/").strip('"') != cid:
+        return None
+    return range_header
+
+
+async def serve_cached(request, cached, range_header, headers):
+    source, size, content_type = cached
+    requested = parse_range_header(range_header) if range_header else None
+    span = requested.range_for_length(size) if requested else None
+    if requested and span is None:
+        return web.Response(status=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    start, stop = span or (0, size)
+
+    response = web.StreamResponse(status=206 if span else 200, headers=headers)
+    response.content_type = content_type
+    response.content_length = stop - start
+    if span:
+        response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    await response.prepare(request)
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            f.seek(start)
+            remaining = stop - start
+            while remaining:
+                chunk = await run_sync(f.read, min(CHUNK_SIZE * 16, remaining))
+                if not chunk:
+                    break
+                await response.write(chunk)
+                remaining -= len(chunk)
+    else:
+        await response.write(source.getbuffer()[start:stop].tobytes())
+    await response.write_eof()
+    return response
+
+
+async def proxy_gateway(request, cid, range_header, headers):
+    upstream_headers = {"Accept-Encoding": "identity"}
+    if range_header:
+        upstream_headers["Range"] = range_header
+    try:
+        upstream = await request.app["gateway"].get(f"{PINATA_GATEWAY_URL}/ipfs/{cid}", headers=upstream_headers)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Gateway request for {cid} failed: {e}")
+        return web.Response(status=502, text="The IPFS gateway is unavailable.")
+
+    try:
+        if upstream.status == 404:
+            return web.Response(status=404, text="Not found.")
+        if upstream.status not in (200, 206, 416):
+            print(f"Gateway returned {upstream.status} for {cid}")
+            return web.Response(status=502, text="The IPFS gateway is unavailable.")
+        response = web.StreamResponse(status=upstream.status, headers=headers)
+        for name in PROXIED_HEADERS:
+            if name in upstream.headers:
+                response.headers[name] = upstream.headers[name]
+        # Only complete bodies are cached; ranged reads of a missing CID just pass through
+        writer = None
+        if upstream.status == 200:
+            writer = content_cache.writer(cid, upstream.content_length, upstream.headers.get("Content-Type", DEFAULT_TYPE))
+        try:
+            await response.prepare(request)
+            async for chunk in upstream.content.iter_chunked(CHUNK_SIZE):
+                if writer:
+                    writer.write(chunk)
+                await response.write(chunk)
+            if writer:
+                await run_sync(writer.commit)
+        finally:
+            if writer:
+                writer.abort()
+        await response.write_eof()
+        return response
+    finally:
+        upstream.release()
+
+
+async def download(request):
+    cid = request.match_info["cid"]
+    # The local node client is synchronous, so those deployments keep the Flask route
+    if not session_user(request) or not CID_PATTERN.match(cid) or storage.has_local_node:
+        return await wsgi_fallback(request)
+
+    headers = immutable_headers(cid)
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match and parse_etags(if_none_match).contains_weak(cid):
+        return web.Response(status=304, headers=headers)
+
+    range_header = usable_range(request, cid)
+    cached = await run_sync(in_app_context, lambda: content_cache.lookup(cid) or pin_queue.lookup(cid))
+    if cached is not None:
+        return await serve_cached(request, cached, range_header, headers)
+    with timed("download_upstream"):
+        return await proxy_gateway(request, cid, range_header, headers)
+
+
+# Probes
+
+_chain = {"ok": False, "checked_at": 0.0}
+_chain_lock = asyncio.Lock()
+_w3 = None
+
+
+async def chain_health():
+    """Async blockchain.chain_health(): eth_blockNumber through AsyncWeb3, cached for HEALTH_TTL."""
+    global _w3
+    if time.time() - _chain["checked_at"] < HEALTH_TTL or _chain_lock.locked():
+        return dict(_chain)
+    async with _chain_lock:
+        if _w3 is None:
+            from web3 import AsyncWeb3, AsyncHTTPProvider
+            _w3 = AsyncWeb3(AsyncHTTPProvider(INFURA_URL, request_kwargs={"timeout": HEALTH_TIMEOUT}))
+        started = time.perf_counter()
+        try:
+            block = await asyncio.wait_for(_w3.eth.block_number, HEALTH_TIMEOUT)
+            result = {"ok": True, "block_number": block}
+        except Exception as e:
+            print(f"Chain health check failed: {e!r}")  # Same shape as the Flask probe; no details in the response
+            result = {"ok": False, "error": "unavailable"}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["checked_at"] = time.time()
+        _chain.clear()
+        _chain.update(result)
+    return dict(result)
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok"})
+
+
+async def readyz(request):
+    chain, database = await asyncio.gather(chain_health(), run_sync(in_app_context, database_health))
+    body, status = readiness({"database": database, "chain": chain})
+    return web.json_response(body, status=status)
+
+
+# Everything else: the Flask app
+
+class _BodyReader:
+    """Blocking file-like view of the aiohttp request body for the WSGI app's thread."""
+
+    def __init__(self, content, loop):
+        self._content = content
+        self._loop = loop
+        self._buffer = b""  # Read past the end of a size-limited readline()
+
+    def _wait(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, b""
+            return data + self._wait(self._content.read(-1))
+        if self._buffer:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+            return data
+        return self._wait(self._content.read(size))
+
+    def readline(self, size=-1):
+        """The next line including its newline, cut off after `size` bytes unless `size` is negative."""
+        if (size is None or size < 0) and not self._buffer:
+            return self._wait(self._content.readline())
+        line = b""
+        while size is None or size < 0 or len(line) < size:
+            if not self._buffer:
+                self._buffer = self._wait(self._content.readany())
+                if not self._buffer:
+                    break
+            end = self._buffer.find(b"\n")
+            take = end + 1 if end >= 0 else len(self._buffer)
+            if size is not None and size >= 0:
+                take = min(take, size - len(line))
+            line, self._buffer = line + self._buffer[:take], self._buffer[take:]
+            if line.endswith(b"\n"):
+                break
+        return line
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+
+def wsgi_environ(request, loop):
+    host, _, port = request.host.partition(":")
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": request.path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": request.query_string,
+        "SERVER_NAME": host,
+        "SERVER_PORT": port or ("443" if request.secure else "80"),
+        "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+        "REMOTE_ADDR": request.remote or "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": request.scheme,
+        "wsgi.input": _BodyReader(request.content, loop),
+        "wsgi.input_terminated": True,  # Read to EOF; the body may be chunked
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in request.headers.items():
+        key = name.upper().replace("-", "_")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = "HTTP_" + key
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def wsgi_fallback(request):
+    """Serve `request` with the Flask app on the executor, streaming its response back."""
+    request["wsgi"] = True
+    loop = asyncio.get_running_loop()
+    environ = wsgi_environ(request, loop)
+    queue = asyncio.Queue(RESPONSE_QUEUE)
+    cancelled = False
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def start_response(status, headers, exc_info=None):
+        put(("start", status, headers))
+        return lambda data: put(("data", data))
+
+    # The whole response is produced on one thread: stream_with_context generators keep
+    # their request context across yields and must not hop between threads
+    def produce():
+        try:
+            result = flask_app(environ, start_response)
+            try:
+                for chunk in result:
+                    if cancelled:
+                        break
+                    put(("data", chunk))
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+            put(("end",))
+        except BaseException as e:
+            put(("error", e))
+
+    producer = loop.run_in_executor(executor, produce)
+    response = None
+    try:
+        while True:
+            item = await queue.get()
+            if item[0] == "start":
+                status, reason = item[1].split(" ", 1)
+                response = web.StreamResponse(status=int(status), reason=reason)
+                for name, value in item[2]:
+                    if name.lower() not in HOP_BY_HOP:
+                        response.headers.add(name, value)
+                await response.prepare(request)
+            elif item[0] == "data":
+                if item[1]:
+                    await response.write(item[1])
+            elif item[0] == "error":
+                raise item[1]
+            else:
+                break
+        await response.write_eof()
+        return response
+    finally:
+        if not producer.done():
+            # Client went away: stop the producer and drain what it still has to hand over
+            cancelled = True
+
+            async def drain():
+                while not producer.done():
+                    try:
+                        await asyncio.wait_for(queue.get(), 1)
+                    except asyncio.TimeoutError:
+                        pass
+            asyncio.ensure_future(drain())
+
+
+@web.middleware
+async def record_requests(request, handler):
+    start = time.perf_counter()
+    status = "500"
+    try:
+        response = await handler(request)
+        status = str(response.status)
+        return response
+    except web.HTTPException as e:
+        status = str(e.status)
+        raise
+    finally:
+        # Requests served by the Flask app are recorded by its own after_request hook
+        if not request.get("wsgi"):
+            metrics.registry.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - start,
+                route=request.match_info.route.resource.canonical if request.match_info.route.resource else "unmatched",
+                method=request.method,
+                status=status,
+            )
+
+
+async def open_sessions(application):
+    timeout = aiohttp.ClientTimeout(sock_connect=http_client.CONNECT_TIMEOUT, sock_read=http_client.READ_TIMEOUT)
+    application["pinata"] = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE), timeout=timeout)
+    # Gateway bodies are relayed byte for byte, so they must not be decoded on the way through
+    application["gateway"] = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE), timeout=timeout, auto_decompress=False,
+    )
+
+
+async def close_sessions(application):
+    await application["pinata"].close()
+    await application["gateway"].close()
+
+
+def create_app():
+    application = web.Application(middlewares=[record_requests])
+    application.on_startup.append(open_sessions)
+    application.on_cleanup.append(close_sessions)
+    application.router.add_get("/healthz", healthz)
+    application.router.add_get("/readyz", readyz)
+    application.router.add_post("/upload", upload)
+    application.router.add_get("/download/{cid}", download)
+    application.router.add_route("*", "/{tail:.*}", wsgi_fallback)
+    return application
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    web.run_app(app, port=int(os.getenv("PORT", "8000")))
@@ -1,76 +1,115 @@
 import os
 import json
-import bcrypt
+import sqlite3
+import threading
 import pyotp
 from flask import session
 from dotenv import load_dotenv
+from auth.hashing import hashing
+from auth.cache import TTLCache
 
 # Load environment variables
 load_dotenv()
 
+# Users live in a SQLite table keyed by wallet address, so a lookup is one indexed read
+# instead of parsing the whole file, and verified records are kept in a TTL cache in front
+# of it. An existing auth/users.json is imported the first time the store is opened.
 USERS_FILE = "auth/users.json"
-
-# Ensure users file exists
-if not os.path.exists(USERS_FILE):
-    with open(USERS_FILE, "w") as f:
-        json.dump({}, f)
+USERS_DB = os.getenv("AUTH_USERS_DB", "auth/users.db")
+CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+_local = threading.local()  # sqlite3 connections may not be shared between threads
+_users = TTLCache(CACHE_TTL, CACHE_MAX_ENTRIES)
+
+
+def connect():
+    """This thread's connection to the users store, created (and seeded from USERS_FILE) on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(USERS_DB, timeout=10)
+        conn.row_factory = sqlite3.Row
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "wallet_address TEXT PRIMARY KEY, first_name TEXT, last_name TEXT, password TEXT NOT NULL, otp_secret TEXT NOT NULL)"
+            )
+            if os.path.exists(USERS_FILE) and not conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+                with open(USERS_FILE, "r") as f:
+                    legacy = json.load(f)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?)",
+                    [(wallet, u["first_name"], u["last_name"], u["password"], u["otp_secret"]) for wallet, u in legacy.items()],
+                )
+        _local.conn = conn
+    return conn
+
+
+def _load_user(wallet_address):
+    row = connect().execute("SELECT * FROM users WHERE wallet_address = ?", (wallet_address,)).fetchone()
+    return dict(row) if row else None
+
+
+def get_user(wallet_address):
+    """User record for `wallet_address`, or None."""
+    return _users.get_or_load(wallet_address, _load_user)
 
 
 def load_users():
-    """Load user data from JSON file."""
-    with open(USERS_FILE, "r") as f:
-        return json.load(f)
-
-
-def save_users(users):
-    """Save user data to JSON file."""
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+    """All users as {wallet_address: record}."""
+    return {row["wallet_address"]: dict(row) for row in connect().execute("SELECT * FROM users")}
 
 
 def register_user(first_name, last_name, wallet_address, password):
     """Registers a new user with hashed password and a 2FA secret key."""
-    users = load_users()
-
-    if wallet_address in users:
+    if get_user(wallet_address):
         return "User already exists."
 
-    hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    hashed_password = hashing.hash_bcrypt(password).decode()
     otp_secret = pyotp.random_base32()  # Generate 2FA secret key
 
-    users[wallet_address] = {
-        "first_name": first_name,
-        "last_name": last_name,
-        "password": hashed_password,
-        "otp_secret": otp_secret
-    }
-
-    save_users(users)
+    try:
+        with connect() as conn:
+            conn.execute(
+                "INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+                (wallet_address, first_name, last_name, hashed_password, otp_secret),
+            )
+    except sqlite3.IntegrityError:
+        return "User already exists."
+    _users.invalidate(wallet_address)
     return "Success"
 
 
+def set_password(wallet_address, hashed_password):
+    """Store a new bcrypt hash for `wallet_address`."""
+    with connect() as conn:
+        conn.execute("UPDATE users SET password = ? WHERE wallet_address = ?", (hashed_password, wallet_address))
+    _users.invalidate(wallet_address)
+
+
 def verify_user(wallet_address, password):
     """Verifies user login credentials."""
-    users = load_users()
+    user = get_user(wallet_address)
 
-    if wallet_address not in users:
+    if not user:
         return "User not found."
 
-    stored_password = users[wallet_address]["password"]
-    if bcrypt.checkpw(password.encode(), stored_password.encode()):
+    matches, new_hash = hashing.verify_bcrypt(user["password"].encode(), password)
+    if matches:
+        if new_hash:  # Hashed with older BCRYPT_ROUNDS
+            set_password(wallet_address, new_hash.decode())
         return "Success"
     return "Invalid credentials."
 
 
 def generate_otp(wallet_address):
     """Generates a One-Time Password (OTP) for 2FA."""
-    users = load_users()
+    user = get_user(wallet_address)
 
-    if wallet_address not in users:
+    if not user:
         return None
 
-    otp_secret = users[wallet_address]["otp_secret"]
-    otp = pyotp.TOTP(otp_secret).now()
+    otp = pyotp.TOTP(user["otp_secret"]).now()
 
     # Store OTP in session for verification
     session["otp"] = otp
@@ -79,10 +118,9 @@ def generate_otp(wallet_address):
 
 def verify_otp(wallet_address, otp):
     """Verifies the OTP for 2FA authentication."""
-    users = load_users()
+    user = get_user(wallet_address)
 
-    if wallet_address not in users:
+    if not user:
         return False
 
-    otp_secret = users[wallet_address]["otp_secret"]
-    return pyotp.TOTP(otp_secret).verify(otp)
+    return pyotp.TOTP(user["otp_secret"]).verify(otp)
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+# A small per-process TTL cache for identity lookups (user_cache.py, auth/auth.py).
+# Entries expire after `ttl` seconds and the least recently used are dropped beyond
+# `max_entries`. Writers call invalidate() after changing a user; other processes only
+# see the change once their copy expires, so `ttl` bounds how stale a worker can be.
+# Misses are not cached: a wallet registered on another worker is found straight away.
+
+
+class TTLCache:
+    def __init__(self, ttl, max_entries, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped by every invalidation, so a slow load cannot store a stale value
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value, generation=None):
+        if self.ttl <= 0 or value is None:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return  # Invalidated while the value was being loaded
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, load):
+        """Cached value for `key`, or load(key) stored for next time; None when load finds nothing."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        generation = self._generation
+        value = load(key)
+        self.put(key, value, generation)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
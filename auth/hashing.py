@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import bcrypt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from werkzeug.security import generate_password_hash, check_password_hash
+from metrics import timed
+
+# Password KDFs and RSA keygen are deliberately slow, so they run on a small pool sized to
+# the CPUs instead of on whichever request thread asked. At most MAX_PENDING calls may
+# wait for the pool; beyond that callers get HashingBusy after WAIT_TIMEOUT instead of
+# piling up. scrypt, bcrypt and OpenSSL keygen release the GIL, so threads use every core;
+# PASSWORD_HASH_POOL=process is there for KDFs that do not.
+#
+# Hashes record their own parameters. When PASSWORD_HASH_METHOD or BCRYPT_ROUNDS change,
+# a successful login returns a fresh hash for the caller to store (rehash on login).
+POOL_KIND = os.getenv("PASSWORD_HASH_POOL", "thread")
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(WORKERS * 16)))
+WAIT_TIMEOUT = float(os.getenv("PASSWORD_HASH_WAIT_TIMEOUT", "10"))
+METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")  # Werkzeug method string, n:r:p for scrypt
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+RSA_POOL_SIZE = int(os.getenv("RSA_KEY_POOL_SIZE", "8"))  # Pre-generated keys kept ready per process
+RSA_KEY_SIZE = 2048
+
+
+class HashingBusy(Exception):
+    """Too many password hashes are already queued; the caller should ask the user to retry."""
+
+
+# Pool workers (top level so a process pool can pickle them)
+
+def _werkzeug_hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _werkzeug_check(stored, password):
+    return check_password_hash(stored, password)
+
+
+def _bcrypt_hash(password, rounds):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds))
+
+
+def _bcrypt_check(stored, password):
+    return bcrypt.checkpw(password.encode(), stored)
+
+
+def _rsa_key(key_size):
+    return rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+
+
+class HashingService:
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING, kind=POOL_KIND):
+        self.workers = workers
+        self.kind = kind
+        self._slots = threading.BoundedSemaphore(max_pending + workers)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Created per process so gunicorn workers forked from a preloaded app get their own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    executor_class = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+                    self._executor = executor_class(self.workers)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def run(self, func, *args):
+        """Run func(*args) on the pool and wait for it; raises HashingBusy if the queue is full."""
+        if not self._slots.acquire(timeout=WAIT_TIMEOUT):
+            raise HashingBusy("Password hashing queue is full")
+        try:
+            return self._pool().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    # Werkzeug hashes (the users table)
+
+    @timed("password_hash")
+    def hash_password(self, password):
+        return self.run(_werkzeug_hash, password, METHOD)
+
+    @timed("password_verify")
+    def verify_password(self, stored, password):
+        """(matches, new_hash); new_hash is set when a correct password was hashed with old parameters."""
+        if stored.startswith("$2"):  # bcrypt hash from the legacy user stores
+            if not self.run(_bcrypt_check, stored.encode(), password):
+                return False, None
+            return True, self.run(_werkzeug_hash, password, METHOD)
+        if not self.run(_werkzeug_check, stored, password):
+            return False, None
+        if stored.split("$", 1)[0] != METHOD:
+            return True, self.run(_werkzeug_hash, password, METHOD)
+        return True, None
+
+    # bcrypt hashes (auth/auth.py and UserManager)
+
+    @timed("password_hash")
+    def hash_bcrypt(self, password):
+        return self.run(_bcrypt_hash, password, BCRYPT_ROUNDS)
+
+    @timed("password_verify")
+    def verify_bcrypt(self, stored, password):
+        """Like verify_password for bcrypt hashes (bytes); new_hash is set when BCRYPT_ROUNDS changed."""
+        if not self.run(_bcrypt_check, stored, password):
+            return False, None
+        if int(stored.split(b"$")[2]) != BCRYPT_ROUNDS:
+            return True, self.run(_bcrypt_hash, password, BCRYPT_ROUNDS)
+        return True, None
+
+
+class RSAKeyPool:
+    """RSA private keys generated ahead of time by a background thread, so registration never waits on keygen."""
+
+    def __init__(self, size=RSA_POOL_SIZE, key_size=RSA_KEY_SIZE):
+        self.key_size = key_size
+        self._keys = queue.Queue(max(size, 1))
+        self._filler_pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start refilling in this process (again after a fork); take() calls this too."""
+        if self._filler_pid == os.getpid():
+            return
+        with self._lock:
+            if self._filler_pid == os.getpid():
+                return
+            self._filler_pid = os.getpid()
+            self._keys = queue.Queue(self._keys.maxsize)  # Never hand a forked child its parent's keys
+        thread = threading.Thread(target=self._fill_loop, name="rsa-key-pool", daemon=True)
+        thread.start()
+
+    def _fill_loop(self):
+        while True:
+            try:
+                key = _rsa_key(self.key_size)  # Already off the request path
+            except Exception as e:
+                print(f"RSA key pool refill failed: {e}")
+                time.sleep(1)
+                continue
+            self._keys.put(key)  # Blocks while the pool is full
+
+    def take(self):
+        self.start()
+        try:
+            return self._keys.get_nowait()
+        except queue.Empty:
+            # Burst drained the pool: generate this one on the hashing pool like any other slow call
+            print("RSA key pool empty; generating a key inline")
+            if hashing.kind == "process":
+                return _rsa_key(self.key_size)  # Key objects cannot be pickled back from a worker process
+            return hashing.run(_rsa_key, self.key_size)
+
+
+hashing = HashingService()
+rsa_keys = RSAKeyPool()
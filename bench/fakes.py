@@ -0,0 +1,376 @@
+"""Local stand-ins for Pinata (and a Kubo node's dag/import) and the Avalanche JSON-RPC endpoint.
+
+Both run on a ThreadingHTTPServer in a daemon thread and sleep for a configurable
+latency before answering, so benchmarks exercise the app's own code paths without
+depending on (or paying for) the real services.
+"""
+import io
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import rlp
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_utils import keccak
+from werkzeug.formparser import parse_form_data
+from werkzeug.http import parse_range_header
+
+from ipfs.car import read_car
+from ipfs.unixfs import cid_of, cid_string, multihash
+
+
+def fake_cid(content):
+    """The CIDv0 Pinata (`ipfs add`) reports for `content`."""
+    return cid_of(content)
+
+
+def _protobuf_fields(data):
+    """(field number, value) pairs of a protobuf message; enough to walk dag-pb / UnixFS."""
+    position = 0
+    while position < len(data):
+        key, position = _read_varint(data, position)
+        if key & 7 == 2:
+            length, position = _read_varint(data, position)
+            yield key >> 3, data[position:position + length]
+            position += length
+        else:
+            value, position = _read_varint(data, position)
+            yield key >> 3, value
+
+
+def _read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def unixfs_content(blocks, digest):
+    """File bytes of the UnixFS DAG rooted at `digest`, from a {multihash: block} map."""
+    content = bytearray()
+    for number, value in _protobuf_fields(blocks[digest]):
+        if number == 2:  # PBLink; dag-pb puts links before data
+            content += unixfs_content(blocks, dict(_protobuf_fields(value))[1])
+        elif number == 1:
+            content += dict(_protobuf_fields(value)).get(2, b"")
+    return bytes(content)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return bytes(body)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def send_bytes(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 1024  # The async serving mode opens hundreds of connections at once
+    daemon_threads = True
+
+
+class FakeServer:
+    """Base class: owns the HTTP server thread and the simulated latency."""
+
+    def __init__(self, latency=0.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        server = self
+
+        class Handler(_Handler):
+            def do_GET(self):
+                time.sleep(server.latency)
+                server.handle_get(self)
+
+            def do_POST(self):
+                body = self.read_body()
+                time.sleep(server.latency)
+                server.handle_post(self, body)
+
+        self.httpd = _Server((host, port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handle_get(self, handler):
+        handler.send_bytes(404, b'{"error": "not found"}')
+
+    def handle_post(self, handler, body):
+        handler.send_bytes(404, b'{"error": "not found"}')
+
+
+class FakePinata(FakeServer):
+    """pinFileToIPFS and a Kubo-style /api/v0/dag/import, plus a read-only,
+    Range-capable /ipfs/<cid> gateway over what was pinned."""
+
+    def __init__(self, latency=0.0, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.objects = {}
+        self.pins = 0
+
+    def handle_post(self, handler, body):
+        if handler.path.startswith("/api/v0/dag/import"):
+            return self.handle_dag_import(handler, body)
+        if handler.path != "/pinning/pinFileToIPFS":
+            return super().handle_post(handler, body)
+        environ = {
+            "REQUEST_METHOD": "POST",
+            "CONTENT_TYPE": handler.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+        _, _, files = parse_form_data(environ)
+        if "file" not in files:
+            return handler.send_bytes(400, b'{"error": "missing file"}')
+        content = files["file"].read()
+        cid = fake_cid(content)
+        self.objects[cid] = content
+        self.pins += 1
+        payload = {"IpfsHash": cid, "PinSize": len(content), "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ")}
+        handler.send_bytes(200, json.dumps(payload).encode())
+
+    def handle_dag_import(self, handler, body):
+        environ = {
+            "REQUEST_METHOD": "POST",
+            "CONTENT_TYPE": handler.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+        _, _, files = parse_form_data(environ)
+        root, sections = read_car(files["file"].stream)
+        blocks = {}
+        for digest, block in sections:
+            if multihash(block) != digest:
+                return handler.send_bytes(500, b'{"Message": "block does not match its CID"}')
+            blocks[digest] = block
+        cid = cid_string(root)
+        self.objects[cid] = unixfs_content(blocks, root)
+        self.pins += 1
+        handler.send_bytes(200, json.dumps({"Root": {"Cid": {"/": cid}, "PinErrorMsg": ""}}).encode() + b"\n")
+
+    def handle_get(self, handler):
+        if not handler.path.startswith("/ipfs/"):
+            return super().handle_get(handler)
+        content = self.objects.get(handler.path[len("/ipfs/"):].split("?")[0])
+        if content is None:
+            return handler.send_bytes(404, b"not found", "text/plain")
+        requested = parse_range_header(handler.headers.get("Range"))
+        if requested is None:
+            return handler.send_bytes(200, content, "application/octet-stream", {"Accept-Ranges": "bytes"})
+        span = requested.range_for_length(len(content))
+        if span is None:
+            return handler.send_bytes(416, b"", "text/plain", {"Content-Range": f"bytes */{len(content)}"})
+        start, stop = span
+        headers = {"Accept-Ranges": "bytes", "Content-Range": f"bytes {start}-{stop - 1}/{len(content)}"}
+        handler.send_bytes(206, content[start:stop], "application/octet-stream", headers)
+
+
+def decode_raw_transaction(raw):
+    """(sender, nonce, to, calldata) of a signed legacy or EIP-1559 transaction."""
+    if raw[0] == 2:
+        fields = rlp.decode(raw[1:])
+        nonce, to, data = fields[1], fields[5], fields[7]
+    else:
+        fields = rlp.decode(raw)
+        nonce, to, data = fields[0], fields[3], fields[5]
+    return Account.recover_transaction(raw), int.from_bytes(nonce, "big"), "0x" + to.hex(), data
+
+
+def selector(signature):
+    return keccak(text=signature)[:4]
+
+
+def topic(signature):
+    return "0x" + keccak(text=signature).hex()
+
+
+class FakeRPC(FakeServer):
+    """Just enough of the Ethereum JSON-RPC API for the app's submit/poll/index paths.
+
+    A new block is "mined" every `block_time` seconds; transactions sent before it
+    get a successful receipt in that block. Calls to logTransaction / logBatch emit
+    the matching TransactionLogger event, so eth_getLogs has something to return.
+    Batched requests are supported.
+    """
+
+    CHAIN_ID = 43114  # Avalanche C-Chain
+    BASE_FEE = 25 * 10 ** 9
+
+    def __init__(self, latency=0.0, block_time=2.0, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.block_time = block_time
+        self.started = time.time()
+        self.nonces = {}
+        self.transactions = {}  # tx hash -> block it is mined in
+        self.logs = {}  # tx hash -> list of log entries (without block fields)
+        self.senders = {}  # tx hash -> (sender, nonce)
+        self.calls = {}  # method -> count
+        self.lock = threading.Lock()
+
+    def block_number(self):
+        return int((time.time() - self.started) / self.block_time) + 1
+
+    def block(self, number):
+        return {
+            "number": hex(number),
+            "hash": "0x" + keccak(str(number).encode()).hex(),
+            "parentHash": "0x" + keccak(str(number - 1).encode()).hex(),
+            "timestamp": hex(int(self.started + number * self.block_time)),
+            "baseFeePerGas": hex(self.BASE_FEE),
+            "gasLimit": hex(15_000_000),
+            "gasUsed": hex(7_500_000),
+            "transactions": [],
+        }
+
+    def call(self, method, params):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        head = self.block_number()
+        if method == "web3_clientVersion":
+            return "FakeRPC/bench"
+        if method in ("eth_chainId", "net_version"):
+            return hex(self.CHAIN_ID) if method == "eth_chainId" else str(self.CHAIN_ID)
+        if method == "eth_blockNumber":
+            return hex(head)
+        if method == "eth_getBlockByNumber":
+            number = head if params[0] in ("latest", "pending", "safe", "finalized") else int(params[0], 16)
+            return self.block(number)
+        if method == "eth_getTransactionCount":
+            if params[1] == "pending":
+                return hex(self.nonces.get(params[0].lower(), 0))
+            mined = [
+                nonce + 1
+                for tx_hash, (sender, nonce) in list(self.senders.items())
+                if sender == params[0].lower() and self.transactions[tx_hash] <= head
+            ]
+            return hex(max(mined, default=0))
+        if method == "eth_gasPrice":
+            return hex(self.BASE_FEE)
+        if method == "eth_maxPriorityFeePerGas":
+            return hex(10 ** 9)
+        if method == "eth_estimateGas":
+            return hex(60_000)
+        if method == "eth_feeHistory":
+            count = int(params[0], 16) if isinstance(params[0], str) else params[0]
+            rewards = [[hex(10 ** 9) for _ in params[2]] for _ in range(count)]
+            return {
+                "oldestBlock": hex(max(head - count + 1, 0)),
+                "baseFeePerGas": [hex(self.BASE_FEE)] * (count + 1),
+                "gasUsedRatio": [0.5] * count,
+                "reward": rewards,
+            }
+        if method == "eth_sendRawTransaction":
+            raw = bytes.fromhex(params[0][2:])
+            tx_hash = "0x" + keccak(raw).hex()
+            sender, nonce, to, data = decode_raw_transaction(raw)
+            with self.lock:
+                self.transactions[tx_hash] = head + 1
+                self.nonces[sender.lower()] = max(self.nonces.get(sender.lower(), 0), nonce + 1)
+                self.senders[tx_hash] = (sender.lower(), nonce)
+                self.logs[tx_hash] = self.emit(sender, to, data, head + 1)
+            return tx_hash
+        if method == "eth_getTransactionReceipt":
+            mined_in = self.transactions.get(params[0])
+            if mined_in is None or mined_in > head:
+                return None
+            block = self.block(mined_in)
+            return {
+                "transactionHash": params[0],
+                "blockNumber": hex(mined_in),
+                "blockHash": block["hash"],
+                "status": "0x1",
+                "gasUsed": hex(45_000),
+                "effectiveGasPrice": hex(self.BASE_FEE),
+                "logs": self.mined_logs(params[0], mined_in),
+            }
+        if method == "eth_getLogs":
+            query = params[0]
+            start = self.block_param(query.get("fromBlock", "latest"), head)
+            end = min(self.block_param(query.get("toBlock", "latest"), head), head)
+            return [
+                log
+                for tx_hash, mined_in in sorted(self.transactions.items(), key=lambda item: item[1])
+                if start <= mined_in <= end
+                for log in self.mined_logs(tx_hash, mined_in)
+            ]
+        if method == "eth_call":
+            return "0x"
+        raise ValueError(f"Method {method} not supported by FakeRPC")
+
+    def block_param(self, value, head):
+        if isinstance(value, int):
+            return value
+        return head if value in ("latest", "pending", "safe", "finalized") else int(value, 16)
+
+    def emit(self, sender, to, data, block_number):
+        timestamp = int(self.started + block_number * self.block_time)
+        user = "0x" + "00" * 12 + sender[2:].lower()
+        if data[:4] == selector("logTransaction(string)"):
+            (file_hash,) = decode(["string"], data[4:])
+            topics = [topic("FileUploaded(address,string,uint256)"), user]
+            payload = encode(["string", "uint256"], [file_hash, timestamp])
+        elif data[:4] == selector("logBatch(bytes32,uint256)"):
+            root, count = decode(["bytes32", "uint256"], data[4:])
+            topics = [topic("BatchLogged(address,bytes32,uint256,uint256)"), user, "0x" + root.hex()]
+            payload = encode(["uint256", "uint256"], [count, timestamp])
+        else:
+            return []
+        return [{"address": to, "topics": topics, "data": "0x" + payload.hex(), "removed": False}]
+
+    def mined_logs(self, tx_hash, mined_in):
+        block_hash = self.block(mined_in)["hash"]
+        return [
+            dict(log, blockNumber=hex(mined_in), blockHash=block_hash, transactionHash=tx_hash,
+                 transactionIndex="0x0", logIndex=hex(index))
+            for index, log in enumerate(self.logs.get(tx_hash, []))
+        ]
+
+    def respond(self, request):
+        try:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "result": self.call(request["method"], request.get("params", []))}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": str(e)}}
+
+    def handle_post(self, handler, body):
+        request = json.loads(body)
+        if isinstance(request, list):
+            response = [self.respond(item) for item in request]
+        else:
+            response = self.respond(request)
+        handler.send_bytes(200, json.dumps(response).encode())
@@ -0,0 +1,219 @@
+"""Reproducible load test for the Flask app against local fake Pinata / JSON-RPC servers.
+
+    python -m bench.run --users 8 --repeat 3 --pinata-latency 0.05 --rpc-latency 0.02
+
+Each simulated user registers, logs in, uploads every fixture from uploads/
+(15 B .. 4 MB) `--repeat` times, downloads it back (whole and by Range) and pages
+through its transaction history, all concurrently through the app's WSGI test client.
+The database is a throwaway SQLite file unless --database-url is given.
+
+Reports p50/p95/p99 latency and throughput per route and per upload size as
+measured by the client, plus the server-side phase spans recorded by metrics.py
+(those percentiles are bucket estimates).
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.fakes import FakePinata, FakeRPC, fake_cid  # noqa: E402
+
+FIXTURES = ["15b.txt", "10kb.txt", "100kb.txt", "250kb.txt", "500kb.txt", "1mb.txt", "2mb.txt", "4mb.txt"]
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(int(round(q * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}  # (route, label) -> [seconds]
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, route, label, seconds, ok):
+        with self.lock:
+            self.samples.setdefault((route, label), []).append(seconds)
+            if not ok:
+                self.errors[(route, label)] = self.errors.get((route, label), 0) + 1
+
+    def timed(self, route, label, func):
+        start = time.perf_counter()
+        response = func()
+        self.record(route, label, time.perf_counter() - start, response.status_code < 400)
+        return response
+
+
+def load_fixtures(names):
+    fixtures = []
+    for name in names:
+        with open(os.path.join(ROOT, "uploads", name), "rb") as f:
+            fixtures.append((name, f.read()))
+    return fixtures
+
+
+def run_user(app, user_id, fixtures, repeat, unique, recorder):
+    client = app.test_client()
+    wallet = f"0x{user_id:040x}"
+    credentials = {"wallet_address": wallet, "password": "bench-password"}
+    recorder.timed("/register", "-", lambda: client.post("/register", data=dict(credentials, first_name="Bench", last_name=str(user_id))))
+    recorder.timed("/login", "-", lambda: client.post("/login", data=credentials))
+
+    for round_number in range(repeat):
+        for name, content in fixtures:
+            if unique:
+                content = f"{wallet}-{round_number}\n".encode() + content
+            upload = lambda: client.post(
+                "/upload",
+                data={"file": (io.BytesIO(content), name)},
+                content_type="multipart/form-data",
+            )
+            recorder.timed("/upload", name, upload)
+
+    cids = [fake_cid(content if not unique else f"{wallet}-0\n".encode() + content) for _, content in fixtures]
+    recorder.timed("/retrieve", "-", lambda: client.post("/retrieve", data={"file_hash": cids[0]}))
+    for (name, _), cid in zip(fixtures, cids):
+        recorder.timed("/download", name, lambda: client.get(f"/download/{cid}", buffered=True))
+        recorder.timed("/download", "range", lambda: client.get(f"/download/{cid}", headers={"Range": "bytes=0-1023"}, buffered=True))
+    recorder.timed("/transactions", "-", lambda: client.get("/transactions"))
+
+
+def wait_for_chain_queue(app, timeout):
+    """Block until every chain job has been sent (or `timeout` passes), so the report counts the sends."""
+    from models import ChainJob
+    deadline = time.monotonic() + timeout
+    while True:
+        with app.app_context():
+            waiting = ChainJob.query.filter(ChainJob.status.in_(("pending", "processing"))).count()
+        if not waiting:
+            return
+        if time.monotonic() > deadline:
+            print(f"Chain queue still has {waiting} unsent jobs after {timeout:.0f}s")
+            return
+        time.sleep(0.2)
+
+
+def report(recorder, elapsed, phases):
+    rows = []
+    for (route, label), samples in sorted(recorder.samples.items()):
+        rows.append({
+            "route": route,
+            "size": label,
+            "count": len(samples),
+            "errors": recorder.errors.get((route, label), 0),
+            "p50_ms": percentile(samples, 0.50) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+            "throughput_rps": len(samples) / elapsed,
+        })
+    phase_rows = []
+    for (name, labels), histogram in sorted(phases.items()):
+        if name != "span_duration_seconds":
+            continue
+        labels = dict(labels)
+        phase_rows.append({
+            "phase": labels["span"],
+            "outcome": labels["outcome"],
+            "count": histogram.count,
+            "mean_ms": histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+            "p50_ms": histogram.quantile(0.50) * 1000,
+            "p95_ms": histogram.quantile(0.95) * 1000,
+            "p99_ms": histogram.quantile(0.99) * 1000,
+            "throughput_rps": histogram.count / elapsed,
+        })
+    return {"elapsed_s": elapsed, "routes": rows, "phases": phase_rows}
+
+
+def print_report(result):
+    print(f"\nWall time: {result['elapsed_s']:.2f}s")
+    print(f"\n{'route':<14}{'size':<11}{'n':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for row in result["routes"]:
+        print(f"{row['route']:<14}{row['size']:<11}{row['count']:>6}{row['errors']:>5}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['throughput_rps']:>9.1f}")
+    print(f"\n{'phase':<22}{'outcome':<9}{'n':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'/s':>8}")
+    for row in result["phases"]:
+        print(f"{row['phase']:<22}{row['outcome']:<9}{row['count']:>6}{row['mean_ms']:>10.1f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['throughput_rps']:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=4, help="concurrent simulated users")
+    parser.add_argument("--repeat", type=int, default=1, help="uploads of each fixture per user")
+    parser.add_argument("--sizes", nargs="+", default=FIXTURES, help="fixture files from uploads/ to upload")
+    parser.add_argument("--pinata-latency", type=float, default=0.05, help="seconds added to every fake Pinata call")
+    parser.add_argument("--rpc-latency", type=float, default=0.02, help="seconds added to every fake RPC call")
+    parser.add_argument("--block-time", type=float, default=2.0, help="fake chain block interval in seconds")
+    parser.add_argument("--duplicates", action="store_true", help="re-upload identical bytes (exercises dedup) instead of unique content")
+    parser.add_argument("--chain-worker", action="store_true", help="drain the chain log queue in-process during the run")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="seconds to wait for the chain queue to empty with --chain-worker")
+    parser.add_argument("--database-url", help="database to use instead of a temporary SQLite file")
+    parser.add_argument("--json", dest="json_path", help="also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    pinata = FakePinata(latency=args.pinata_latency).start()
+    rpc = FakeRPC(latency=args.rpc_latency, block_time=args.block_time).start()
+    workdir = tempfile.mkdtemp(prefix="bench-")
+
+    # Configure the app before it is imported: it reads these at import time
+    os.environ["PINATA_API_URL"] = pinata.url
+    os.environ["PINATA_GATEWAY_URL"] = pinata.url
+    os.environ["INFURA_URL"] = rpc.url
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}?timeout=30"
+    os.environ["CHAIN_WORKER_INLINE"] = "0"  # Started below, once the tables exist
+    os.environ.setdefault("CHAIN_WORKER_INTERVAL", "0.2")
+    os.environ.setdefault("PRIVATE_KEY", "0x" + "42" * 32)  # Throwaway signer; the fake chain accepts any key
+
+    from app import app, db
+    from blockchain.log_queue import start_background_worker
+    import metrics
+
+    with app.app_context():
+        db.create_all()
+    stop_worker = start_background_worker(app) if args.chain_worker else None
+    metrics.registry.reset()
+
+    fixtures = load_fixtures(args.sizes)
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = [
+            pool.submit(run_user, app, user_id + 1, fixtures, args.repeat, not args.duplicates, recorder)
+            for user_id in range(args.users)
+        ]
+        for future in futures:
+            future.result()
+    if stop_worker:
+        wait_for_chain_queue(app, args.drain_timeout)
+        stop_worker.set()
+    elapsed = time.perf_counter() - start
+
+    result = report(recorder, elapsed, metrics.registry.snapshot())
+    result["config"] = vars(args)
+    result["fake_calls"] = {"pinata_pins": pinata.pins, "rpc": dict(rpc.calls)}
+    print_report(result)
+    print(f"\nFake Pinata pins: {pinata.pins}  RPC calls: {sum(rpc.calls.values())} {rpc.calls}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+
+    pinata.stop()
+    rpc.stop()
+
+
+if __name__ == "__main__":
+    main()
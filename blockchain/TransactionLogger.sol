@@ -8,11 +8,22 @@ contract TransactionLogger {
         uint256 timestamp;
     }
 
+    struct FileBatch {
+        address user;
+        bytes32 merkleRoot;
+        uint256 fileCount;
+        uint256 timestamp;
+    }
+
     FileTransaction[] public transactions;
     mapping(string => bool) private loggedFiles;
 
+    FileBatch[] public batches;
+    mapping(bytes32 => bool) private loggedRoots;
+
     event FileUploaded(address indexed user, string fileHash, uint256 timestamp);
     event FileRetrieved(address indexed user, string fileHash, uint256 timestamp);
+    event BatchLogged(address indexed user, bytes32 indexed merkleRoot, uint256 fileCount, uint256 timestamp);
 
     function uploadFile(string memory _fileHash) public {
         require(!loggedFiles[_fileHash], "File already logged on blockchain.");
@@ -23,6 +34,18 @@ contract TransactionLogger {
         emit FileUploaded(msg.sender, _fileHash, block.timestamp);
     }
 
+    // Logs many files at once: only the Merkle root of the batch is stored on chain,
+    // each file's inclusion proof is kept off chain and checked against this root.
+    function logBatch(bytes32 _merkleRoot, uint256 _fileCount) public {
+        require(_fileCount > 0, "Empty batch.");
+        require(!loggedRoots[_merkleRoot], "Batch already logged on blockchain.");
+
+        batches.push(FileBatch(msg.sender, _merkleRoot, _fileCount, block.timestamp));
+        loggedRoots[_merkleRoot] = true;
+
+        emit BatchLogged(msg.sender, _merkleRoot, _fileCount, block.timestamp);
+    }
+
     function retrieveFile(string memory _fileHash) public {
         emit FileRetrieved(msg.sender, _fileHash, block.timestamp);
     }
@@ -31,6 +54,10 @@ contract TransactionLogger {
         return transactions.length;
     }
 
+    function getBatchCount() public view returns (uint256) {
+        return batches.length;
+    }
+
     function getTransaction(uint256 index) public view returns (address, string memory, uint256) {
         require(index < transactions.length, "Invalid index.");
         FileTransaction memory txData = transactions[index];
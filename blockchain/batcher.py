@@ -0,0 +1,95 @@
+import json
+import os
+from datetime import datetime, timedelta
+from models import db, File, ChainJob, ChainBatch
+import job_queue
+from blockchain.blockchain import log_batch
+from blockchain.merkle import MerkleTree
+from blockchain.confirmations import record_submission
+from content_index import propagate_to_duplicates
+
+# A batch is cut when it reaches BATCH_MAX_FILES or its oldest job has waited BATCH_WINDOW
+BATCH_MAX_FILES = int(os.getenv("CHAIN_BATCH_MAX_FILES", "256"))
+BATCH_WINDOW = timedelta(seconds=int(os.getenv("CHAIN_BATCH_WINDOW", "30")))
+MAX_ATTEMPTS = int(os.getenv("CHAIN_JOB_MAX_ATTEMPTS", "5"))
+PROCESSING_TIMEOUT = timedelta(seconds=int(os.getenv("CHAIN_JOB_TIMEOUT", "300")))  # Same as log_queue
+
+
+def batch_leaf(owner_wallet, file_hash):
+    """Leaf data for one file; binds the CID to its owner."""
+    return f"{owner_wallet}:{file_hash}"
+
+
+def cut_batch(max_files=BATCH_MAX_FILES, window=BATCH_WINDOW):
+    """Group due pending jobs into a new ChainBatch and store each file's inclusion proof.
+
+    Returns the batch, or None if there is not enough work yet.
+    """
+    jobs = (
+        ChainJob.query
+        .filter(ChainJob.status == "pending", ChainJob.next_attempt_at <= datetime.utcnow())
+        .order_by(ChainJob.id)
+        .limit(max_files)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not jobs or (len(jobs) < max_files and jobs[0].created_at > datetime.utcnow() - window):
+        db.session.rollback()
+        return None
+
+    tree = MerkleTree([batch_leaf(job.owner_wallet, job.file_hash) for job in jobs])
+    batch = ChainBatch(merkle_root=tree.root_hex, file_count=len(jobs))
+    db.session.add(batch)
+    db.session.flush()  # assigns batch.id
+    for index, job in enumerate(jobs):
+        job.batch = batch
+        job.status = "batched"
+        file = db.session.get(File, job.file_id)
+        file.batch_id = batch.id
+        file.leaf_index = index
+        file.merkle_proof = json.dumps(tree.proof(index))
+        file.tx_status = "batched"
+    db.session.commit()
+    print(f"Chain batch {batch.id} cut: {len(jobs)} files, root {batch.merkle_root}")
+    return batch
+
+
+def claim_batches(limit=5):
+    """Mark up to `limit` due batches as processing; a batch left processing by a crashed worker is reclaimed."""
+    return job_queue.claim(ChainBatch, limit, PROCESSING_TIMEOUT)
+
+
+def submit_batch(batch):
+    try:
+        sent = log_batch(batch.merkle_root, batch.file_count)
+    except Exception as e:
+        status = "failed" if job_queue.retry_later(batch, e, MAX_ATTEMPTS) == "failed" else None
+        txn_hash = None
+    else:
+        status = batch.status = "submitted"
+        record_submission(batch, sent)
+        txn_hash = sent.tx_hash
+        batch.last_error = None
+
+    if status:
+        # One tx covers every file in the batch
+        for job in batch.jobs:
+            job.status = status
+            job.tx_hash = txn_hash
+            if txn_hash:
+                propagate_to_duplicates(job.file_hash, txn_hash, status)
+        File.query.filter_by(batch_id=batch.id).update(
+            {File.tx_status: status, File.tx_hash: txn_hash}, synchronize_session=False
+        )
+    db.session.commit()
+
+
+def drain_batches():
+    """One worker round in batch mode; returns how much work was done."""
+    cut = 0
+    while cut_batch():
+        cut += 1
+    batches = claim_batches()
+    for batch in batches:
+        submit_batch(batch)
+    return cut + len(batches)
@@ -1,21 +1,29 @@
-from web3 import Web3
 import json
 import os
+import threading
+import time
+from collections import namedtuple
+import requests
 from dotenv import load_dotenv
-from models import db, File  # Import database models
+from blockchain.nonce import NonceManager, is_nonce_error, is_transport_error
+from blockchain.fees import FeeOracle
+import http_client
+from metrics import timed
 
-# Load environment variables
-from dotenv import load_dotenv
-import os
+# web3 and the eth-* stack are imported on first use rather than at module import:
+# they dominate cold start, and nothing touches the chain until a log is submitted.
+# A worker therefore boots without a network round-trip and keeps serving login and
+# history pages while the RPC endpoint is down; chain_health() reports its state.
 
 load_dotenv()  # This will load .env file variables
 INFURA_URL = os.getenv("INFURA_URL")
 print("Loaded INFURA_URL:", INFURA_URL)  # Debugging check
 
-
-AVAX_RPC_URL = os.getenv("https://avalanche-mainnet.infura.io/v3/9e0d26da1f324dda9080cd79da131768")  # Avalanche RPC
-CONTRACT_ADDRESS = os.getenv("0x7338410F9c4335422e63ace32b4f7C7abb5C7C8A")
-PRIVATE_KEY = os.getenv("9e0d26da1f324dda9080cd79da131768")
+CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS", "0x7338410F9c4335422e63ace32b4f7C7abb5C7C8A")
+PRIVATE_KEY = os.getenv("PRIVATE_KEY")
+RPC_BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "100"))  # Calls per JSON-RPC batch request
+HEALTH_TTL = float(os.getenv("CHAIN_HEALTH_TTL", "10"))  # Seconds a chain_health() result is reused
+HEALTH_TIMEOUT = float(os.getenv("CHAIN_HEALTH_TIMEOUT", "2"))
 
 
 CONTRACT_ABI = json.loads("""
@@ -27,6 +35,16 @@ CONTRACT_ABI = json.loads("""
         "stateMutability": "nonpayable",
         "type": "function"
     },
+    {
+        "inputs": [
+            {"internalType": "bytes32", "name": "_merkleRoot", "type": "bytes32"},
+            {"internalType": "uint256", "name": "_fileCount", "type": "uint256"}
+        ],
+        "name": "logBatch",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
     {
         "inputs": [{"internalType": "address", "name": "_user", "type": "address"}],
         "name": "getUserTransactions",
@@ -37,45 +55,204 @@ CONTRACT_ABI = json.loads("""
 ]
 """)
 
-print("Connecting to Avalanche C-Chain...")  # Debugging step
-w3 = Web3(Web3.HTTPProvider(INFURA_URL))
+_w3 = None
+_contract = None
+_init_lock = threading.Lock()
+
+
+def _pooled_provider(endpoint_uri):
+    from web3 import Web3
+
+    class PooledHTTPProvider(Web3.HTTPProvider):
+        """HTTPProvider that sends every thread's calls through the shared keep-alive pool.
+
+        The stock provider keeps one requests.Session per thread with default pool and
+        retry settings; this one reuses http_client's "rpc" session (timeouts, jittered
+        retry on 429/5xx) for all threads in the worker.
+        """
+
+        def make_request(self, method, params):
+            request_data = self.encode_rpc_request(method, params)
+            request_kwargs = dict(self.get_request_kwargs())
+            request_kwargs.setdefault("timeout", http_client.TIMEOUT)
+            response = http_client.get_session("rpc").post(self.endpoint_uri, data=request_data, **request_kwargs)
+            response.raise_for_status()
+            return self.decode_rpc_response(response.content)
+
+    return PooledHTTPProvider(endpoint_uri)
+
+
+def get_w3():
+    """The shared Web3 client, built on first use. Does not contact the node."""
+    global _w3
+    if _w3 is None:
+        with _init_lock:
+            if _w3 is None:
+                from web3 import Web3
+                print("Connecting to Avalanche C-Chain...")  # Debugging step
+                _w3 = Web3(_pooled_provider(INFURA_URL))
+    return _w3
+
+
+def get_contract():
+    global _contract
+    if _contract is None:
+        w3 = get_w3()
+        with _init_lock:
+            if _contract is None:
+                _contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+    return _contract
+
+
+_signer = None
+
 
-if w3.is_connected():
-    print("Successfully connected to Avalanche")
-else:
-    raise Exception("Failed to connect. Check INFURA_URL or network status.")
-contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+def signer_address():
+    """The account that owns PRIVATE_KEY. Every log is sent (and its nonces counted) from it."""
+    global _signer
+    if _signer is None:
+        _signer = get_w3().eth.account.from_key(PRIVATE_KEY).address
+    return _signer
 
 
-def log_transaction(file_hash, user_address):
+_health = {"ok": None, "checked_at": 0.0}
+_health_lock = threading.Lock()
+
+
+def chain_health():
+    """Cached RPC probe: {"ok", "block_number", "latency_ms", "error", "checked_at"}.
+
+    At most one thread per worker probes the node every HEALTH_TTL seconds; the
+    others get the previous result straight away instead of waiting on the network.
+    """
+    if time.time() - _health["checked_at"] < HEALTH_TTL or not _health_lock.acquire(blocking=False):
+        return dict(_health)
     try:
-        nonce = w3.eth.get_transaction_count(user_address)
+        started = time.perf_counter()
+        try:
+            # Plain request: the pooled session would retry, and a probe should fail fast
+            response = requests.post(
+                INFURA_URL,
+                json={"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []},
+                timeout=(HEALTH_TIMEOUT, HEALTH_TIMEOUT),
+            )
+            response.raise_for_status()
+            result = {"ok": True, "block_number": int(response.json()["result"], 16)}
+        except Exception as e:
+            # Request errors carry the full RPC URL, project key included: log them, never return them
+            print(f"Chain health check failed: {e}")
+            result = {"ok": False, "error": "unavailable"}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["checked_at"] = time.time()
+        _health.clear()
+        _health.update(result)
+        return dict(_health)
+    finally:
+        _health_lock.release()
+
+
+# Nonce counters shared by every submitting process; "pending" includes transactions still in the mempool
+nonce_manager = NonceManager(lambda address: get_w3().eth.get_transaction_count(address, "pending"))
+# Cached gas limits and a background-refreshed EIP-1559 fee snapshot
+fee_oracle = FeeOracle(get_w3)
+
 
-        txn = contract.functions.logTransaction(file_hash).build_transaction({
-            "from": user_address,
-            "nonce": nonce,
-            "gas": 2000000,
-            "gasPrice": w3.to_wei("25", "gwei")
-        })
+SentTransaction = namedtuple("SentTransaction", "tx_hash sender nonce fee_per_gas priority_fee_per_gas")
 
-        signed_txn = w3.eth.account.sign_transaction(txn, PRIVATE_KEY)
-        txn_hash = w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-        txn_hash_hex = w3.to_hex(txn_hash)
 
-        # Save transaction in the database
-        new_transaction = File(file_hash=file_hash, owner_wallet=user_address)
-        db.session.add(new_transaction)
-        db.session.commit()
+def rpc_batch(calls):
+    """Send [(method, params), ...] as JSON-RPC batch requests; returns the results in order.
+
+    Calls go out RPC_BATCH_SIZE per POST over the pooled "rpc" session. A call the node
+    answered with an error comes back as None.
+    """
+    session = http_client.get_session("rpc")
+    results = []
+    for start in range(0, len(calls), RPC_BATCH_SIZE):
+        chunk = calls[start:start + RPC_BATCH_SIZE]
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params} for i, (method, params) in enumerate(chunk)]
+        with timed("rpc_batch"):
+            response = session.post(INFURA_URL, json=payload, timeout=http_client.TIMEOUT)
+        response.raise_for_status()
+        by_id = {item.get("id"): item for item in response.json()}
+        for i, (method, _) in enumerate(chunk):
+            item = by_id.get(i, {})
+            if "error" in item:
+                print(f"RPC {method} failed: {item['error']}")
+            results.append(item.get("result"))
+    return results
+
+
+def send_contract_call(contract_call, nonce=None, fees=None):
+    """Build, sign and broadcast a type-2 contract call from signer_address(); returns a SentTransaction.
+
+    Gas and fees come from fee_oracle, so this makes no RPC call besides the send itself.
+    Pass the `nonce` of a pending transaction and higher `fees` (max fee, priority fee) to replace it.
+    """
+    w3 = get_w3()
+    sender = signer_address()  # The transaction must come from the account that signs it
+    replacing = nonce is not None
+    if not replacing:
+        with timed("nonce"):
+            nonce = nonce_manager.allocate(sender)
+    try:
+        max_fee, priority_fee = fees or fee_oracle.fees()
+        with timed("build_transaction"):
+            txn = contract_call.build_transaction({
+                "from": sender,
+                "nonce": nonce,
+                "chainId": fee_oracle.chain_id,
+                "gas": fee_oracle.gas_limit(contract_call, sender),
+                "maxFeePerGas": max_fee,
+                "maxPriorityFeePerGas": priority_fee,
+            })
 
-        print(f"Blockchain Transaction Logged - TXN Hash: {txn_hash_hex}")
-        return txn_hash_hex
+        with timed("sign_transaction"):
+            signed_txn = w3.eth.account.sign_transaction(txn, PRIVATE_KEY)
+        with timed("send_raw_transaction"):
+            txn_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)  # eth-account 0.13 name
+        return SentTransaction(w3.to_hex(txn_hash), sender, nonce, max_fee, priority_fee)
+
+    except Exception as e:
+        if replacing:
+            pass  # The nonce is still owned by the transaction being replaced
+        elif is_nonce_error(e) or is_transport_error(e):
+            # Another sender used this nonce (or ours is stale), or the send timed out and the
+            # node may hold the transaction after all: re-read the count from the chain
+            nonce_manager.resync(sender)
+        else:
+            nonce_manager.release(sender, nonce)
+        raise
+
+
+@timed("log_transaction")
+def log_transaction(file_hash):
+    """Sign and send the log call from the account that owns PRIVATE_KEY; raises on failure so the queue can retry it."""
+    try:
+        sent = send_contract_call(get_contract().functions.logTransaction(file_hash))
+        print(f"Blockchain Transaction Logged - TXN Hash: {sent.tx_hash}")
+        return sent
 
     except Exception as e:
         print(f"Blockchain Logging Failed: {str(e)}")
-        return f"Transaction failed: {str(e)}"
+        raise
+
+
+@timed("log_batch")
+def log_batch(merkle_root_hex, file_count):
+    """Log a whole batch of files with one call; sent from the account that owns PRIVATE_KEY."""
+    try:
+        call = get_contract().functions.logBatch(bytes.fromhex(merkle_root_hex), file_count)
+        sent = send_contract_call(call)
+        print(f"Blockchain Batch Logged - {file_count} files, TXN Hash: {sent.tx_hash}")
+        return sent
+
+    except Exception as e:
+        print(f"Blockchain Batch Logging Failed: {str(e)}")
+        raise
 
 def get_user_transactions(user_address):
     try:
-        return contract.functions.getUserTransactions(user_address).call()
+        return get_contract().functions.getUserTransactions(user_address).call()
     except Exception as e:
         return f"Error fetching transactions: {str(e)}"
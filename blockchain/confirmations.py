@@ -0,0 +1,159 @@
+import json
+import os
+from datetime import datetime, timedelta
+from models import db, File, ChainJob, ChainBatch
+from blockchain.fees import MAX_FEE
+from blockchain.blockchain import get_contract, nonce_manager, fee_oracle, rpc_batch, send_contract_call, signer_address, is_nonce_error
+
+# Follows every submitted transaction until it is mined. Each tick sends one batched
+# JSON-RPC request (split every RPC_BATCH_SIZE calls) holding the mined nonce of the
+# signing account and the receipt of every hash still in flight, so thousands of
+# pending logs cost a handful of calls per block. Transactions that sit in the mempool for
+# STUCK_AFTER are re-sent with the same nonce and higher fees from the fee oracle's
+# eth_feeHistory snapshot.
+POLL_INTERVAL = float(os.getenv("CHAIN_CONFIRM_INTERVAL", "2"))  # About one block
+TRACK_LIMIT = int(os.getenv("CHAIN_CONFIRM_LIMIT", "5000"))  # In-flight transactions polled per tick
+STUCK_AFTER = timedelta(seconds=int(os.getenv("CHAIN_TX_STUCK_AFTER", "90")))
+MAX_BUMPS = int(os.getenv("CHAIN_TX_MAX_BUMPS", "5"))
+BUMP_PERCENT = 125  # Nodes only accept a replacement raising both fees by at least 10%
+
+
+def record_submission(row, sent):
+    """Store a SentTransaction on a ChainJob or ChainBatch."""
+    row.tx_hash = sent.tx_hash
+    row.sender = sent.sender
+    row.nonce = sent.nonce
+    row.fee_per_gas = sent.fee_per_gas
+    row.priority_fee_per_gas = sent.priority_fee_per_gas
+    row.submitted_at = datetime.utcnow()
+
+
+def sent_hashes(row):
+    """Every hash this submission has been sent under; any one of them may be the one mined."""
+    return [row.tx_hash] + json.loads(row.previous_tx_hashes or "[]")
+
+
+def in_flight(limit=TRACK_LIMIT):
+    # Jobs in a batch are settled through their ChainBatch
+    jobs = (
+        ChainJob.query
+        .filter(ChainJob.status == "submitted", ChainJob.batch_id.is_(None), ChainJob.tx_hash.isnot(None))
+        .order_by(ChainJob.id)
+        .limit(limit)
+        .all()
+    )
+    batches = (
+        ChainBatch.query
+        .filter(ChainBatch.status == "submitted", ChainBatch.tx_hash.isnot(None))
+        .order_by(ChainBatch.id)
+        .limit(limit)
+        .all()
+    )
+    return jobs + batches
+
+
+def update_files(hashes, values):
+    """Apply `values` to every File (including deduplicated copies) carrying one of `hashes`."""
+    File.query.filter(File.tx_hash.in_(hashes)).update(values, synchronize_session=False)
+
+
+def update_batch_jobs(batch, status, tx_hash):
+    ChainJob.query.filter_by(batch_id=batch.id).update(
+        {ChainJob.status: status, ChainJob.tx_hash: tx_hash}, synchronize_session=False
+    )
+
+
+def settle(row, receipt):
+    hashes = sent_hashes(row)
+    row.status = "confirmed" if int(receipt["status"], 16) == 1 else "failed"
+    row.last_error = None if row.status == "confirmed" else "Transaction reverted"
+    row.tx_hash = receipt["transactionHash"]
+    row.confirmed_block = int(receipt["blockNumber"], 16)
+    update_files(hashes, {File.tx_hash: row.tx_hash, File.tx_status: row.status})
+    if isinstance(row, ChainBatch):
+        update_batch_jobs(row, row.status, row.tx_hash)
+
+
+def requeue(row):
+    """The nonce was used by a transaction that is not ours: send the log again with a new nonce."""
+    print(f"Transaction {row.tx_hash} was dropped; requeueing")
+    if isinstance(row, ChainBatch):
+        update_files(sent_hashes(row), {File.tx_hash: None, File.tx_status: "batched"})
+        update_batch_jobs(row, "batched", None)
+    else:
+        update_files(sent_hashes(row), {File.tx_hash: None, File.tx_status: "deduplicated"})
+        row.file.tx_status = "pending"
+    row.status = "pending"
+    row.next_attempt_at = datetime.utcnow()
+    row.tx_hash = row.nonce = row.submitted_at = row.previous_tx_hashes = None
+    row.last_error = "Dropped from the mempool"
+    nonce_manager.resync(signer_address())
+
+
+def contract_call_for(row):
+    functions = get_contract().functions
+    if isinstance(row, ChainBatch):
+        return functions.logBatch(bytes.fromhex(row.merkle_root), row.file_count)
+    return functions.logTransaction(row.file_hash)
+
+
+def bump(row):
+    previous = json.loads(row.previous_tx_hashes or "[]")
+    if row.nonce is None or len(previous) >= MAX_BUMPS:
+        return
+    # Legacy transactions (sent before type-2 fees) pay their gasPrice as the tip too
+    old_priority_fee = row.priority_fee_per_gas or row.fee_per_gas
+    max_fee, priority_fee = fee_oracle.fees()
+    priority_fee = max(old_priority_fee * BUMP_PERCENT // 100, priority_fee)
+    max_fee = min(max(row.fee_per_gas * BUMP_PERCENT // 100, max_fee, priority_fee), MAX_FEE)
+    if max_fee <= row.fee_per_gas or priority_fee > max_fee:
+        print(f"Stuck transaction {row.tx_hash} is already at the fee cap")
+        return
+    try:
+        sent = send_contract_call(contract_call_for(row), nonce=row.nonce, fees=(max_fee, priority_fee))
+    except Exception as e:
+        if not is_nonce_error(e):  # A nonce error means one of our sends was mined meanwhile
+            print(f"Fee bump for {row.tx_hash} failed: {e}")
+        return
+    print(f"Replaced stuck transaction {row.tx_hash} with {sent.tx_hash} at {max_fee} wei/gas")
+    old_hashes = sent_hashes(row)
+    record_submission(row, sent)
+    row.previous_tx_hashes = json.dumps(old_hashes)
+    update_files(old_hashes, {File.tx_hash: sent.tx_hash})
+    if isinstance(row, ChainBatch):
+        update_batch_jobs(row, "submitted", sent.tx_hash)
+
+
+def track_once(limit=TRACK_LIMIT):
+    """Poll every in-flight transaction once; returns how many were settled."""
+    rows = in_flight(limit)
+    if not rows:
+        return 0
+    sender = signer_address()  # Every log is sent from this account
+    hashes = [tx_hash for row in rows for tx_hash in sent_hashes(row)]
+    # The mined nonce is asked for before receipts, so a nonce counted as mined always has its receipt visible
+    results = rpc_batch(
+        [("eth_getTransactionCount", [sender, "latest"])]
+        + [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes]
+    )
+    mined_nonce = int(results[0], 16) if results[0] else 0
+    receipts = dict(zip(hashes, results[1:]))
+
+    now = datetime.utcnow()
+    settled = 0
+    stuck = []
+    for row in rows:
+        receipt = next((receipts[tx_hash] for tx_hash in sent_hashes(row) if receipts.get(tx_hash)), None)
+        if receipt:
+            settle(row, receipt)
+            settled += 1
+        elif row.nonce is not None and mined_nonce > row.nonce:
+            requeue(row)
+        elif row.submitted_at and row.submitted_at <= now - STUCK_AFTER:
+            stuck.append(row)
+    db.session.commit()
+
+    for row in stuck:
+        bump(row)
+        db.session.commit()
+    return settled
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from metrics import timed
+
+# Gas limits and EIP-1559 fees for outgoing transactions, kept off the submit path.
+# estimate_gas is only called the first time a function is seen with calldata of a given
+# size class (every logTransaction of a CIDv0 encodes to the same length), and fees come
+# from an eth_feeHistory snapshot a background thread refreshes every REFRESH_INTERVAL.
+# Sending a transaction therefore costs no RPC calls beyond eth_sendRawTransaction.
+REFRESH_INTERVAL = float(os.getenv("CHAIN_FEE_REFRESH_INTERVAL", "5"))
+STALE_AFTER = float(os.getenv("CHAIN_FEE_STALE_AFTER", "60"))  # Refresh inline if the snapshot is older than this
+FEE_HISTORY_BLOCKS = 10
+PRIORITY_PERCENTILE = 50
+GAS_MARGIN_PERCENT = int(os.getenv("CHAIN_GAS_MARGIN_PERCENT", "120"))  # Headroom over the estimate
+MIN_PRIORITY_FEE = int(float(os.getenv("CHAIN_MIN_PRIORITY_FEE_GWEI", "1")) * 10 ** 9)
+MAX_FEE = int(float(os.getenv("CHAIN_MAX_FEE_GWEI", "500")) * 10 ** 9)
+BASE_FEE_HEADROOM = 2  # maxFeePerGas covers this many times the next base fee (several full blocks)
+
+
+def length_class(calldata):
+    """Calldata size rounded up to a power-of-two number of 32-byte ABI words."""
+    words = max((len(calldata) + 31) // 32, 1)
+    return 1 << (words - 1).bit_length()
+
+
+class FeeOracle:
+    def __init__(self, get_w3, refresh_interval=REFRESH_INTERVAL):
+        self._get_w3 = get_w3
+        self.refresh_interval = refresh_interval
+        self._gas = {}  # (function name, length class) -> gas limit
+        self._snapshot = None  # {"base_fee", "priority_fee", "updated_at"}
+        self._chain_id = None
+        self._lock = threading.Lock()
+        self._refresher_pid = None
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self._get_w3().eth.chain_id
+        return self._chain_id
+
+    def gas_limit(self, contract_call, sender):
+        calldata = bytes.fromhex(contract_call._encode_transaction_data()[2:])
+        key = (contract_call.fn_name, length_class(calldata))
+        gas = self._gas.get(key)
+        if gas is None:
+            with timed("estimate_gas"):
+                estimate = contract_call.estimate_gas({"from": sender})
+            gas = self._gas[key] = estimate * GAS_MARGIN_PERCENT // 100
+        return gas
+
+    def refresh(self):
+        with timed("fee_refresh"):
+            history = self._get_w3().eth.fee_history(FEE_HISTORY_BLOCKS, "latest", [PRIORITY_PERCENTILE])
+        tips = sorted(reward[0] for reward in history.get("reward") or [] if reward)
+        self._snapshot = {
+            "base_fee": history["baseFeePerGas"][-1],  # Base fee of the next block
+            "priority_fee": max(tips[len(tips) // 2] if tips else 0, MIN_PRIORITY_FEE),
+            "updated_at": time.time(),
+        }
+        return self._snapshot
+
+    def _start_refresher(self):
+        # Started per process so it survives gunicorn forking a preloaded app
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+        thread = threading.Thread(target=self._refresh_loop, name="fee-oracle", daemon=True)
+        thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Fee oracle refresh failed: {e}")
+
+    def fees(self):
+        """(maxFeePerGas, maxPriorityFeePerGas) in wei from the latest snapshot."""
+        if self._refresher_pid != os.getpid():
+            self._start_refresher()
+        snapshot = self._snapshot
+        if snapshot is None or time.time() - snapshot["updated_at"] > STALE_AFTER:
+            snapshot = self.refresh()
+        priority_fee = snapshot["priority_fee"]
+        return min(snapshot["base_fee"] * BASE_FEE_HEADROOM + priority_fee, MAX_FEE), priority_fee
@@ -0,0 +1,159 @@
+import os
+import threading
+from datetime import datetime
+from eth_abi import decode
+from eth_utils import keccak, to_checksum_address
+from models import db, ChainEvent, IndexerCheckpoint
+from blockchain.blockchain import get_w3, CONTRACT_ADDRESS
+
+# Copies the TransactionLogger's events into chain_event so history pages never call the node.
+# Logs are fetched with eth_getLogs over block ranges (halved when the node refuses a range,
+# grown back after successes), committed together with a checkpoint of the last indexed
+# block and its hash. If that hash changes the chain was reorganised: the last REORG_DEPTH
+# blocks are dropped and indexed again.
+CHECKPOINT = "transaction_logger"
+START_BLOCK = int(os.getenv("CHAIN_INDEXER_START_BLOCK", "0"))  # Set to the contract's deployment block
+RANGE_BLOCKS = int(os.getenv("CHAIN_INDEXER_RANGE", "2000"))  # Blocks per eth_getLogs call
+CONFIRMATIONS = int(os.getenv("CHAIN_INDEXER_CONFIRMATIONS", "3"))  # Stay this far behind the head
+REORG_DEPTH = int(os.getenv("CHAIN_INDEXER_REORG_DEPTH", "64"))
+POLL_INTERVAL = float(os.getenv("CHAIN_INDEXER_INTERVAL", "5"))
+MAX_RANGES_PER_ROUND = 50  # Commit progress and re-check the head this often during a backfill
+
+EVENTS = {
+    "FileUploaded": ("address", "string", "uint256"),
+    "FileRetrieved": ("address", "string", "uint256"),
+    "BatchLogged": ("address", "bytes32", "uint256", "uint256"),
+}
+TOPICS = {
+    "0x" + keccak(text=f"{name}({','.join(types)})").hex(): name
+    for name, types in EVENTS.items()
+}
+
+
+def _hex(value):
+    value = value.hex() if hasattr(value, "hex") else str(value)
+    return value if value.startswith("0x") else "0x" + value
+
+
+def decode_log(log):
+    """ChainEvent for one raw log entry, or None if it is not a TransactionLogger event."""
+    topics = [_hex(topic) for topic in log["topics"]]
+    name = TOPICS.get(topics[0]) if topics else None
+    if name is None:
+        return None
+    user = to_checksum_address("0x" + topics[1][-40:])
+    event = ChainEvent(
+        event=name,
+        block_number=log["blockNumber"],
+        block_hash=_hex(log["blockHash"]),
+        tx_hash=_hex(log["transactionHash"]),
+        log_index=log["logIndex"],
+        user_wallet=user,
+    )
+    data = bytes.fromhex(_hex(log["data"])[2:])
+    if name == "BatchLogged":
+        event.merkle_root = topics[2][2:]
+        event.file_count, timestamp = decode(["uint256", "uint256"], data)
+    else:
+        event.file_hash, timestamp = decode(["string", "uint256"], data)
+    event.block_timestamp = datetime.utcfromtimestamp(timestamp)
+    return event
+
+
+def is_range_error(error):
+    """True if the node refused an eth_getLogs call for covering too much."""
+    message = str(error).lower()
+    return any(hint in message for hint in ("range", "too many", "limit exceeded", "10000 results", "response size"))
+
+
+class ChainIndexer:
+    def __init__(self, name=CHECKPOINT, address=CONTRACT_ADDRESS):
+        self.name = name
+        self.address = address
+        self.range_blocks = RANGE_BLOCKS
+
+    def checkpoint(self):
+        return db.session.get(IndexerCheckpoint, self.name)
+
+    def save_checkpoint(self, number, block_hash):
+        checkpoint = self.checkpoint()
+        if checkpoint is None:
+            checkpoint = IndexerCheckpoint(name=self.name)
+            db.session.add(checkpoint)
+        checkpoint.block_number = number
+        checkpoint.block_hash = block_hash
+
+    def block_hash(self, number):
+        return _hex(get_w3().eth.get_block(number)["hash"])
+
+    def rewind_if_reorged(self, checkpoint):
+        """Drop the most recent blocks if the checkpointed block is no longer canonical."""
+        if self.block_hash(checkpoint.block_number) == checkpoint.block_hash:
+            return False
+        number = max(checkpoint.block_number - REORG_DEPTH, START_BLOCK - 1)
+        print(f"Chain reorg below block {checkpoint.block_number}; re-indexing from {number + 1}")
+        ChainEvent.query.filter(ChainEvent.block_number > number).delete(synchronize_session=False)
+        if number < START_BLOCK:
+            db.session.delete(checkpoint)
+        else:
+            self.save_checkpoint(number, self.block_hash(number))
+        db.session.commit()
+        return True
+
+    def fetch_logs(self, start, end):
+        return get_w3().eth.get_logs({
+            "address": self.address,
+            "fromBlock": start,
+            "toBlock": end,
+            "topics": [list(TOPICS)],
+        })
+
+    def index_once(self, max_ranges=MAX_RANGES_PER_ROUND):
+        """Index up to `max_ranges` block ranges; returns how many blocks were covered."""
+        safe_head = get_w3().eth.block_number - CONFIRMATIONS
+        checkpoint = self.checkpoint()
+        if checkpoint is not None and self.rewind_if_reorged(checkpoint):
+            checkpoint = self.checkpoint()
+        start = checkpoint.block_number + 1 if checkpoint else START_BLOCK
+        covered = 0
+        for _ in range(max_ranges):
+            if start > safe_head:
+                break
+            end = min(start + self.range_blocks - 1, safe_head)
+            try:
+                logs = self.fetch_logs(start, end)
+            except Exception as e:
+                if not is_range_error(e) or self.range_blocks == 1:
+                    raise
+                self.range_blocks = max(self.range_blocks // 2, 1)
+                continue
+            for log in logs:
+                if log.get("removed"):
+                    continue
+                event = decode_log(log)
+                if event is not None:
+                    db.session.add(event)
+            # Events and the checkpoint land in one commit, so a crash never double-indexes a range
+            self.save_checkpoint(end, self.block_hash(end))
+            db.session.commit()
+            covered += end - start + 1
+            start = end + 1
+            self.range_blocks = min(self.range_blocks * 2, RANGE_BLOCKS)
+        return covered
+
+
+def run_indexer(app, stop_event=None):
+    """Backfill, then tail new blocks until `stop_event` is set (forever if None)."""
+    stop_event = stop_event or threading.Event()
+    indexer = ChainIndexer()
+    print(f"Chain indexer started at block {START_BLOCK} for {indexer.address}")
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                covered = indexer.index_once()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Chain indexer error: {e}")
+                covered = 0
+        if not covered:
+            stop_event.wait(POLL_INTERVAL)
@@ -0,0 +1,80 @@
+import os
+import time
+from datetime import timedelta
+from models import db, File, ChainJob
+import job_queue
+from blockchain.blockchain import log_transaction
+from blockchain.confirmations import record_submission, track_once, POLL_INTERVAL as CONFIRM_INTERVAL
+from content_index import propagate_to_duplicates
+
+# Worker settings
+POLL_INTERVAL = float(os.getenv("CHAIN_WORKER_INTERVAL", "2"))  # Seconds to sleep when the queue is empty
+BATCH_SIZE = int(os.getenv("CHAIN_WORKER_BATCH", "20"))  # Jobs claimed per round
+BATCH_MODE = os.getenv("CHAIN_BATCH_MODE") == "1"  # Log Merkle roots of many files instead of one tx per file
+MAX_ATTEMPTS = int(os.getenv("CHAIN_JOB_MAX_ATTEMPTS", "5"))
+PROCESSING_TIMEOUT = timedelta(seconds=int(os.getenv("CHAIN_JOB_TIMEOUT", "300")))  # Reclaim jobs from crashed workers
+
+
+def enqueue_log(file):
+    """Queue an on-chain log for a File row. The caller commits both together."""
+    file.tx_status = "pending"
+    job = ChainJob(file=file, file_hash=file.file_hash, owner_wallet=file.owner_wallet)
+    db.session.add(job)
+    return job
+
+
+def claim_jobs(limit=BATCH_SIZE):
+    """Mark up to `limit` due jobs as processing. SKIP LOCKED lets several workers share the queue."""
+    return job_queue.claim(ChainJob, limit, PROCESSING_TIMEOUT)
+
+
+def process_job(job):
+    file = db.session.get(File, job.file_id)
+    try:
+        sent = log_transaction(job.file_hash)
+    except Exception as e:
+        if job_queue.retry_later(job, e, MAX_ATTEMPTS) == "failed":
+            file.tx_status = "failed"
+    else:
+        job.status = "submitted"
+        record_submission(job, sent)
+        job.last_error = None
+        file.tx_hash = sent.tx_hash
+        file.tx_status = "submitted"
+        propagate_to_duplicates(job.file_hash, sent.tx_hash, "submitted")
+    db.session.commit()
+
+
+def drain_once(limit=BATCH_SIZE):
+    """Process one round of due jobs; returns how many were claimed."""
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        process_job(job)
+    return len(jobs)
+
+
+def run_worker(app, stop_event=None):
+    """Drain the queue and track confirmations until `stop_event` is set (forever if None)."""
+    if BATCH_MODE:
+        from blockchain.batcher import drain_batches as drain
+    else:
+        drain = drain_once
+    next_track = [0.0]
+
+    def track():
+        if time.monotonic() < next_track[0]:
+            return
+        next_track[0] = time.monotonic() + CONFIRM_INTERVAL
+        try:
+            track_once()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Confirmation tracker error: {e}")
+
+    print(f"Chain worker started ({'batch' if BATCH_MODE else 'single'} mode)")
+    job_queue.run_worker(app, "Chain worker", drain, POLL_INTERVAL, stop_event, after_round=track)
+
+
+def start_background_worker(app):
+    """Run the submitter on a daemon thread inside this process."""
+    return job_queue.start_in_background(run_worker, app, name="chain-worker")
@@ -0,0 +1,68 @@
+import hashlib
+
+# Domain-separated SHA-256 so a leaf can never be passed off as an inner node
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def hash_leaf(data):
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+
+def hash_node(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+class MerkleTree:
+    """Binary Merkle tree over a list of leaves (bytes or str).
+
+    An odd node at the end of a level is carried up unchanged, so proofs only
+    contain real siblings. Proofs are lists of [sibling_hex, side] pairs where
+    side is "L" or "R" for the position of the sibling.
+    """
+
+    def __init__(self, leaves):
+        if not leaves:
+            raise ValueError("Cannot build a Merkle tree with no leaves.")
+        self.levels = [[hash_leaf(leaf) for leaf in leaves]]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            parents = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                parents.append(level[-1])
+            self.levels.append(parents)
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    @property
+    def root_hex(self):
+        return self.root.hex()
+
+    def proof(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError("Leaf index out of range.")
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append([level[sibling].hex(), "L" if sibling < index else "R"])
+            index //= 2
+        return path
+
+    @staticmethod
+    def verify(leaf, proof, root):
+        """Check `leaf` against `root` (bytes or hex) in O(len(proof))."""
+        if isinstance(root, str):
+            root = bytes.fromhex(root.removeprefix("0x"))
+        node = hash_leaf(leaf)
+        for sibling_hex, side in proof:
+            sibling = bytes.fromhex(sibling_hex)
+            node = hash_node(sibling, node) if side == "L" else hash_node(node, sibling)
+        return node == root
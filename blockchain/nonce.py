@@ -0,0 +1,72 @@
+import threading
+import requests
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from models import db, SignerNonce
+
+
+def is_nonce_error(error):
+    """True if the node rejected a transaction because of its nonce."""
+    message = str(error).lower()
+    return "nonce" in message or "already known" in message or "replacement transaction underpriced" in message
+
+
+def is_transport_error(error):
+    """True if a send failed without an answer from the node (timeout, dropped connection).
+
+    The node may still have accepted the transaction, so its nonce must not be handed out again.
+    """
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, TimeoutError, ConnectionError))
+
+
+class NonceManager:
+    """Hands out sequential nonces per address from a counter row in signer_nonce.
+
+    Every submitting process (chain worker dynos, CHAIN_WORKER_INLINE threads in each gunicorn
+    worker) sends from the same PRIVATE_KEY account, so the counter lives in the database:
+    each allocation locks the address's row (SELECT ... FOR UPDATE) in its own short
+    transaction, and no two processes are ever given the same nonce. The chain is only asked
+    for the transaction count when an address has no row: the first time it is seen and
+    after `resync`. Needs an app context.
+    """
+
+    def __init__(self, fetch_nonce):
+        self._fetch_nonce = fetch_nonce  # address -> next nonce according to the node
+        self._lock = threading.Lock()  # Threads of this process queue here instead of on the row lock
+        self._table = SignerNonce.__table__
+
+    def allocate(self, address):
+        table = self._table
+        with self._lock:
+            while True:
+                try:
+                    with db.engine.begin() as conn:
+                        current = conn.execute(
+                            select(table.c.next_nonce).where(table.c.address == address).with_for_update()
+                        ).scalar()
+                        if current is None:
+                            nonce = self._fetch_nonce(address)
+                            conn.execute(insert(table).values(address=address, next_nonce=nonce + 1))
+                        else:
+                            nonce = current
+                            conn.execute(update(table).where(table.c.address == address).values(next_nonce=nonce + 1))
+                        return nonce
+                except IntegrityError:
+                    continue  # Another process created the row first; lock theirs
+
+    def release(self, address, nonce):
+        """Return an unused nonce if nothing was allocated after it; otherwise resync.
+
+        Only for sends the node definitely did not accept (see is_transport_error)."""
+        table = self._table
+        with self._lock, db.engine.begin() as conn:
+            returned = conn.execute(
+                update(table).where(table.c.address == address, table.c.next_nonce == nonce + 1).values(next_nonce=nonce)
+            ).rowcount
+            if not returned:
+                conn.execute(delete(table).where(table.c.address == address))
+
+    def resync(self, address):
+        """Forget the counter so the next allocation re-reads it from the chain."""
+        with self._lock, db.engine.begin() as conn:
+            conn.execute(delete(self._table).where(self._table.c.address == address))
@@ -1,58 +1,374 @@
-import ipfshttpclient
 import hashlib
+import io
+import itertools
+import os
+import struct
 import time
-import bcrypt  # For secure password hashing
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+import json
+from collections import OrderedDict
+from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.exceptions import InvalidTag
+from blockchain.merkle import MerkleTree
+from auth.hashing import hashing, rsa_keys
 
 
 # Blockchain Class
-class Blockchain:
+# Each block commits to its transactions through a Merkle root, and the store keeps
+# an index from CID to (block position, leaf index), so inclusion proofs are O(log n).
+# Blocks live in a pluggable store (memory here, SQL tables in ledger_store.py);
+# only recently used blocks are kept in RAM.
+EMPTY_MERKLE_ROOT = hashlib.sha256(b"").hexdigest()
+GENESIS_DATA = "Genesis Block"
+
+
+class LedgerConflict(Exception):
+    """Another writer appended a block at the same position first."""
+
+
+class BlockCache:
+    """Small LRU map used for recently accessed blocks and Merkle trees."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+
+    def get(self, key):
+        if key not in self.items:
+            return None
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
+
+class MemoryLedgerStore:
+    """Keeps the ledger in process memory; lost on restart and not shared between workers."""
+
     def __init__(self):
-        self.chain = []
-        self.transactions = []
-        self.create_block(data="Genesis Block", previous_hash="0")
+        self.blocks = []
+        self.hash_index = {}
+        self.cid_index = {}
+        self.pending = []
+
+    def height(self):
+        return len(self.blocks)
+
+    def get(self, position):
+        return self.blocks[position] if 0 <= position < len(self.blocks) else None
+
+    def find_hash(self, block_hash):
+        position = self.hash_index.get(block_hash)
+        return None if position is None else self.blocks[position]
+
+    def locate(self, cid):
+        return self.cid_index.get(cid)
+
+    def add_pending(self, transaction):
+        self.pending.append(transaction)
+
+    def append(self, make_block, expected_position=None):
+        """Seal the pending transactions into make_block(position, transactions)."""
+        position = len(self.blocks)
+        if expected_position is not None and position != expected_position:
+            raise LedgerConflict(f"Block {expected_position} already exists.")
+        block = make_block(position, self.pending)
+        self.blocks.append(block)
+        self.hash_index[block["hash"]] = position
+        for leaf_index, transaction in enumerate(block["transactions"]):
+            self.cid_index[transaction["cid"]] = (position, leaf_index)
+        self.pending = []
+        return block
+
+
+class Blockchain:
+    def __init__(self, store=None, cache_size=128):
+        self.store = store or MemoryLedgerStore()
+        self.blocks = BlockCache(cache_size)  # position -> block
+        self.trees = BlockCache(cache_size)  # position -> MerkleTree, built lazily for proofs
+        self.validated_height = 0  # blocks before this position already passed is_chain_valid
+        self._genesis_checked = False
+
+    def _ensure_genesis(self):
+        # Created lazily so a database-backed store is only touched inside an app context
+        if self._genesis_checked:
+            return
+        if self.store.height() == 0:
+            try:
+                self.store.append(lambda position, txns: self._make_block(position, [], GENESIS_DATA, "0"), expected_position=0)
+            except LedgerConflict:
+                pass  # another worker created it
+        self._genesis_checked = True
 
-    def create_block(self, data, previous_hash):
+    def _make_block(self, position, transactions, data, previous_hash):
+        if previous_hash is None:
+            previous_hash = self.get_block(position - 1)["hash"]
         block = {
-            "index": len(self.chain) + 1,
+            "index": position + 1,
             "timestamp": str(time.time()),
-            "transactions": self.transactions,
+            "transactions": list(transactions),
+            "merkle_root": self.merkle_root(transactions),
             "data": data,
             "previous_hash": previous_hash,
-            "hash": self.hash_block(data, previous_hash),
         }
-        self.transactions = []
-        self.chain.append(block)
+        block["hash"] = self.hash_block(block)
         return block
 
-    def hash_block(self, data, previous_hash):
-        return hashlib.sha256(f"{data}{previous_hash}".encode()).hexdigest()
+    def create_block(self, data, previous_hash=None):
+        """Seal pending transactions into a new block; links to the current tip if previous_hash is None."""
+        self._ensure_genesis()
+        while True:
+            try:
+                block = self.store.append(lambda position, txns: self._make_block(position, txns, data, previous_hash))
+            except LedgerConflict:
+                if previous_hash is not None:
+                    raise
+                continue  # another worker extended the chain; link to the new tip
+            self.blocks.put(block["index"] - 1, block)
+            return block
+
+    def __len__(self):
+        self._ensure_genesis()
+        return self.store.height()
+
+    def get_block(self, position):
+        """Block at 0-based `position`, loaded from the store on a cache miss."""
+        block = self.blocks.get(position)
+        if block is None:
+            block = self.store.get(position)
+            if block is not None:
+                self.blocks.put(position, block)
+        return block
+
+    def get_block_by_hash(self, block_hash):
+        block = self.store.find_hash(block_hash)
+        if block is not None:
+            self.blocks.put(block["index"] - 1, block)
+        return block
+
+    @property
+    def last_block(self):
+        return self.get_block(len(self) - 1)
+
+    @staticmethod
+    def transaction_leaf(transaction):
+        return json.dumps(transaction, sort_keys=True)
+
+    def merkle_root(self, transactions):
+        if not transactions:
+            return EMPTY_MERKLE_ROOT
+        return MerkleTree([self.transaction_leaf(t) for t in transactions]).root_hex
+
+    def hash_block(self, block):
+        header = f"{block['index']}{block['timestamp']}{block['merkle_root']}{block['data']}{block['previous_hash']}"
+        return hashlib.sha256(header.encode()).hexdigest()
 
     def add_transaction(self, user_wallet, cid, file_metadata):
+        self._ensure_genesis()
         transaction = {
             "user_wallet": user_wallet,
             "cid": cid,
             "file_metadata": file_metadata,
             "timestamp": str(time.time()),
         }
-        self.transactions.append(transaction)
+        self.store.add_pending(transaction)
+
+    def _tree(self, position):
+        tree = self.trees.get(position)
+        if tree is None:
+            transactions = self.get_block(position)["transactions"]
+            tree = MerkleTree([self.transaction_leaf(t) for t in transactions])
+            self.trees.put(position, tree)
+        return tree
 
-    def is_chain_valid(self):
-        for i in range(1, len(self.chain)):
-            current = self.chain[i]
-            previous = self.chain[i - 1]
-            if current["previous_hash"] != previous["hash"]:
+    def prove(self, cid):
+        """Inclusion proof for the block transaction that logged `cid`, or None."""
+        location = self.store.locate(cid)
+        if location is None:
+            return None
+        position, leaf_index = location
+        block = self.get_block(position)
+        return {
+            "cid": cid,
+            "block_index": block["index"],
+            "leaf_index": leaf_index,
+            "transaction": block["transactions"][leaf_index],
+            "merkle_root": block["merkle_root"],
+            "block_hash": block["hash"],
+            "path": self._tree(position).proof(leaf_index),
+        }
+
+    def verify(self, proof):
+        """Check a proof from `prove` against this chain in O(log n)."""
+        block = self.get_block(proof["block_index"] - 1)
+        if block is None:
+            return False
+        if block["hash"] != proof["block_hash"] or block["merkle_root"] != proof["merkle_root"]:
+            return False
+        if proof["transaction"].get("cid") != proof["cid"]:
+            return False
+        leaf = self.transaction_leaf(proof["transaction"])
+        return MerkleTree.verify(leaf, proof["path"], block["merkle_root"])
+
+    def is_chain_valid(self, full=False):
+        """Check blocks added since the last successful check (all blocks if `full`)."""
+        height = len(self)
+        start = 0 if full else self.validated_height
+        previous = self.get_block(start - 1) if start > 0 else None
+        for i in range(start, height):
+            current = self.get_block(i)
+            if previous is not None and current["previous_hash"] != previous["hash"]:
+                return False
+            if current["merkle_root"] != self.merkle_root(current["transactions"]):
                 return False
-            if current["hash"] != self.hash_block(
-                current["data"], current["previous_hash"]
-            ):
+            if current["hash"] != self.hash_block(current):
                 return False
+            previous = current
+        self.validated_height = height
         return True
 
 
+# Chunked envelope encryption
+# Layout: header | chunk 0 | chunk 1 | ... where the header is
+#   magic "SIPE", version, chunk size, wrapped-key length, RSA-OAEP wrapped AES-256 key, 8-byte nonce prefix
+# and every chunk is AES-GCM(plaintext block) + 16-byte tag. The nonce is prefix || chunk index;
+# the AAD binds the header digest, the chunk index and a final-chunk flag, so chunks cannot be
+# reordered, swapped between files or truncated away. All chunks but the last hold exactly
+# `chunk_size` plaintext bytes, which makes every chunk's offset computable for random access.
+# This is the engine only: the upload, download and bulk paths do not call it yet. Wiring it in
+# needs each user's RSA key pair stored server-side (UserManager keeps them in memory only).
+ENVELOPE_MAGIC = b"SIPE"
+ENVELOPE_VERSION = 1
+ENVELOPE_CHUNK_SIZE = 64 * 1024
+ENVELOPE_TAG_SIZE = 16
+_ENVELOPE_PREFIX = struct.Struct(">4sBIH")
+
+
+def _oaep():
+    return padding.OAEP(
+        mgf=padding.MGF1(algorithm=hashes.SHA256()),
+        algorithm=hashes.SHA256(),
+        label=None,
+    )
+
+
+def rechunk(chunks, size):
+    """Regroup an iterable of bytes into blocks of exactly `size` (the last may be shorter)."""
+    buffer = bytearray()
+    for chunk in chunks:
+        view = memoryview(chunk)
+        if buffer:
+            take = min(size - len(buffer), len(view))
+            buffer += view[:take]
+            view = view[take:]
+            if len(buffer) == size:
+                yield bytes(buffer)
+                buffer = bytearray()
+        # Whole blocks are sliced straight out of the incoming chunk
+        while len(view) >= size:
+            yield view[:size].tobytes()
+            view = view[size:]
+        buffer += view
+    if buffer:
+        yield bytes(buffer)
+
+
+class EnvelopeHeader:
+    def __init__(self, chunk_size, wrapped_key, nonce_prefix):
+        self.chunk_size = chunk_size
+        self.wrapped_key = wrapped_key
+        self.nonce_prefix = nonce_prefix
+
+    @property
+    def size(self):
+        return _ENVELOPE_PREFIX.size + len(self.wrapped_key) + len(self.nonce_prefix)
+
+    def to_bytes(self):
+        prefix = _ENVELOPE_PREFIX.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, self.chunk_size, len(self.wrapped_key))
+        return prefix + self.wrapped_key + self.nonce_prefix
+
+    @classmethod
+    def parse(cls, data):
+        """Parse a header from the start of `data`; returns None if more bytes are needed."""
+        if len(data) < _ENVELOPE_PREFIX.size:
+            return None
+        magic, version, chunk_size, key_length = _ENVELOPE_PREFIX.unpack_from(data)
+        if magic != ENVELOPE_MAGIC or version != ENVELOPE_VERSION:
+            raise ValueError("Not an encrypted envelope (bad magic or version).")
+        end = _ENVELOPE_PREFIX.size + key_length + 8
+        if len(data) < end:
+            return None
+        return cls(chunk_size, bytes(data[_ENVELOPE_PREFIX.size:end - 8]), bytes(data[end - 8:end]))
+
+
+class EnvelopeCipher:
+    """AES-256-GCM over fixed-size chunks with a per-file data key wrapped by RSA-OAEP."""
+
+    def __init__(self, header, data_key):
+        self.header = header
+        self._aead = AESGCM(data_key)
+        self._header_digest = hashlib.sha256(header.to_bytes()).digest()
+
+    @classmethod
+    def create(cls, public_key, chunk_size=ENVELOPE_CHUNK_SIZE):
+        data_key = AESGCM.generate_key(bit_length=256)
+        header = EnvelopeHeader(chunk_size, public_key.encrypt(data_key, _oaep()), os.urandom(8))
+        return cls(header, data_key)
+
+    @classmethod
+    def open(cls, header, private_key):
+        return cls(header, private_key.decrypt(header.wrapped_key, _oaep()))
+
+    def _nonce(self, index):
+        return self.header.nonce_prefix + struct.pack(">I", index)
+
+    def _aad(self, index, final):
+        return self._header_digest + struct.pack(">Q?", index, final)
+
+    def chunk_offset(self, index):
+        """Byte offset of ciphertext chunk `index` within the envelope."""
+        return self.header.size + index * (self.header.chunk_size + ENVELOPE_TAG_SIZE)
+
+    def encrypt_chunk(self, index, plaintext, final):
+        return self._aead.encrypt(self._nonce(index), plaintext, self._aad(index, final))
+
+    def decrypt_chunk(self, index, ciphertext, final=None):
+        """Decrypt one chunk; if `final` is unknown (random access) both flags are tried."""
+        for flag in ((final,) if final is not None else (False, True)):
+            try:
+                return self._aead.decrypt(self._nonce(index), ciphertext, self._aad(index, flag))
+            except InvalidTag:
+                continue
+        raise ValueError(f"Chunk {index} failed authentication.")
+
+
 # Secure Storage with Encryption
 class SecureIPFSStorage:
+    def __init__(self, api_addr=None, cache=None, backend=None):
+        # Local IPFS node API, e.g. /dns/localhost/tcp/5001/http; connected on first use
+        self.api_addr = api_addr or os.getenv("IPFS_API_ADDR")
+        self._ipfs_client = None
+        self.cache = cache  # Optional content_cache.ContentCache; CIDs never change, so hits need no revalidation
+        self.backend = backend  # ipfs.backends.StorageBackend that new content is pinned to
+
+    @property
+    def has_local_node(self):
+        return bool(self.api_addr)
+
+    @property
+    def ipfs_client(self):
+        if self._ipfs_client is None:
+            if not self.api_addr:
+                raise RuntimeError("No local IPFS node configured (set IPFS_API_ADDR).")
+            import ipfshttpclient  # Only needed with a local node; slow to import
+            self._ipfs_client = ipfshttpclient.connect(self.api_addr)
+        return self._ipfs_client
+
     def encrypt_data(self, plaintext, public_key):
         return public_key.encrypt(
             plaintext.encode(),
@@ -73,14 +389,77 @@ class SecureIPFSStorage:
             ),
         ).decode()
 
-    def upload_to_ipfs(self, data):
-        with open("tempfile.txt", "wb") as f:
-            f.write(data)
-        result = self.ipfs_client.add("tempfile.txt")
-        return result["Hash"]
+    def encrypt_stream(self, chunks, public_key, chunk_size=ENVELOPE_CHUNK_SIZE):
+        """Envelope-encrypt an iterable of bytes, yielding the header then one ciphertext chunk at a time."""
+        cipher = EnvelopeCipher.create(public_key, chunk_size)
+        yield cipher.header.to_bytes()
+        index = 0
+        previous = None
+        # Hold one block back so the last one can be flagged as final
+        for block in rechunk(chunks, chunk_size):
+            if previous is not None:
+                yield cipher.encrypt_chunk(index, previous, final=False)
+                index += 1
+            previous = block
+        yield cipher.encrypt_chunk(index, previous or b"", final=True)
+
+    def decrypt_stream(self, chunks, private_key):
+        """Inverse of encrypt_stream; raises ValueError on tampering or truncation."""
+        chunks = iter(chunks)
+        buffer = bytearray()
+        header = None
+        while header is None:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError("Envelope ended inside its header.")
+            buffer += chunk
+            header = EnvelopeHeader.parse(buffer)
+        cipher = EnvelopeCipher.open(header, private_key)
+        remainder = bytes(buffer[header.size:])
+
+        index = 0
+        previous = None
+        ciphertext = itertools.chain([remainder], chunks)
+        for block in rechunk(ciphertext, header.chunk_size + ENVELOPE_TAG_SIZE):
+            if previous is not None:
+                yield cipher.decrypt_chunk(index, previous, final=False)
+                index += 1
+            previous = block
+        if previous is None:
+            raise ValueError("Envelope has no chunks.")
+        yield cipher.decrypt_chunk(index, previous, final=True)
 
-    def retrieve_from_ipfs(self, cid):
-        return self.ipfs_client.cat(cid)
+    def read_chunk(self, fileobj, index, private_key):
+        """Decrypt plaintext chunk `index` from a seekable envelope without reading the rest."""
+        fileobj.seek(0)
+        data = fileobj.read(_ENVELOPE_PREFIX.size)
+        _, _, _, key_length = _ENVELOPE_PREFIX.unpack(data)
+        header = EnvelopeHeader.parse(data + fileobj.read(key_length + 8))
+        cipher = EnvelopeCipher.open(header, private_key)
+        fileobj.seek(cipher.chunk_offset(index))
+        ciphertext = fileobj.read(header.chunk_size + ENVELOPE_TAG_SIZE)
+        if not ciphertext:
+            raise IndexError("Chunk index past the end of the envelope.")
+        return cipher.decrypt_chunk(index, ciphertext)
+
+    def upload_to_ipfs(self, data, filename="data", content_type="application/octet-stream"):
+        if self.backend is None:
+            raise RuntimeError("No storage backend configured.")
+        return self.backend.add(io.BytesIO(data), filename, content_type)
+
+    def retrieve_from_ipfs(self, cid, offset=0, length=None):
+        if self.cache is not None:
+            cached = self.cache.read(cid, offset, length)
+            if cached is not None:
+                return cached
+        data = self.ipfs_client.cat(cid, offset=offset, length=length)
+        if self.cache is not None and offset == 0 and length is None:
+            self.cache.put(cid, data)
+        return data
+
+    def stat_size(self, cid):
+        """Size in bytes of the file behind `cid` on the local node."""
+        return self.ipfs_client.files.stat(f"/ipfs/{cid}")["Size"]
 
 
 # User Management with RSA Key Pairs
@@ -91,11 +470,8 @@ class UserManager:
     def register_user(self, first_name, last_name, wallet_address, password):
         if wallet_address in self.users:
             return "Wallet address already registered."
-        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-        )
+        hashed_password = hashing.hash_bcrypt(password)
+        private_key = rsa_keys.take()
         public_key = private_key.public_key()
         self.users[wallet_address] = {
             "first_name": first_name,
@@ -113,7 +489,10 @@ class UserManager:
             print("Login Debug: User not found")  # Debugging
             return False, "User not found.", None  
 
-        if bcrypt.checkpw(password.encode(), user["password"]):
+        matches, new_hash = hashing.verify_bcrypt(user["password"], password)
+        if matches:
+            if new_hash:
+                user["password"] = new_hash
             print(f"Login Debug: User {user['first_name']} logged in with Wallet {wallet_address}")  # Debugging
             return True, f"Welcome {user['first_name']}!", user
 
@@ -0,0 +1,244 @@
+import hashlib
+import mimetypes
+import os
+import tarfile
+import tempfile
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+from models import db, File, ChainJob, ContentIndex
+from content_index import remember_cid
+from ipfs import pin_queue
+from streaming import CHUNK_SIZE
+from metrics import timed
+
+# Bulk ingest for many files at once (POST /upload/bulk and `flask bulk-upload`).
+# Archives are expanded here, within MAX_FILES files and MAX_BYTES uncompressed bytes per
+# batch: members are checked against the sizes in the archive headers before they are
+# extracted, and the batch stops at the first file over either limit. Every file is hashed first, the content index is checked for all digests in one query,
+# the misses are pinned WORKERS at a time (identical files in the batch are pinned once),
+# and all File rows plus the chain jobs for new CIDs go in with two bulk INSERTs and a
+# single commit. The result is a per-file manifest.
+WORKERS = int(os.getenv("BULK_UPLOAD_WORKERS", "8"))  # Concurrent Pinata uploads per bulk request
+MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "1000"))
+MAX_BYTES = int(os.getenv("BULK_UPLOAD_MAX_BYTES", str(1024 * 1024 * 1024)))  # Uncompressed, per batch
+SPOOL_MEMORY = 256 * 1024  # Per file; a large batch must not hold every body in RAM
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+class LimitExceeded(Exception):
+    """The batch has more files or bytes than MAX_FILES / MAX_BYTES allow."""
+
+
+class Budget:
+    """Files and uncompressed bytes used so far by one batch."""
+
+    def __init__(self, max_files=MAX_FILES, max_bytes=MAX_BYTES):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.files = 0
+        self.bytes = 0
+
+    def check(self, size=0):
+        """Raise LimitExceeded unless one more file of `size` bytes fits."""
+        if self.files + 1 > self.max_files:
+            raise LimitExceeded(f"Bulk uploads are limited to {self.max_files} files")
+        if self.bytes + size > self.max_bytes:
+            raise LimitExceeded(f"Bulk uploads are limited to {self.max_bytes} bytes")
+
+    def add_file(self):
+        self.check()
+        self.files += 1
+
+    def add_bytes(self, size):
+        self.bytes += size
+        if self.bytes > self.max_bytes:
+            raise LimitExceeded(f"Bulk uploads are limited to {self.max_bytes} bytes")
+
+
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def expand(filename, f, budget):
+    """Yield (filename, fileobj) for `f`, or for each regular file inside it if it is an archive.
+
+    Each member's size from the archive header is checked against `budget` before it is opened.
+    """
+    if not is_archive(filename):
+        yield filename, f
+        return
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    budget.check(info.file_size)  # ZipExtFile never returns more than file_size bytes
+                    with archive.open(info) as member:
+                        yield os.path.basename(info.filename), member
+    else:
+        with tarfile.open(fileobj=f, mode="r:*") as archive:
+            for info in archive:
+                if info.isfile():
+                    budget.check(info.size)
+                    yield os.path.basename(info.name), archive.extractfile(info)
+
+
+def iter_paths(paths):
+    """(filename, fileobj) for files and the files under directories; ingest expands archives."""
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files = [path]
+        for file_path in files:
+            with open(file_path, "rb") as f:
+                yield os.path.basename(file_path), f
+
+
+def spool_and_hash(f, budget):
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+            budget.add_bytes(len(data))  # Stops a file that is bigger than it claimed to be
+            digest.update(data)
+            spooled.write(data)
+            size += len(data)
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled, digest.hexdigest(), size
+
+
+def store_index(pinned):
+    """Insert content_index rows for new digests in one statement, one by one if another upload raced us."""
+    if not pinned:
+        return
+    try:
+        db.session.execute(insert(ContentIndex), pinned)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        for row in pinned:
+            remember_cid(row["sha256"], row["cid"], row["size"])
+
+
+def manifest(entries):
+    files = [{key: value for key, value in entry.items() if key != "body"} for entry in entries]
+    return {"files": files, "summary": dict(Counter(entry["status"] for entry in files))}
+
+
+@timed("bulk_upload")
+def ingest(owner_wallet, sources, pin, allowed, budget=None):
+    """Pin and record every (filename, fileobj) in `sources`, archives expanded, for `owner_wallet`;
+    returns the manifest.
+
+    `pin(fileobj, filename, content_type)` returns a CID; `allowed(filename)` filters file types.
+    `budget` defaults to MAX_FILES files and MAX_BYTES bytes.
+    """
+    entries = []
+    budget = budget or Budget()
+    try:
+        with timed("receive_and_hash"):
+            try:
+                for source_name, source in sources:
+                    for name, f in expand(source_name, source, budget):
+                        budget.add_file()
+                        filename = secure_filename(name)
+                        entry = {"filename": filename or name, "status": None}
+                        entries.append(entry)
+                        if not filename or not allowed(filename):
+                            entry.update(status="rejected", error="Invalid file type")
+                        else:
+                            entry["body"], entry["sha256"], entry["size"] = spool_and_hash(f, budget)
+            except LimitExceeded as e:
+                # Nothing more is read; the file that crossed the limit (if it was started) is rejected too
+                if entries and entries[-1]["status"] is None and "body" not in entries[-1]:
+                    entries[-1].update(status="rejected", error=str(e))
+                else:
+                    entries.append({"filename": None, "status": "rejected", "error": str(e)})
+
+        accepted = [entry for entry in entries if "body" in entry]
+        digests = {entry["sha256"] for entry in accepted}
+        known = dict(db.session.query(ContentIndex.sha256, ContentIndex.cid).filter(ContentIndex.sha256.in_(digests)))
+
+        # Pin each unknown digest once, a bounded number at a time
+        first = {}
+        for entry in accepted:
+            if entry["sha256"] not in known:
+                first.setdefault(entry["sha256"], entry)
+        with ThreadPoolExecutor(max(min(WORKERS, len(first)), 1)) as pool:
+            futures = {
+                digest: pool.submit(pin, entry["body"], entry["filename"],
+                                    mimetypes.guess_type(entry["filename"])[0] or "application/octet-stream")
+                for digest, entry in first.items()
+            }
+        pinned = []
+        failed = {}
+        for digest, future in futures.items():
+            try:
+                known[digest] = future.result()
+            except Exception as e:
+                print(f"Error: bulk pin of {first[digest]['filename']} failed: {e}")
+                failed[digest] = str(e)
+                continue
+            first[digest]["status"] = "pinned"
+            pinned.append({"sha256": digest, "cid": known[digest], "size": first[digest]["size"]})
+        if not pin_queue.ASYNC:  # Queued pins are indexed by the pin worker once they succeed
+            store_index(pinned)
+        # Copies of a file whose pin failed are not recorded either
+        for entry in accepted:
+            if entry["sha256"] in failed:
+                entry.update(status="failed", error=failed[entry["sha256"]])
+
+        # Same rules as record_upload: only a CID never logged before gets a chain job;
+        # copies reuse the earliest landed tx hash, or are "deduplicated" until it lands
+        recorded = [entry for entry in accepted if entry["sha256"] in known]
+        for entry in recorded:
+            entry["cid"] = known[entry["sha256"]]
+        logged = set()
+        previous = {}
+        existing = (
+            db.session.query(File.file_hash, File.tx_hash, File.tx_status)
+            .filter(File.file_hash.in_({entry["cid"] for entry in recorded}))
+            .order_by(File.id)
+        )
+        for file_hash, tx_hash, tx_status in existing:
+            logged.add(file_hash)
+            if tx_hash and file_hash not in previous:
+                previous[file_hash] = (tx_hash, tx_status)
+
+        rows = []
+        for entry in recorded:
+            row = {"file_hash": entry["cid"], "owner_wallet": owner_wallet}
+            if entry["cid"] in logged:
+                row["tx_hash"], row["tx_status"] = previous.get(entry["cid"], (None, "deduplicated"))
+            else:
+                row["tx_hash"], row["tx_status"] = None, "pending"
+                logged.add(entry["cid"])
+            entry["status"] = entry["status"] or "deduplicated"
+            rows.append(row)
+
+        if rows:
+            with timed("db_commit"):
+                ids = db.session.scalars(insert(File).returning(File.id, sort_by_parameter_order=True), rows).all()
+                jobs = [
+                    {"file_id": file_id, "file_hash": row["file_hash"], "owner_wallet": owner_wallet}
+                    for file_id, row in zip(ids, rows) if row["tx_status"] == "pending"
+                ]
+                if jobs:
+                    db.session.execute(insert(ChainJob), jobs)
+                db.session.commit()
+            for entry, file_id, row in zip(recorded, ids, rows):
+                entry.update(file_id=file_id, tx_status=row["tx_status"])
+            print(f"Bulk upload: {len(rows)} files recorded, {len(jobs)} chain logs queued")
+    finally:
+        for entry in entries:
+            if "body" in entry:
+                entry["body"].close()
+    return manifest(entries)
@@ -0,0 +1,220 @@
+import fcntl
+import io
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# CIDs are content addresses, so a cached copy never goes stale and needs no revalidation.
+# Two tiers: a small per-process memory LRU for hot small files, and a size-bounded disk
+# directory shared by every gunicorn worker on the box. Disk entries are written to a temp
+# file and os.replace()d into place, so readers only ever see complete files; eviction is
+# LRU by mtime (bumped on every hit) and serialized across processes with an flock.
+CACHE_DIR = os.getenv("CONTENT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "secure-storage-cache"))
+MAX_DISK_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+MAX_MEMORY_BYTES = int(os.getenv("CONTENT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+MAX_MEMORY_ENTRY = int(os.getenv("CONTENT_CACHE_MEMORY_ENTRY_BYTES", str(1024 * 1024)))
+TOUCH_INTERVAL = 60  # Seconds; mtime is only bumped this often per entry to keep hits cheap
+RECOUNT_INTERVAL = 30  # Seconds; other workers' writes are only seen when the directory is recounted
+
+DEFAULT_TYPE = "application/octet-stream"
+
+
+class ContentCache:
+    def __init__(self, directory=CACHE_DIR, max_disk_bytes=MAX_DISK_BYTES,
+                 max_memory_bytes=MAX_MEMORY_BYTES, max_memory_entry=MAX_MEMORY_ENTRY):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.max_memory_entry = max_memory_entry
+        self._memory = OrderedDict()  # cid -> (bytes, content_type)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_estimate = None  # Bytes on disk as last counted by this process, plus its own writes since
+        self._counted_at = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, cid):
+        return os.path.join(self.directory, cid[-2:], cid)
+
+    # Memory tier
+
+    def _remember(self, cid, data, content_type):
+        if len(data) > self.max_memory_entry or len(data) > self.max_memory_bytes:
+            return
+        with self._lock:
+            if cid in self._memory:
+                self._memory.move_to_end(cid)
+                return
+            self._memory[cid] = (data, content_type)
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (evicted, _) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _recall(self, cid):
+        with self._lock:
+            entry = self._memory.get(cid)
+            if entry is not None:
+                self._memory.move_to_end(cid)
+            return entry
+
+    # Lookups
+
+    def lookup(self, cid):
+        """(source, size, content_type) for a cached CID, or None.
+
+        `source` is a path on disk (for sendfile) or a BytesIO from the memory tier.
+        """
+        entry = self._recall(cid)
+        if entry is not None:
+            data, content_type = entry
+            return io.BytesIO(data), len(data), content_type
+        path = self.path(cid)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if time.time() - stat.st_mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return None  # Evicted under us
+        content_type = self._read_type(path)
+        if stat.st_size <= self.max_memory_entry:
+            with open(path, "rb") as f:
+                self._remember(cid, f.read(), content_type)
+        return path, stat.st_size, content_type
+
+    def read(self, cid, offset=0, length=None):
+        """Bytes of a cached CID (optionally a slice, read through mmap), or None."""
+        entry = self._recall(cid)
+        if entry is not None:
+            data = entry[0]
+            return data[offset:None if length is None else offset + length]
+        try:
+            with open(self.path(cid), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[offset:None if length is None else offset + length]
+        except FileNotFoundError:
+            return None
+
+    # Stores
+
+    def put(self, cid, data, content_type=DEFAULT_TYPE):
+        self._remember(cid, data, content_type)
+        for _ in self.tee(cid, [data], len(data), content_type):
+            pass
+
+    def writer(self, cid, expected_size=None, content_type=DEFAULT_TYPE):
+        """CacheWriter for a body about to be streamed, or None if it would not fit the disk tier."""
+        if self.max_disk_bytes <= 0 or (expected_size or 0) > self.max_disk_bytes:
+            return None
+        return CacheWriter(self, cid, expected_size, content_type)
+
+    def tee(self, cid, chunks, expected_size=None, content_type=DEFAULT_TYPE):
+        """Yield `chunks` unchanged; if they are read to the end, also store them in the disk tier."""
+        writer = self.writer(cid, expected_size, content_type)
+        if writer is None:
+            yield from chunks
+            return
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+                yield chunk
+            # A client that disconnects mid-stream never gets here, so partial bodies are never cached
+            writer.commit()
+        finally:
+            writer.abort()
+
+    def _commit(self, cid, temp_path, size, content_type):
+        path = self.path(cid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if content_type and content_type != DEFAULT_TYPE:
+            with open(path + ".type", "w") as f:
+                f.write(content_type)
+        os.replace(temp_path, path)
+        self._evict(size)
+
+    def _read_type(self, path):
+        try:
+            with open(path + ".type") as f:
+                return f.read().strip() or DEFAULT_TYPE
+        except FileNotFoundError:
+            return DEFAULT_TYPE
+
+    def _evict(self, added):
+        if self._disk_estimate is not None and time.time() - self._counted_at < RECOUNT_INTERVAL:
+            self._disk_estimate += added
+            if self._disk_estimate <= self.max_disk_bytes:
+                return
+        # Another worker may be evicting too; take the directory lock and recount.
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = []
+            total = 0
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith((".type", ".part")):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_disk_bytes:
+                    break
+                for victim in (path, path + ".type"):
+                    try:
+                        os.remove(victim)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+            self._disk_estimate = total
+            self._counted_at = time.time()
+
+
+class CacheWriter:
+    """Collects one body in a temp file next to its final path; commit() publishes it atomically."""
+
+    def __init__(self, cache, cid, expected_size, content_type):
+        self.cache = cache
+        self.cid = cid
+        self.expected_size = expected_size
+        self.content_type = content_type
+        self.size = 0
+        directory = os.path.dirname(cache.path(cid))
+        os.makedirs(directory, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        """Publish the body if it is complete; otherwise discard it."""
+        self._file.close()
+        if self.expected_size is None or self.size == self.expected_size:
+            self.cache._commit(self.cid, self.temp_path, self.size, self.content_type)
+            self.temp_path = None
+        else:
+            self.abort()
+
+    def abort(self):
+        self._file.close()
+        if self.temp_path:
+            os.remove(self.temp_path)
+            self.temp_path = None
+
+
+cache = ContentCache()
@@ -0,0 +1,43 @@
+from sqlalchemy.exc import IntegrityError
+from models import db, File, ContentIndex
+
+
+def find_cid(digest):
+    """CID already pinned for content with this SHA-256, or None."""
+    row = db.session.get(ContentIndex, digest)
+    return row.cid if row else None
+
+
+def remember_cid(digest, cid, size):
+    if db.session.get(ContentIndex, digest):
+        return
+    db.session.add(ContentIndex(sha256=digest, cid=cid, size=size))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # a concurrent upload of the same bytes recorded it first
+
+
+def attach_existing_log(file):
+    """Reuse the chain log of an earlier File with the same CID instead of logging it again.
+
+    If the earlier log has no tx hash yet, the worker copies it over when it lands.
+    """
+    previous = (
+        File.query
+        .filter(File.file_hash == file.file_hash, File.tx_hash.isnot(None))
+        .order_by(File.id)
+        .first()
+    )
+    if previous:
+        file.tx_hash = previous.tx_hash
+        file.tx_status = previous.tx_status
+    else:
+        file.tx_status = "deduplicated"
+
+
+def propagate_to_duplicates(file_hash, txn_hash, status):
+    """Copy a landed tx hash onto deduplicated uploads of the same CID."""
+    File.query.filter(File.file_hash == file_hash, File.tx_status == "deduplicated").update(
+        {File.tx_hash: txn_hash, File.tx_status: status}, synchronize_session=False
+    )
@@ -0,0 +1,79 @@
+import os
+from contextlib import contextmanager
+from flask_sqlalchemy.session import Session
+
+# Connection pool settings, read-replica routing and per-worker pool warming for db.
+# Each gunicorn worker keeps up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections per engine,
+# so size them against the plan's connection limit divided by WEB_CONCURRENCY (plus the
+# chain and pin workers). With DATABASE_REPLICA_URL set, SELECTs issued inside
+# replica_reads() go to the replica; writes and everything else stay on the primary.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds; replace connections before the server drops them
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+WARM_CONNECTIONS = int(os.getenv("DB_POOL_WARM", str(min(POOL_SIZE, int(os.getenv("GUNICORN_THREADS", "1"))))))
+REPLICA = "replica"  # Bind key of the read replica
+
+
+def database_url(url):
+    """Fix 'postgres://' to 'postgresql://' (required for SQLAlchemy)."""
+    if url and url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+def engine_options(url):
+    options = {"pool_pre_ping": POOL_PRE_PING, "pool_recycle": POOL_RECYCLE}
+    if url and not url.startswith("sqlite"):  # SQLite's default pools take no sizing arguments
+        options.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT)
+    return options
+
+
+def configure(app, url, replica_url=None):
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(url)
+    if replica_url:
+        app.config["SQLALCHEMY_BINDS"] = {REPLICA: {"url": replica_url, **engine_options(replica_url)}}
+
+
+class RoutingSession(Session):
+    """db.session that sends SELECTs to the replica while `use_replica` is set (see replica_reads)."""
+    use_replica = False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (self.use_replica and bind is None and not self._flushing
+                and getattr(clause, "is_select", False) and REPLICA in self._db.engines):
+            return self._db.engines[REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def replica_reads(scoped_session):
+    """Route this context's reads to the replica, if one is configured. Replicas lag, so only
+    wrap queries that can tolerate slightly stale rows."""
+    current = scoped_session()
+    previous = current.use_replica
+    current.use_replica = True
+    try:
+        yield current
+    finally:
+        current.use_replica = previous
+
+
+def warm_pool(app, db, connections=WARM_CONNECTIONS):
+    """Open `connections` connections on every engine and hand them back to the pool, so the
+    first requests a worker serves do not pay for connection setup."""
+    with app.app_context():
+        for key, engine in db.engines.items():
+            opened = []
+            try:
+                for _ in range(connections):
+                    conn = engine.connect()
+                    opened.append(conn)
+                    conn.exec_driver_sql("SELECT 1")
+            except Exception as e:
+                print(f"Could not warm the {key or 'primary'} database pool: {e}")
+            finally:
+                for conn in opened:
+                    conn.close()
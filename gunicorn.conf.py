@@ -0,0 +1,21 @@
+import os
+
+# gunicorn -c gunicorn.conf.py
+# SERVE_MODE=async serves the I/O-bound routes from async_app on aiohttp workers (one
+# event loop per process); the default keeps the plain Flask app on threaded sync workers.
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+
+if os.getenv("SERVE_MODE") == "async":
+    wsgi_app = "async_app:app"
+    worker_class = "aiohttp.GunicornWebWorker"
+else:
+    wsgi_app = "app:app"
+    threads = int(os.getenv("GUNICORN_THREADS", "1"))
+
+
+def post_worker_init(worker):
+    # Open this worker's database connections before it takes traffic (DB_POOL_WARM per engine)
+    from app import app, db
+    from database import warm_pool
+    warm_pool(app, db)
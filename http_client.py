@@ -0,0 +1,89 @@
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Each gunicorn worker process gets its own pools. A sync worker runs one request at a
+# time per thread, so the pool only needs one connection per thread plus a few for
+# background threads (chain worker, pollers); extra connections would just sit idle.
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", str(int(os.getenv("GUNICORN_THREADS", "1")) + 4)))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))  # Seconds; doubled per attempt, plus up to this much jitter
+MAX_BACKOFF = float(os.getenv("HTTP_MAX_BACKOFF", "10"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Upstreams whose POSTs may be replayed by urllib3 itself. JSON-RPC calls are safe to
+# resend; Pinata uploads often have one-shot streaming bodies and use send_with_retry.
+POST_RETRY_UPSTREAMS = {"rpc"}
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def _build_session(name):
+    methods = set(Retry.DEFAULT_ALLOWED_METHODS)
+    if name in POST_RETRY_UPSTREAMS:
+        methods.add("POST")
+    retry = Retry(
+        total=RETRIES,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(methods),
+        backoff_factor=BACKOFF,
+        backoff_jitter=BACKOFF,
+        backoff_max=MAX_BACKOFF,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(name):
+    """Keep-alive session for one upstream ("pinata", "rpc", "gateway", ...), shared by all threads."""
+    session = _sessions.get(name)
+    if session is None:
+        with _lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = _build_session(name)
+    return session
+
+
+def backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF)
+        except ValueError:
+            pass  # HTTP-date form; fall back to exponential backoff
+    return min(BACKOFF * 2 ** attempt + random.uniform(0, BACKOFF), MAX_BACKOFF)
+
+
+def send_with_retry(session, method, url, body_factory, attempts=RETRIES + 1, **kwargs):
+    """Send a request whose body is rebuilt by body_factory() for every attempt.
+
+    Retries connection errors, timeouts and 429/5xx responses with jittered
+    exponential backoff (honouring Retry-After). Returns the last response.
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            response = session.request(method, url, data=body_factory(), **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if last_attempt:
+                raise
+            print(f"HTTP retry {attempt + 1}/{attempts - 1} for {url}: {e}")
+            time.sleep(backoff_delay(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or last_attempt:
+            return response
+        print(f"HTTP retry {attempt + 1}/{attempts - 1} for {url}: status {response.status_code}")
+        time.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
@@ -0,0 +1,90 @@
+import json
+import secrets
+import tempfile
+from abc import ABC, abstractmethod
+import http_client
+from ipfs.car import write_car
+from streaming import multipart_body, iter_file, SPOOL_MAX_MEMORY
+
+# Where pinned content goes. Every backend takes either a seekable file (replayed on retry)
+# or a one-shot iterable of bytes, and returns the CIDv0 of the content, the same CID
+# ipfs.unixfs computes locally.
+
+
+class StorageBackend(ABC):
+    name = None
+
+    @abstractmethod
+    def add(self, source, filename, content_type="application/octet-stream"):
+        """Pin `source` and return its CID."""
+
+
+class PinataBackend(StorageBackend):
+    """Pinata's pinFileToIPFS over the shared keep-alive pool, bodies sent with chunked encoding."""
+    name = "pinata"
+
+    def __init__(self, api_url, api_key, secret_api_key):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.secret_api_key = secret_api_key
+
+    def headers(self, boundary):
+        return {
+            "pinata_api_key": self.api_key,
+            "pinata_secret_api_key": self.secret_api_key,
+            "Content-Type": f"multipart/form-data; boundary={boundary}"
+        }
+
+    def add(self, source, filename, content_type="application/octet-stream"):
+        url = f"{self.api_url}/pinning/pinFileToIPFS"
+        boundary = secrets.token_hex(16)
+
+        if hasattr(source, "seek"):
+            def body():
+                source.seek(0)
+                return multipart_body(iter_file(source), filename, content_type, boundary)
+            attempts = http_client.RETRIES + 1
+        else:
+            body = lambda: multipart_body(source, filename, content_type, boundary)
+            attempts = 1  # a streamed request body cannot be replayed
+
+        response = http_client.send_with_retry(
+            http_client.get_session("pinata"), "POST", url, body, attempts=attempts, headers=self.headers(boundary)
+        )
+        if response.status_code == 200:
+            return response.json()["IpfsHash"]
+        raise Exception(f"Failed to upload to IPFS: {response.text}")
+
+
+class LocalNodeBackend(StorageBackend):
+    """A Kubo node's HTTP API. The DAG is built here and handed over with `dag import`, pinned, as a CAR."""
+    name = "local"
+
+    def __init__(self, api_url):
+        self.api_url = api_url.rstrip("/")
+
+    def add(self, source, filename, content_type="application/octet-stream"):
+        if hasattr(source, "seek"):
+            source.seek(0)
+            source = iter_file(source)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as car:
+            cid = write_car(source, car)
+            boundary = secrets.token_hex(16)
+
+            def body():
+                car.seek(0)
+                return multipart_body(iter_file(car), f"{cid}.car", "application/vnd.ipld.car", boundary)
+
+            response = http_client.send_with_retry(
+                http_client.get_session("ipfs"), "POST", f"{self.api_url}/api/v0/dag/import?pin-roots=true", body,
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            )
+        if response.status_code != 200:
+            raise Exception(f"IPFS node refused the import: {response.text}")
+        for line in response.text.splitlines():
+            root = json.loads(line).get("Root")
+            if root and root["Cid"]["/"] == cid:
+                if root.get("PinErrorMsg"):
+                    raise Exception(f"IPFS node could not pin {cid}: {root['PinErrorMsg']}")
+                return cid
+        raise Exception(f"IPFS node did not report {cid} as imported: {response.text}")
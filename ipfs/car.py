@@ -0,0 +1,61 @@
+from ipfs.unixfs import Importer, cid_string, varint
+from streaming import CHUNK_SIZE
+
+# CARv1 (content-addressed archive) output for the UnixFS importer, the format a node's
+# `dag import` takes: a dag-cbor header naming the root, then one varint-framed
+# (CID, block) section per block. The root is only known once the last block is written,
+# but a CIDv0 always has the same length, so a placeholder header is written first and
+# overwritten at the end.
+
+
+def car_header(root):
+    """Varint-framed dag-cbor {"roots": [root], "version": 1} for a CIDv0 multihash."""
+    cid = b"\x00" + root  # dag-cbor CIDs (tag 42) carry a leading multibase identity byte
+    header = b"\xa2" + b"\x65roots" + b"\x81\xd8\x2a\x58" + bytes([len(cid)]) + cid + b"\x67version\x01"
+    return varint(len(header)) + header
+
+
+def write_car(chunks, out):
+    """Import an iterable of bytes as UnixFS and write it to the seekable file `out` as a CAR; returns the CID."""
+    start = out.tell()
+    placeholder = car_header(b"\x12\x20" + bytes(32))
+    out.write(placeholder)
+
+    def emit(digest, block):
+        out.write(varint(len(digest) + len(block)))
+        out.write(digest)
+        out.write(block)
+
+    root, _ = Importer(emit).add(chunks)
+    end = out.tell()
+    out.seek(start)
+    out.write(car_header(root))
+    out.seek(end)
+    return cid_string(root)
+
+
+def write_car_file(fileobj, out):
+    return write_car(iter(lambda: fileobj.read(CHUNK_SIZE), b""), out)
+
+
+def read_car(f):
+    """(root multihash, [(multihash, block)]) from a CARv1 written by write_car."""
+    def read_varint():
+        value = shift = 0
+        while True:
+            byte = f.read(1)
+            if not byte:
+                return None
+            value |= (byte[0] & 0x7F) << shift
+            if byte[0] < 0x80:
+                return value
+            shift += 7
+
+    header = f.read(read_varint())
+    root = header[header.index(b"\xd8\x2a") + 5:header.index(b"\x67version")]
+    blocks = []
+    while (length := read_varint()) is not None:
+        section = f.read(length)
+        blocks.append((section[:34], section[34:]))
+    return root, blocks
+
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, PinJob, PinSpoolChunk
+import job_queue
+from content_index import remember_cid
+from ipfs.unixfs import Importer, cid_string
+from streaming import iter_file, SPOOL_MAX_MEMORY
+from content_cache import cache as content_cache, DEFAULT_TYPE
+
+# Asynchronous pinning (PIN_MODE=async). The upload request computes the CID in-process,
+# stores the bytes in pin_spool_chunk rows and queues a PinJob, so it returns without any
+# network I/O to the storage backend; File rows and chain logs use the CID straight away.
+# The spool is in the database so the pin worker (`flask pin-worker`, or PIN_WORKER_INLINE=1)
+# and every web dyno see it, whichever machine took the upload. The worker pushes spooled
+# files to the backend, checks it reports the same CID and then deletes the spool rows.
+# Until then downloads are served from the spool, through the local content cache.
+ASYNC = os.getenv("PIN_MODE") == "async"
+SPOOL_CHUNK_SIZE = int(os.getenv("PIN_SPOOL_CHUNK_BYTES", str(1024 * 1024)))  # Bytes per pin_spool_chunk row
+POLL_INTERVAL = float(os.getenv("PIN_WORKER_INTERVAL", "2"))
+BATCH_SIZE = int(os.getenv("PIN_WORKER_BATCH", "10"))
+MAX_ATTEMPTS = int(os.getenv("PIN_JOB_MAX_ATTEMPTS", "8"))
+PROCESSING_TIMEOUT = timedelta(seconds=int(os.getenv("PIN_JOB_TIMEOUT", "900")))  # Reclaim jobs from crashed workers
+
+
+def iter_spool(cid):
+    """Yield the spooled bytes of `cid`, one row at a time."""
+    positions = [
+        position for (position,) in
+        db.session.query(PinSpoolChunk.position).filter_by(cid=cid).order_by(PinSpoolChunk.position)
+    ]
+    for position in positions:
+        yield db.session.query(PinSpoolChunk.data).filter_by(cid=cid, position=position).scalar()
+
+
+def open_spool(cid, digest=None):
+    """The spooled bytes of `cid` as a seekable temp file (in memory while small), also fed to `digest`."""
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    for data in iter_spool(cid):
+        f.write(data)
+        if digest is not None:
+            digest.update(data)
+    f.seek(0)
+    return f
+
+
+def lookup(cid):
+    """(source, size, content_type) of content still waiting to be pinned, or None (content_cache.lookup shape)."""
+    if not ASYNC:
+        return None  # Nothing is spooled, so cache misses skip the query
+    job = (
+        PinJob.query
+        .filter(PinJob.cid == cid, PinJob.status != "pinned")
+        .order_by(PinJob.id)
+        .first()
+    )
+    if job is None or not db.session.query(PinSpoolChunk.cid).filter_by(cid=cid).first():
+        return None
+    # Copy it into the local content cache once; later downloads on this box are cache hits
+    for _ in content_cache.tee(cid, iter_spool(cid), job.size, job.content_type):
+        pass
+    return content_cache.lookup(cid) or (open_spool(cid), job.size, job.content_type)
+
+
+def spool(source, content_type):
+    """Store `source` (seekable file or iterable of bytes) in the spool while computing its CID; returns (cid, size)."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+        source = iter_file(source)
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as f:
+        def write_through(chunks):
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        root, size = Importer().add(write_through(source))
+        cid = cid_string(root)
+        if db.session.query(PinSpoolChunk.cid).filter_by(cid=cid).first():
+            return cid, size  # Already waiting to be pinned
+        f.seek(0)
+        position = 0
+        try:
+            while True:
+                data = f.read(SPOOL_CHUNK_SIZE)
+                if position and not data:
+                    break
+                db.session.add(PinSpoolChunk(cid=cid, position=position, data=data))  # An empty file is one empty row
+                db.session.flush()  # One chunk in memory at a time
+                position += 1
+                if len(data) < SPOOL_CHUNK_SIZE:
+                    break
+        except IntegrityError:
+            db.session.rollback()  # Spooled concurrently by another request; theirs is identical
+    return cid, size
+
+
+def enqueue_pin(source, filename, content_type):
+    """Spool `source`, queue its pin and commit; returns the CID."""
+    cid, size = spool(source, content_type)
+    db.session.add(PinJob(cid=cid, filename=filename, content_type=content_type or DEFAULT_TYPE, size=size))
+    db.session.commit()
+    return cid
+
+
+def claim_pins(limit=BATCH_SIZE):
+    """Mark up to `limit` due pins as processing. SKIP LOCKED lets several workers share the queue."""
+    return job_queue.claim(PinJob, limit, PROCESSING_TIMEOUT)
+
+
+def process_pin(job, backend):
+    spooled = db.session.query(PinSpoolChunk.cid).filter_by(cid=job.cid).first()
+    if not spooled and PinJob.query.filter_by(cid=job.cid, status="pinned").first():
+        # Queued just as an earlier job for the same content finished and cleared the spool
+        job.status = "pinned"
+        db.session.commit()
+        return
+    digest = hashlib.sha256()
+    try:
+        with open_spool(job.cid, digest) as f:
+            cid = backend.add(f, job.filename, job.content_type)
+        if cid != job.cid:
+            raise Exception(f"{backend.name} pinned {cid}, expected {job.cid}")
+    except Exception as e:
+        job_queue.retry_later(job, e, MAX_ATTEMPTS)  # A failed job keeps its spool rows for a manual retry
+        print(f"Pin of {job.cid} failed (attempt {job.attempts}): {e}")
+    else:
+        job.status = "pinned"
+        job.last_error = None
+    db.session.commit()
+    if job.status == "pinned":
+        # Only now may later uploads of the same bytes skip the pin (content_index dedup)
+        remember_cid(digest.hexdigest(), job.cid, job.size)
+        waiting = PinJob.query.filter(PinJob.cid == job.cid, PinJob.status.in_(("pending", "processing"))).count()
+        if not waiting:
+            PinSpoolChunk.query.filter_by(cid=job.cid).delete()
+            db.session.commit()
+
+
+def drain_pins(backend, limit=BATCH_SIZE):
+    """Pin one round of due jobs; returns how many were claimed."""
+    jobs = claim_pins(limit)
+    for job in jobs:
+        process_pin(job, backend)
+    return len(jobs)
+
+
+def run_pin_worker(app, backend, stop_event=None):
+    """Drain the pin queue until `stop_event` is set (forever if None)."""
+    print(f"Pin worker started ({backend.name} backend)")
+    job_queue.run_worker(app, "Pin worker", lambda: drain_pins(backend), POLL_INTERVAL, stop_event)
+
+
+def start_background_pin_worker(app, backend):
+    """Run the pin worker on a daemon thread inside this process."""
+    return job_queue.start_in_background(run_pin_worker, app, backend, name="pin-worker")
@@ -0,0 +1,140 @@
+import hashlib
+import base58
+from streaming import CHUNK_SIZE
+
+# In-process UnixFS importer that produces the same CIDv0 as `ipfs add` with its defaults
+# (and as Pinata's pinFileToIPFS): fixed 256 KiB chunks, dag-pb leaves holding UnixFS
+# File data, and a balanced tree of at most 174 links per node. Knowing the CID before any
+# network I/O lets uploads be recorded first and pinned later, and lets a node import the
+# blocks as a CAR file instead of re-chunking them.
+BLOCK_SIZE = 256 * 1024
+LINKS_PER_NODE = 174
+UNIXFS_FILE = 2
+
+
+def varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, payload):
+    """Length-delimited protobuf field."""
+    return varint(number << 3 | 2) + varint(len(payload)) + payload
+
+
+def _uint_field(number, value):
+    return varint(number << 3) + varint(value)
+
+
+def multihash(block):
+    return b"\x12\x20" + hashlib.sha256(block).digest()
+
+
+def cid_string(digest):
+    """Base58btc text form of a CIDv0 (which is just the sha2-256 multihash)."""
+    return base58.b58encode(digest).decode()
+
+
+def leaf_block(data):
+    unixfs = _uint_field(1, UNIXFS_FILE)
+    if data:
+        unixfs += _field(2, data)
+    unixfs += _uint_field(3, len(data))
+    return _field(1, unixfs)
+
+
+def branch_block(children):
+    """dag-pb node linking `children`, a list of (multihash, file size, cumulative DAG size)."""
+    links = b"".join(
+        _field(2, _field(1, digest) + _field(2, b"") + _uint_field(3, dag_size))
+        for digest, _, dag_size in children
+    )
+    unixfs = _uint_field(1, UNIXFS_FILE) + _uint_field(3, sum(size for _, size, _ in children))
+    unixfs += b"".join(_uint_field(4, size) for _, size, _ in children)
+    return links + _field(1, unixfs)
+
+
+def _blocks_of(chunks, block_size):
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= block_size:
+            yield bytes(buffer[:block_size])
+            del buffer[:block_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+class Importer:
+    """Builds the DAG for one file; `emit(multihash, block)` is called for every block, leaves first."""
+
+    def __init__(self, emit=None, block_size=BLOCK_SIZE, links_per_node=LINKS_PER_NODE):
+        self.emit = emit or (lambda digest, block: None)
+        self.block_size = block_size
+        self.links_per_node = links_per_node
+
+    def _store(self, block, file_size, dag_size):
+        digest = multihash(block)
+        self.emit(digest, block)
+        return digest, file_size, dag_size + len(block)
+
+    def _leaf(self, data):
+        return self._store(leaf_block(data), len(data), 0)
+
+    def _branch(self, children):
+        return self._store(branch_block(children), sum(c[1] for c in children), sum(c[2] for c in children))
+
+    def _fill(self, children, depth, pending):
+        """Add subtrees of `depth` - 1 levels to `children` until it is full or the data runs out."""
+        while len(children) < self.links_per_node and pending.peek() is not None:
+            if depth == 1:
+                children.append(self._leaf(pending.next()))
+            else:
+                subtree = []
+                self._fill(subtree, depth - 1, pending)
+                children.append(self._branch(subtree))
+        return children
+
+    def add(self, chunks):
+        """(multihash, file size) of the root for an iterable of bytes."""
+        pending = _Peekable(_blocks_of(chunks, self.block_size))
+        # The balanced layout: a single-block file is its own leaf; otherwise each new level
+        # takes the previous root as its first link and fills the rest with equal-depth subtrees
+        root = self._leaf(pending.next() or b"")
+        depth = 1
+        while pending.peek() is not None:
+            root = self._branch(self._fill([root], depth, pending))
+            depth += 1
+        return root[0], root[1]
+
+
+class _Peekable:
+    def __init__(self, iterator):
+        self._iterator = iterator
+        self._next = next(iterator, None)
+
+    def peek(self):
+        return self._next
+
+    def next(self):
+        value = self._next
+        self._next = next(self._iterator, None)
+        return value
+
+
+def compute_cid(fileobj, block_size=BLOCK_SIZE):
+    """CIDv0 of a file's contents as `ipfs add` would report it; reads `fileobj` to the end."""
+    digest, _ = Importer(block_size=block_size).add(iter(lambda: fileobj.read(CHUNK_SIZE), b""))
+    return cid_string(digest)
+
+
+def cid_of(data):
+    digest, _ = Importer().add([data])
+    return cid_string(digest)
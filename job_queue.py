@@ -0,0 +1,73 @@
+import threading
+from datetime import datetime, timedelta
+from models import db
+
+# Shared plumbing for the table-backed work queues (chain_job in blockchain/log_queue.py,
+# pin_job in ipfs/pin_queue.py). A job row has status, attempts, last_error, updated_at and
+# next_attempt_at; workers claim due rows with SKIP LOCKED, so any number of worker
+# processes can share a queue, and a job left "processing" by a crashed worker is claimed
+# again once its timeout has passed.
+
+
+def claim(model, limit, processing_timeout):
+    """Mark up to `limit` due `model` jobs as processing and commit; returns them."""
+    now = datetime.utcnow()
+    jobs = (
+        model.query
+        .filter(
+            db.or_(
+                db.and_(model.status == "pending", model.next_attempt_at <= now),
+                db.and_(model.status == "processing", model.updated_at <= now - processing_timeout),
+            )
+        )
+        .order_by(model.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in jobs:
+        job.status = "processing"
+        job.attempts += 1
+        job.updated_at = now
+    db.session.commit()
+    return jobs
+
+
+def retry_later(job, error, max_attempts):
+    """Record a failed attempt: back off exponentially, or give up after `max_attempts`. Returns the new status."""
+    job.last_error = str(error)
+    if job.attempts >= max_attempts:
+        job.status = "failed"
+    else:
+        job.status = "pending"
+        job.next_attempt_at = datetime.utcnow() + timedelta(seconds=2 ** job.attempts)
+    return job.status
+
+
+def run_worker(app, name, drain, interval, stop_event=None, after_round=None):
+    """Call `drain()` in an app context until `stop_event` is set (forever if None).
+
+    `drain` returns how much work it did; the worker sleeps `interval` seconds after a round
+    that did nothing. `after_round()`, if given, runs in the same app context after each round.
+    """
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                processed = drain()
+            except Exception as e:
+                db.session.rollback()
+                print(f"{name} error: {e}")
+                processed = 0
+            if after_round:
+                after_round()
+        if not processed:
+            stop_event.wait(interval)
+
+
+def start_in_background(target, *args, name):
+    """Run `target(*args, stop_event)` on a daemon thread; returns the stop event."""
+    stop_event = threading.Event()
+    thread = threading.Thread(target=target, args=(*args, stop_event), name=name, daemon=True)
+    thread.start()
+    return stop_event
@@ -0,0 +1,93 @@
+from sqlalchemy.exc import IntegrityError
+from models import db, LedgerBlock, LedgerTransaction
+from blockchain_system import LedgerConflict
+
+
+class SQLLedgerStore:
+    """Ledger store backed by the ledger_block / ledger_transaction tables.
+
+    Every worker sees the same chain. Rows are append-only: pending transactions
+    get a block position when they are sealed and blocks are never updated.
+    Must be used inside an app context.
+    """
+
+    def height(self):
+        top = db.session.query(db.func.max(LedgerBlock.position)).scalar()
+        return 0 if top is None else top + 1
+
+    def get(self, position):
+        row = db.session.get(LedgerBlock, position)
+        return self._to_block(row) if row else None
+
+    def find_hash(self, block_hash):
+        row = LedgerBlock.query.filter_by(block_hash=block_hash).first()
+        return self._to_block(row) if row else None
+
+    def locate(self, cid):
+        row = (
+            LedgerTransaction.query
+            .filter(LedgerTransaction.cid == cid, LedgerTransaction.block_position.isnot(None))
+            .order_by(LedgerTransaction.id.desc())
+            .first()
+        )
+        return (row.block_position, row.leaf_index) if row else None
+
+    def add_pending(self, transaction):
+        db.session.add(LedgerTransaction(**transaction))
+        db.session.commit()
+
+    def append(self, make_block, expected_position=None):
+        position = self.height()
+        if expected_position is not None and position != expected_position:
+            raise LedgerConflict(f"Block {expected_position} already exists.")
+        pending = (
+            LedgerTransaction.query
+            .filter(LedgerTransaction.block_position.is_(None))
+            .order_by(LedgerTransaction.id)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        block = make_block(position, [self._to_transaction(row) for row in pending])
+        db.session.add(LedgerBlock(
+            position=position,
+            block_hash=block["hash"],
+            previous_hash=block["previous_hash"],
+            merkle_root=block["merkle_root"],
+            timestamp=block["timestamp"],
+            data=block["data"],
+        ))
+        for leaf_index, row in enumerate(pending):
+            row.block_position = position
+            row.leaf_index = leaf_index
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise LedgerConflict(f"Block {position} already exists.")
+        return block
+
+    @staticmethod
+    def _to_transaction(row):
+        return {
+            "user_wallet": row.user_wallet,
+            "cid": row.cid,
+            "file_metadata": row.file_metadata,
+            "timestamp": row.timestamp,
+        }
+
+    def _to_block(self, row):
+        transactions = (
+            LedgerTransaction.query
+            .filter_by(block_position=row.position)
+            .order_by(LedgerTransaction.leaf_index)
+            .all()
+        )
+        return {
+            "index": row.position + 1,
+            "timestamp": row.timestamp,
+            "transactions": [self._to_transaction(t) for t in transactions],
+            "merkle_root": row.merkle_root,
+            "data": row.data,
+            "previous_hash": row.previous_hash,
+            "hash": row.block_hash,
+        }
@@ -0,0 +1,201 @@
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+from flask import g, request, Response
+
+# Latency histograms kept in memory per worker process.
+# Observations are appended to a lock-free deque on the request thread and folded
+# into the histograms by a background flusher (or on scrape), so recording a sample
+# costs one append. /metrics renders them in the Prometheus text format; every series
+# carries a `worker` label because each gunicorn worker keeps its own registry.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+
+HELP = {
+    "http_request_duration_seconds": "Time spent handling a request, by route.",
+    "span_duration_seconds": "Time spent in an instrumented phase (pinning, signing, DB commit, ...).",
+    "action_duration_seconds": "Duration of user-facing actions such as login or upload.",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            if seen + self.counts[i] >= rank:
+                fraction = (rank - seen) / self.counts[i] if self.counts[i] else 0
+                return lower + (bound - lower) * fraction
+            seen += self.counts[i]
+            lower = bound
+        return self.buckets[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._pending = deque()
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def observe(self, name, value, **labels):
+        self._pending.append((name, tuple(sorted(labels.items())), value))
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def _start_flusher(self):
+        # (Re)started per process so it survives gunicorn forking a preloaded app
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        thread = threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True)
+        thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            while self._pending:
+                name, labels, value = self._pending.popleft()
+                histogram = self._histograms.get((name, labels))
+                if histogram is None:
+                    histogram = self._histograms[(name, labels)] = Histogram()
+                histogram.observe(value)
+
+    def snapshot(self):
+        """Copy of all histograms as {(name, labels): Histogram}."""
+        self.flush()
+        with self._lock:
+            return dict(self._histograms)
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """All histograms in the Prometheus text exposition format."""
+        worker = str(os.getpid())
+        lines = []
+        by_name = {}
+        for (name, labels), histogram in sorted(self.snapshot().items()):
+            by_name.setdefault(name, []).append((labels, histogram))
+        for name, series in by_name.items():
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series:
+                base = ",".join([f'{key}="{_escape(value)}"' for key, value in labels] + [f'worker="{worker}"'])
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{base}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{base}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+# Start times of the open spans. A ContextVar (holding an immutable tuple) keeps each thread
+# and each asyncio task separate, so spans that span an `await` still pair up correctly.
+_span_starts = ContextVar("span_starts", default=())
+
+
+class timed:
+    """Time a span, as a context manager or a decorator (sync or async).
+
+        with timed("db_commit"):
+            db.session.commit()
+
+        @timed("upload_to_ipfs")
+        def upload_to_ipfs(...): ...
+
+    Records span_duration_seconds{span=..., outcome="ok"|"error"}.
+    """
+
+    def __init__(self, span):
+        self.span = span
+
+    def __enter__(self):
+        _span_starts.set(_span_starts.get() + (time.perf_counter(),))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        starts = _span_starts.get()
+        _span_starts.set(starts[:-1])
+        elapsed = time.perf_counter() - starts[-1]
+        registry.observe("span_duration_seconds", elapsed, span=self.span, outcome="error" if exc_type else "ok")
+        return False
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with self:
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def init_app(app):
+    """Record request durations per route and expose /metrics."""
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            registry.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - start,
+                route=route,
+                method=request.method,
+                status=str(response.status_code),
+            )
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
@@ -1,3 +1,4 @@
+from datetime import datetime
 from app import db
 
 class User(db.Model):
@@ -11,7 +12,171 @@ class User(db.Model):
 
 class File(db.Model):
     __tablename__ = "file"
+    __table_args__ = (db.Index("ix_file_owner_wallet_id", "owner_wallet", "id"),)  # History pages by wallet
 
     id = db.Column(db.Integer, primary_key=True)
-    file_hash = db.Column(db.String(255), nullable=False)
+    file_hash = db.Column(db.String(255), nullable=False, index=True)
     owner_wallet = db.Column(db.String(255), db.ForeignKey("users.wallet_address"), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, server_default=db.func.now())  # NULL for rows from before it was added
+    tx_hash = db.Column(db.String(66), nullable=True, index=True)
+    tx_status = db.Column(db.String(20), nullable=True)  # pending, batched, submitted, confirmed, failed
+    batch_id = db.Column(db.Integer, db.ForeignKey("chain_batch.id"), nullable=True)
+    leaf_index = db.Column(db.Integer, nullable=True)
+    merkle_proof = db.Column(db.Text, nullable=True)  # JSON list of [sibling_hex, side] up to the batch root
+
+class SubmittedTransaction:
+    """Columns the confirmation tracker needs to poll, and if necessary replace, a sent transaction."""
+    sender = db.Column(db.String(42), nullable=True)
+    nonce = db.Column(db.Integer, nullable=True)
+    fee_per_gas = db.Column(db.BigInteger, nullable=True)  # gasPrice, or maxFeePerGas for type-2 transactions
+    priority_fee_per_gas = db.Column(db.BigInteger, nullable=True)
+    submitted_at = db.Column(db.DateTime, nullable=True)
+    previous_tx_hashes = db.Column(db.Text, nullable=True)  # JSON list of hashes replaced by fee bumps
+    confirmed_block = db.Column(db.BigInteger, nullable=True)
+
+class ChainJob(SubmittedTransaction, db.Model):
+    __tablename__ = "chain_job"
+
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey("file.id"), nullable=False)
+    file_hash = db.Column(db.String(255), nullable=False)
+    owner_wallet = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)  # pending, processing, batched, submitted, confirmed, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    tx_hash = db.Column(db.String(66), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    batch_id = db.Column(db.Integer, db.ForeignKey("chain_batch.id"), nullable=True)
+
+    file = db.relationship("File")
+
+class ChainBatch(SubmittedTransaction, db.Model):
+    __tablename__ = "chain_batch"
+
+    id = db.Column(db.Integer, primary_key=True)
+    merkle_root = db.Column(db.String(64), unique=True, nullable=False)
+    file_count = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)  # pending, processing, submitted, confirmed, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    tx_hash = db.Column(db.String(66), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    jobs = db.relationship("ChainJob", backref="batch")
+
+class LedgerBlock(db.Model):
+    __tablename__ = "ledger_block"
+
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0-based; unique, so concurrent appends conflict
+    block_hash = db.Column(db.String(64), unique=True, nullable=False)
+    previous_hash = db.Column(db.String(64), nullable=False)
+    merkle_root = db.Column(db.String(64), nullable=False)
+    timestamp = db.Column(db.String(32), nullable=False)
+    data = db.Column(db.Text, nullable=False)
+
+class LedgerTransaction(db.Model):
+    __tablename__ = "ledger_transaction"
+
+    id = db.Column(db.Integer, primary_key=True)
+    cid = db.Column(db.String(255), nullable=False, index=True)
+    user_wallet = db.Column(db.String(255), nullable=False)
+    file_metadata = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.String(32), nullable=False)
+    block_position = db.Column(db.Integer, db.ForeignKey("ledger_block.position"), nullable=True, index=True)  # NULL while pending
+    leaf_index = db.Column(db.Integer, nullable=True)
+
+class ContentIndex(db.Model):
+    __tablename__ = "content_index"
+
+    sha256 = db.Column(db.String(64), primary_key=True)  # Digest of the uploaded bytes
+    cid = db.Column(db.String(255), nullable=False, index=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class ChainEvent(db.Model):
+    """A contract log copied from the chain by blockchain/indexer.py."""
+    __tablename__ = "chain_event"
+    __table_args__ = (db.UniqueConstraint("tx_hash", "log_index", name="uq_chain_event_tx_log"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(32), nullable=False)  # FileUploaded, FileRetrieved, BatchLogged
+    block_number = db.Column(db.BigInteger, nullable=False, index=True)
+    block_hash = db.Column(db.String(66), nullable=False)
+    tx_hash = db.Column(db.String(66), nullable=False)
+    log_index = db.Column(db.Integer, nullable=False)
+    user_wallet = db.Column(db.String(42), nullable=False, index=True)
+    file_hash = db.Column(db.String(255), nullable=True, index=True)
+    merkle_root = db.Column(db.String(64), nullable=True, index=True)
+    file_count = db.Column(db.Integer, nullable=True)
+    block_timestamp = db.Column(db.DateTime, nullable=False)  # From the event's timestamp argument (block.timestamp)
+
+class IndexerCheckpoint(db.Model):
+    __tablename__ = "indexer_checkpoint"
+
+    name = db.Column(db.String(64), primary_key=True)
+    block_number = db.Column(db.BigInteger, nullable=False)  # Last block fully indexed
+    block_hash = db.Column(db.String(66), nullable=False)  # Its hash, to detect reorgs
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class UploadSession(db.Model):
+    """A resumable upload: chunks arrive one PUT at a time, then finalize pins the assembled file."""
+    __tablename__ = "upload_session"
+
+    id = db.Column(db.String(32), primary_key=True)  # Random token
+    owner_wallet = db.Column(db.String(255), db.ForeignKey("users.wallet_address"), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=True)  # Whole-file digest promised by the client, checked at finalize
+    status = db.Column(db.String(20), nullable=False, default="open")  # open, finalizing, complete
+    file_id = db.Column(db.Integer, db.ForeignKey("file.id"), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)  # Last activity; idle sessions expire
+
+    file = db.relationship("File")
+    chunks = db.relationship("UploadChunk", cascade="all, delete-orphan", order_by="UploadChunk.position")
+
+class UploadChunk(db.Model):
+    __tablename__ = "upload_chunk"
+
+    session_id = db.Column(db.String(32), db.ForeignKey("upload_session.id"), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0-based chunk number
+    size = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    data = db.deferred(db.Column(db.LargeBinary, nullable=False))  # Loaded only when the file is assembled
+
+class PinJob(db.Model):
+    """Content whose CID was computed locally, waiting in pin_spool_chunk to be pinned (ipfs/pin_queue.py)."""
+    __tablename__ = "pin_job"
+
+    id = db.Column(db.Integer, primary_key=True)
+    cid = db.Column(db.String(255), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)  # pending, processing, pinned, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class PinSpoolChunk(db.Model):
+    """Bytes of content waiting to be pinned, split into rows; deleted once the pin succeeds."""
+    __tablename__ = "pin_spool_chunk"
+
+    cid = db.Column(db.String(255), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0-based chunk number
+    data = db.Column(db.LargeBinary, nullable=False)
+
+class SignerNonce(db.Model):
+    """Next nonce of each sending account, shared by every submitting process (blockchain/nonce.py)."""
+    __tablename__ = "signer_nonce"
+
+    address = db.Column(db.String(42), primary_key=True)
+    next_nonce = db.Column(db.BigInteger, nullable=False)
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import secrets
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, UploadSession, UploadChunk
+from streaming import CHUNK_SIZE
+
+# Resumable uploads. A client opens a session (POST /uploads), PUTs fixed-size chunks in
+# any order, each with its SHA-256, and calls finalize once every chunk is in. Chunk bytes
+# are stored in upload_chunk, only once their checksum matched, so every web dyno sees every
+# chunk: the PUTs and the finalize may each land on a different one. After a dropped
+# connection the client asks GET /uploads/<id> which chunks arrived and sends only the rest.
+# A failed finalize (Pinata, database) leaves the chunks in place to be finalized again.
+# Sessions idle for SESSION_TTL are removed by `flask prune-uploads`.
+CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+SESSION_TTL = timedelta(hours=float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24")))
+FINALIZE_TIMEOUT = timedelta(minutes=10)  # A finalize that has not finished by then is assumed to have crashed
+
+
+class UploadError(Exception):
+    """A resumable upload request that cannot be served; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def chunk_count(upload):
+    return (upload.total_size + upload.chunk_size - 1) // upload.chunk_size
+
+
+def expected_chunk_size(upload, position):
+    """Every chunk is chunk_size bytes except the last, which holds the remainder."""
+    if position == chunk_count(upload) - 1:
+        return upload.total_size - position * upload.chunk_size
+    return upload.chunk_size
+
+
+def create_session(owner_wallet, filename, content_type, total_size, sha256=None):
+    if not isinstance(total_size, int) or total_size < 0:
+        raise UploadError("size must be the file size in bytes")
+    if total_size > MAX_UPLOAD_BYTES:
+        raise UploadError(f"Files are limited to {MAX_UPLOAD_BYTES} bytes", 413)
+    upload = UploadSession(
+        id=secrets.token_hex(16),
+        owner_wallet=owner_wallet,
+        filename=filename,
+        content_type=content_type or "application/octet-stream",
+        total_size=total_size,
+        chunk_size=CHUNK_BYTES,
+        sha256=sha256.lower() if sha256 else None,
+    )
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+
+def get_session(upload_id, owner_wallet):
+    upload = db.session.get(UploadSession, upload_id)
+    # Someone else's session is reported as missing, not forbidden, so ids cannot be probed
+    if upload is None or upload.owner_wallet != owner_wallet:
+        raise UploadError("Upload session not found", 404)
+    if upload.status != "complete" and upload.updated_at < datetime.utcnow() - SESSION_TTL:
+        raise UploadError("Upload session expired", 410)
+    return upload
+
+
+def describe(upload):
+    return {
+        "upload_id": upload.id,
+        "filename": upload.filename,
+        "size": upload.total_size,
+        "chunk_size": upload.chunk_size,
+        "chunks": chunk_count(upload),
+        "received": [chunk.position for chunk in upload.chunks],
+        "status": upload.status,
+        "cid": upload.file.file_hash if upload.file else None,
+        "tx_status": upload.file.tx_status if upload.file else None,
+    }
+
+
+def store_chunk(upload, position, stream, claimed_sha256):
+    """Read one chunk from `stream` (at most chunk_size bytes are held in memory), check its size and
+    SHA-256 and store it. Re-sending a chunk replaces it."""
+    if upload.status != "open":
+        raise UploadError(f"Upload is {upload.status}", 409)
+    if not 0 <= position < chunk_count(upload):
+        raise UploadError(f"Chunk {position} is out of range (0..{chunk_count(upload) - 1})")
+    if not claimed_sha256:
+        raise UploadError("X-Chunk-SHA256 header is required")
+    expected = expected_chunk_size(upload, position)
+
+    digest = hashlib.sha256()
+    body = bytearray()
+    while len(body) <= expected:
+        data = stream.read(min(CHUNK_SIZE, expected + 1 - len(body)))
+        if not data:
+            break
+        digest.update(data)
+        body += data
+    size = len(body)
+    if size != expected:
+        raise UploadError(f"Chunk {position} must be {expected} bytes")
+    if digest.hexdigest() != claimed_sha256.lower():
+        raise UploadError(f"Chunk {position} does not match its checksum", 422)
+
+    chunk = db.session.get(UploadChunk, (upload.id, position))
+    if chunk is None:
+        db.session.add(UploadChunk(session_id=upload.id, position=position, size=size, sha256=digest.hexdigest(), data=bytes(body)))
+    else:
+        chunk.size, chunk.sha256, chunk.data = size, digest.hexdigest(), bytes(body)
+    upload.updated_at = datetime.utcnow()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # The same chunk arrived twice at once; the stored bytes are identical
+    return {"position": position, "size": size, "sha256": digest.hexdigest()}
+
+
+def claim(upload):
+    """Mark the session as finalizing; only one finalize may run at a time."""
+    now = datetime.utcnow()
+    claimed = (
+        UploadSession.query
+        .filter(UploadSession.id == upload.id)
+        .filter((UploadSession.status == "open")
+                | ((UploadSession.status == "finalizing") & (UploadSession.updated_at < now - FINALIZE_TIMEOUT)))
+        .update({UploadSession.status: "finalizing", UploadSession.updated_at: now}, synchronize_session=False)
+    )
+    db.session.commit()
+    db.session.refresh(upload)
+    if not claimed:
+        raise UploadError(f"Upload is {upload.status}", 409)
+
+
+def release(upload):
+    """Reopen a session whose finalize failed so it can be finalized again."""
+    db.session.rollback()
+    upload.status = "open"
+    upload.updated_at = datetime.utcnow()
+    db.session.commit()
+
+
+def assemble(upload):
+    """(file, sha256, size): the chunks concatenated into an anonymous temp file, rewound."""
+    received = {chunk.position: chunk for chunk in upload.chunks}
+    missing = [position for position in range(chunk_count(upload)) if position not in received]
+    if missing:
+        raise UploadError(f"Missing chunks: {missing[:20]}", 409)
+    digest = hashlib.sha256()
+    size = 0
+    assembled = tempfile.TemporaryFile()
+    try:
+        # One chunk in memory at a time
+        for position in range(chunk_count(upload)):
+            data = (
+                db.session.query(UploadChunk.data)
+                .filter_by(session_id=upload.id, position=position)
+                .scalar()
+            )
+            digest.update(data)
+            assembled.write(data)
+            size += len(data)
+        if size != upload.total_size:
+            raise UploadError("Assembled size does not match the declared size", 409)
+        if upload.sha256 and digest.hexdigest() != upload.sha256:
+            raise UploadError("Assembled file does not match its checksum", 422)
+    except BaseException:
+        assembled.close()
+        raise
+    assembled.seek(0)
+    return assembled, digest.hexdigest(), size
+
+
+def complete(upload, file):
+    upload.status = "complete"
+    upload.file = file
+    upload.updated_at = datetime.utcnow()
+    UploadChunk.query.filter_by(session_id=upload.id).delete(synchronize_session=False)
+    db.session.commit()
+    db.session.expire(upload, ["chunks"])
+
+
+def prune_expired(now=None):
+    """Delete sessions (and their chunks) idle for SESSION_TTL; returns how many were removed."""
+    cutoff = (now or datetime.utcnow()) - SESSION_TTL
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in expired:
+        db.session.delete(upload)
+    db.session.commit()
+    return len(expired)
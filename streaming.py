@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from werkzeug.sansio.multipart import MultipartDecoder, NEED_DATA, Data, Epilogue, File as FilePart
+
+# Size of each read from the client and each piece forwarded to the pinning service
+CHUNK_SIZE = 64 * 1024
+# Uploads held for hashing stay in memory up to this size, then roll over to an anonymous temp file
+SPOOL_MAX_MEMORY = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+
+
+class MultipartFileStream:
+    """Reads one file part straight off a multipart request stream, hashing it on the way."""
+
+    def __init__(self, stream, boundary, field_name="file", chunk_size=CHUNK_SIZE):
+        self._stream = stream
+        self._decoder = MultipartDecoder(boundary.encode("latin-1"))
+        self._eof = False
+        self._in_part = False
+        self.field_name = field_name
+        self.chunk_size = chunk_size
+        self.filename = None
+        self.content_type = "application/octet-stream"
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def _next_event(self):
+        while True:
+            event = self._decoder.next_event()
+            if event is NEED_DATA:
+                if self._eof:
+                    return None
+                data = self._stream.read(self.chunk_size)
+                if not data:
+                    self._eof = True
+                self._decoder.receive_data(data or None)
+                continue
+            if isinstance(event, Epilogue):
+                return None
+            return event
+
+    def open(self):
+        """Skip ahead to the file part and return its client-side filename (None if missing)."""
+        while True:
+            event = self._next_event()
+            if event is None:
+                return None
+            if isinstance(event, FilePart) and event.name == self.field_name:
+                self.filename = event.filename
+                self.content_type = event.headers.get("Content-Type", self.content_type)
+                self._in_part = True
+                return self.filename
+
+    def __iter__(self):
+        while self._in_part:
+            event = self._next_event()
+            if event is None:
+                raise ValueError("Upload ended before the file part was complete.")
+            if isinstance(event, Data):
+                if event.data:
+                    self._hash.update(event.data)
+                    self.size += len(event.data)
+                    yield event.data
+                if not event.more_data:
+                    self._in_part = False
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+
+class AsyncPartStream:
+    """Async counterpart of MultipartFileStream over an aiohttp multipart body part."""
+
+    def __init__(self, part, chunk_size=CHUNK_SIZE):
+        self._part = part
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    async def __aiter__(self):
+        while True:
+            chunk = await self._part.read_chunk(self.chunk_size)
+            if not chunk:
+                return
+            self._hash.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+
+def multipart_body(chunks, filename, content_type, boundary, field_name="file"):
+    """Wrap an iterable of chunks in a single-file multipart/form-data body."""
+    safe_name = filename.replace("\\", "\\\\").replace('"', '\\"')
+    yield (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field_name}"; filename="{safe_name}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    for chunk in chunks:
+        yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def spool(chunks, max_memory=SPOOL_MAX_MEMORY):
+    """Copy chunks into a rewound SpooledTemporaryFile; the caller closes it (nothing persists)."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    for chunk in chunks:
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def iter_file(f, chunk_size=CHUNK_SIZE):
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def amultipart_body(chunks, filename, content_type, boundary, field_name="file"):
+    """multipart_body for an async iterable of chunks."""
+    head, *_, tail = multipart_body([], filename, content_type, boundary, field_name)
+    yield head
+    async for chunk in chunks:
+        yield chunk
+    yield tail
+
+
+async def aiter_file(f, chunk_size=CHUNK_SIZE, executor=None):
+    """iter_file for the event loop: each read runs on `executor`, since a spool past SPOOL_MAX_MEMORY is on disk."""
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(executor, f.read, chunk_size)
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The app is a set of top-level modules run from the repository root, and models.py imports
+# app.py, so the environment it reads at import time is set up here first
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_scratch = tempfile.mkdtemp(prefix="secure-storage-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_scratch}/test.db",
+    INFURA_URL="http://127.0.0.1:9",  # Nothing may reach a chain; tests replace the senders
+    CONTENT_CACHE_DIR=os.path.join(_scratch, "cache"),
+    AUTH_USERS_DB=os.path.join(_scratch, "users.db"),
+    CHAIN_WORKER_INLINE="0",
+    PIN_WORKER_INLINE="0",
+)
+
+from app import app as flask_app, db  # noqa: E402  Loaded before models, as in production
+
+
+@pytest.fixture
+def app():
+    """The Flask app inside an app context, with empty tables."""
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    from models import User
+    db.session.add(User(first_name="Ada", last_name="Lovelace", wallet_address="0xabc", password_hash="x"))
+    db.session.commit()
+    return "0xabc"
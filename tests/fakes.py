@@ -0,0 +1,20 @@
+import io
+from ipfs.backends import StorageBackend
+from ipfs.unixfs import compute_cid, cid_of
+
+
+class FakeBackend(StorageBackend):
+    """Pins in memory and answers with the real CID, a wrong one, or `error`."""
+    name = "fake"
+
+    def __init__(self, wrong_cid=False, error=None):
+        self.pinned = []
+        self.wrong_cid = wrong_cid
+        self.error = error
+
+    def add(self, source, filename, content_type="application/octet-stream"):
+        if self.error:
+            raise Exception(self.error)
+        data = source.read()
+        self.pinned.append(data)
+        return cid_of(data + b"!") if self.wrong_cid else compute_cid(io.BytesIO(data))
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import aiohttp
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+import async_app
+from bench.fakes import FakePinata, fake_cid
+from content_cache import ContentCache
+from ipfs.backends import PinataBackend
+from models import File
+
+
+@pytest.fixture
+def pinata(app, user, tmp_path, monkeypatch):
+    """A fake Pinata (API and gateway) behind the async app, and an empty content cache."""
+    fake = FakePinata().start()
+    monkeypatch.setattr(async_app, "ipfs_backend", PinataBackend(fake.url, "key", "secret"))
+    monkeypatch.setattr(async_app, "PINATA_GATEWAY_URL", fake.url)
+    monkeypatch.setattr(async_app, "content_cache", ContentCache(str(tmp_path / "cache")))
+    yield fake
+    fake.stop()
+
+
+def session_cookie(app, user):
+    cookie = app.session_interface.get_signing_serializer(app).dumps({"user": user})
+    return {app.config["SESSION_COOKIE_NAME"]: cookie}
+
+
+def run(app, user, scenario):
+    """Run `scenario(client)` against the aiohttp app, logged in as `user` if given."""
+    async def main():
+        client = TestClient(TestServer(async_app.create_app()))
+        await client.start_server()
+        if user:
+            client.session.cookie_jar.update_cookies(session_cookie(app, user))
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+
+def form(data, filename="notes.txt"):
+    body = aiohttp.FormData()
+    body.add_field("file", data, filename=filename, content_type="text/plain")
+    return body
+
+
+def test_upload_is_pinned_and_recorded(app, user, pinata):
+    data = os.urandom(200000)
+
+    async def scenario(client):
+        for _ in range(2):
+            response = await client.post("/upload", data=form(data))
+            assert response.status == 200
+            assert fake_cid(data) in await response.text()
+
+    run(app, user, scenario)
+    assert pinata.pins == 1  # The second upload is found by its digest
+    assert [file.file_hash for file in File.query] == [fake_cid(data)] * 2
+
+
+def test_rejected_file_type_is_redirected(app, user, pinata):
+    async def scenario(client):
+        response = await client.post("/upload", data=form(b"x", "run.exe"), allow_redirects=False)
+        return response.status
+
+    assert run(app, user, scenario) == 302
+    assert pinata.pins == 0
+
+
+def test_download_is_proxied_then_cached(app, user, pinata):
+    data = os.urandom(5000)
+    cid = fake_cid(data)
+    pinata.objects[cid] = data
+
+    async def scenario(client):
+        response = await client.get(f"/download/{cid}", headers={"Range": "bytes=0-9"})
+        assert (response.status, await response.read()) == (206, data[:10])
+        response = await client.get(f"/download/{cid}")
+        assert (response.status, await response.read()) == (200, data)
+        del pinata.objects[cid]  # Now a cache hit
+        response = await client.get(f"/download/{cid}", headers={"Range": "bytes=100-199"})
+        assert (response.status, await response.read()) == (206, data[100:200])
+        response = await client.get(f"/download/{cid}", headers={"If-None-Match": f'"{cid}"'})
+        assert response.status == 304
+
+    run(app, user, scenario)
+
+
+def test_logged_out_requests_go_to_flask(app, pinata):
+    async def scenario(client):
+        response = await client.get("/download/QmSomething0000", allow_redirects=False)
+        assert response.status == 302 and "/login" in response.headers["Location"]
+        response = await client.get("/login")
+        assert response.status == 200
+
+    run(app, None, scenario)
+
+
+def test_readiness_reports_each_dependency(app, monkeypatch):
+    monkeypatch.setitem(async_app._chain, "checked_at", 0.0)
+
+    async def scenario(client):
+        response = await client.get("/readyz")
+        return await response.json()
+
+    body = run(app, None, scenario)
+    assert body["checks"]["database"]["ok"]
+    chain = body["checks"]["chain"]
+    assert (chain["ok"], chain["error"]) == (False, "unavailable")  # Nothing listens at INFURA_URL
+
+
+class Content:
+    """The parts of aiohttp's StreamReader the WSGI body reader uses."""
+
+    def __init__(self, data, piece=4):
+        self.data = data
+        self.piece = piece
+
+    async def read(self, size=-1):
+        size = len(self.data) if size < 0 else size
+        data, self.data = self.data[:size], self.data[size:]
+        return data
+
+    async def readany(self):
+        return await self.read(self.piece)
+
+    async def readline(self):
+        end = self.data.find(b"\n")
+        return await self.read(end + 1 if end >= 0 else -1)
+
+
+def test_body_reader_honours_readline_limits():
+    async def main():
+        loop = asyncio.get_running_loop()
+        reader = async_app._BodyReader(Content(b"first line\nsecond\nrest"), loop)
+
+        def read_all():
+            return [reader.readline(5), reader.readline(), reader.readline(100), reader.read(2), reader.read()]
+
+        return await loop.run_in_executor(None, read_all)
+
+    assert asyncio.run(main()) == [b"first", b" line\n", b"second\n", b"re", b"st"]
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime, timedelta
+from app import db
+from models import File, ChainJob, ChainBatch
+from blockchain import batcher, log_queue
+from blockchain.batcher import batch_leaf
+from blockchain.blockchain import SentTransaction
+from blockchain.merkle import MerkleTree
+
+
+def queue_files(owner, count):
+    files = []
+    for index in range(count):
+        file = File(file_hash=f"QmFile{index}", owner_wallet=owner)
+        db.session.add(file)
+        log_queue.enqueue_log(file)
+        files.append(file)
+    db.session.commit()
+    return files
+
+
+def test_batch_proofs_verify_against_its_root(user):
+    files = queue_files(user, 5)
+    batch = batcher.cut_batch(max_files=5)
+    assert (batch.file_count, batch.status) == (5, "pending")
+    for file in files:
+        assert file.tx_status == "batched" and file.batch_id == batch.id
+        leaf = batch_leaf(file.owner_wallet, file.file_hash)
+        assert MerkleTree.verify(leaf, json.loads(file.merkle_proof), batch.merkle_root)
+
+
+def test_small_batch_waits_for_the_window(user):
+    queue_files(user, 2)
+    assert batcher.cut_batch(max_files=5) is None
+    assert batcher.cut_batch(max_files=5, window=timedelta(0)).file_count == 2
+
+
+def test_submitted_batch_updates_every_file(user, monkeypatch):
+    sent = SentTransaction("0x" + "ab" * 32, "0xsigner", 4, 100, 2)
+    monkeypatch.setattr(batcher, "log_batch", lambda root, count: sent)
+    files = queue_files(user, 3)
+    batcher.cut_batch(max_files=3)
+    [batch] = batcher.claim_batches()
+    batcher.submit_batch(batch)
+    assert (batch.status, batch.nonce) == ("submitted", 4)
+    assert {job.status for job in ChainJob.query} == {"submitted"}
+    for file in files:
+        db.session.refresh(file)
+        assert (file.tx_status, file.tx_hash) == ("submitted", sent.tx_hash)
+
+
+def test_failed_batch_backs_off(user, monkeypatch):
+    def fail(root, count):
+        raise Exception("RPC down")
+    monkeypatch.setattr(batcher, "log_batch", fail)
+    queue_files(user, 3)
+    batcher.cut_batch(max_files=3)
+    [batch] = batcher.claim_batches()
+    batcher.submit_batch(batch)
+    assert (batch.status, batch.last_error) == ("pending", "RPC down")
+    assert batch.next_attempt_at > datetime.utcnow()
+    assert batcher.claim_batches() == []
+
+
+def test_batch_left_processing_by_a_crashed_worker_is_reclaimed(user):
+    queue_files(user, 3)
+    batcher.cut_batch(max_files=3)
+    [batch] = batcher.claim_batches()
+    assert batcher.claim_batches() == []  # Still owned by the first worker
+    batch.updated_at = datetime.utcnow() - batcher.PROCESSING_TIMEOUT - timedelta(seconds=1)
+    db.session.commit()
+    assert [reclaimed.id for reclaimed in batcher.claim_batches()] == [batch.id]
+    assert ChainBatch.query.one().attempts == 2
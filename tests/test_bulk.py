@@ -0,0 +1,128 @@
+import io
+import zipfile
+import pytest
+import bulk
+from ipfs import pin_queue
+from models import File, ChainJob, ContentIndex
+from ipfs.unixfs import cid_of
+
+
+def allowed(filename):
+    return filename.endswith((".txt", ".pdf"))
+
+
+class Pinner:
+    def __init__(self, fail=()):
+        self.pinned = []
+        self.fail = fail
+
+    def __call__(self, f, filename, content_type):
+        data = f.read()
+        if data in self.fail:
+            raise Exception("Pinata is down")
+        self.pinned.append(filename)
+        return cid_of(data)
+
+
+def zip_of(members):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    out.seek(0)
+    return out
+
+
+def ingest(user, sources, pin, **limits):
+    sources = [(name, io.BytesIO(data) if isinstance(data, bytes) else data) for name, data in sources]
+    return bulk.ingest(user, sources, pin, allowed, budget=bulk.Budget(**limits) if limits else None)
+
+
+def statuses(result):
+    return [(entry["filename"], entry["status"]) for entry in result["files"]]
+
+
+def test_manifest_pins_each_new_file_once(user):
+    pin = Pinner()
+    result = ingest(user, [("a.txt", b"one"), ("b.txt", b"two"), ("copy.txt", b"one"), ("evil.exe", b"x")], pin)
+    assert statuses(result) == [("a.txt", "pinned"), ("b.txt", "pinned"), ("copy.txt", "deduplicated"),
+                                ("evil.exe", "rejected")]
+    assert result["summary"] == {"pinned": 2, "deduplicated": 1, "rejected": 1}
+    assert sorted(pin.pinned) == ["a.txt", "b.txt"]
+    assert result["files"][2]["cid"] == cid_of(b"one")
+    assert File.query.count() == 3
+    assert ChainJob.query.count() == 2  # The copy reuses the first file's log
+    assert ContentIndex.query.count() == 2
+
+
+def test_known_content_is_not_pinned_again(user):
+    ingest(user, [("a.txt", b"one")], Pinner())
+    pin = Pinner()
+    result = ingest(user, [("again.txt", b"one")], pin)
+    assert statuses(result) == [("again.txt", "deduplicated")]
+    assert pin.pinned == []
+    assert ChainJob.query.count() == 1
+
+
+def test_queued_pins_are_not_indexed_yet(user, monkeypatch):
+    # With PIN_MODE=async the pin worker indexes each CID once its pin has succeeded
+    monkeypatch.setattr(pin_queue, "ASYNC", True)
+    result = ingest(user, [("a.txt", b"one")], Pinner())
+    assert statuses(result) == [("a.txt", "pinned")]
+    assert ContentIndex.query.count() == 0
+
+
+def test_failed_pin_fails_every_copy(user):
+    result = ingest(user, [("a.txt", b"bad"), ("b.txt", b"good"), ("copy.txt", b"bad")], Pinner(fail=[b"bad"]))
+    assert statuses(result) == [("a.txt", "failed"), ("b.txt", "pinned"), ("copy.txt", "failed")]
+    assert result["files"][2]["error"] == "Pinata is down"
+    assert [file.file_hash for file in File.query.all()] == [cid_of(b"good")]
+
+
+def test_archives_are_expanded(user):
+    archive = zip_of({"docs/a.txt": b"one", "docs/b.pdf": b"two", "docs/c.exe": b"three"})
+    result = ingest(user, [("docs.zip", archive), ("d.txt", b"four")], Pinner())
+    assert statuses(result) == [("a.txt", "pinned"), ("b.pdf", "pinned"), ("c.exe", "rejected"), ("d.txt", "pinned")]
+
+
+def test_file_limit_stops_the_batch(user):
+    result = ingest(user, [(f"{i}.txt", str(i).encode()) for i in range(5)], Pinner(), max_files=3)
+    assert statuses(result) == [("0.txt", "pinned"), ("1.txt", "pinned"), ("2.txt", "pinned"), (None, "rejected")]
+    assert "3 files" in result["files"][-1]["error"]
+    assert File.query.count() == 3
+
+
+def test_byte_limit_rejects_the_file_that_crosses_it(user):
+    result = ingest(user, [("a.txt", b"x" * 600), ("b.txt", b"y" * 600)], Pinner(), max_bytes=1000)
+    assert statuses(result) == [("a.txt", "pinned"), ("b.txt", "rejected")]
+    assert File.query.count() == 1
+
+
+def test_archive_member_over_the_limit_is_never_extracted(user, monkeypatch):
+    archive = zip_of({"small.txt": b"ok", "bomb.txt": b"\0" * 1_000_000})
+    opened = []
+    real_open = zipfile.ZipFile.open
+
+    def spy(self, info, *args, **kwargs):
+        opened.append(info.filename)
+        return real_open(self, info, *args, **kwargs)
+
+    monkeypatch.setattr(zipfile.ZipFile, "open", spy)
+    result = ingest(user, [("bundle.zip", archive)], Pinner(), max_bytes=10_000)
+    assert statuses(result) == [("small.txt", "pinned"), (None, "rejected")]
+    assert opened == ["small.txt"]
+
+
+@pytest.mark.parametrize("failing", [False, True])
+def test_spooled_bodies_are_closed(user, monkeypatch, failing):
+    bodies = []
+    real = bulk.spool_and_hash
+
+    def spy(f, budget):
+        body, digest, size = real(f, budget)
+        bodies.append(body)
+        return body, digest, size
+
+    monkeypatch.setattr(bulk, "spool_and_hash", spy)
+    ingest(user, [("a.txt", b"one"), ("b.txt", b"two")], Pinner(fail=[b"one"] if failing else ()))
+    assert bodies and all(body.closed for body in bodies)
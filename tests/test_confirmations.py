@@ -0,0 +1,109 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from app import db
+from models import File, ChainJob
+from blockchain import confirmations, log_queue
+from blockchain.blockchain import SentTransaction
+
+SIGNER = "0x" + "19" * 20
+
+
+def tx_hash(n):
+    return "0x" + f"{n:064x}"
+
+
+@pytest.fixture
+def node(app, monkeypatch):
+    """A fake node answering track_once's batched RPC calls, and a fake signer for fee bumps."""
+    node = SimpleNamespace(mined_nonce=0, receipts={}, sends=[], resyncs=[])
+
+    def rpc_batch(calls):
+        results = []
+        for method, params in calls:
+            if method == "eth_getTransactionCount":
+                results.append(hex(node.mined_nonce))
+            else:
+                results.append(node.receipts.get(params[0]))
+        return results
+
+    def send_contract_call(call, nonce=None, fees=None):
+        node.sends.append((nonce, fees))
+        return SentTransaction(tx_hash(100 + len(node.sends)), SIGNER, nonce, *fees)
+
+    monkeypatch.setattr(confirmations, "rpc_batch", rpc_batch)
+    monkeypatch.setattr(confirmations, "signer_address", lambda: SIGNER)
+    monkeypatch.setattr(confirmations, "send_contract_call", send_contract_call)
+    monkeypatch.setattr(confirmations, "contract_call_for", lambda row: None)
+    monkeypatch.setattr(confirmations, "fee_oracle", SimpleNamespace(fees=lambda: (100, 2)))
+    monkeypatch.setattr(confirmations, "nonce_manager", SimpleNamespace(resync=node.resyncs.append))
+    return node
+
+
+def submitted(user, monkeypatch, nonce=0):
+    monkeypatch.setattr(log_queue, "log_transaction", lambda file_hash: SentTransaction(tx_hash(nonce), SIGNER, nonce, 100, 2))
+    file = File(file_hash=f"QmFile{nonce}", owner_wallet=user)
+    db.session.add(file)
+    log_queue.enqueue_log(file)
+    db.session.commit()
+    log_queue.drain_once()
+    return ChainJob.query.filter_by(file_id=file.id).one()
+
+
+def receipt(hash, status=1, block=42):
+    return {"transactionHash": hash, "status": hex(status), "blockNumber": hex(block)}
+
+
+def test_mined_transaction_is_settled(user, node, monkeypatch):
+    job = submitted(user, monkeypatch)
+    assert confirmations.track_once() == 0  # Still pending
+    node.receipts[job.tx_hash] = receipt(job.tx_hash)
+    node.mined_nonce = 1
+    assert confirmations.track_once() == 1
+    assert (job.status, job.confirmed_block, job.file.tx_status) == ("confirmed", 42, "confirmed")
+    assert confirmations.track_once() == 0
+
+
+def test_reverted_transaction_fails(user, node, monkeypatch):
+    job = submitted(user, monkeypatch)
+    node.receipts[job.tx_hash] = receipt(job.tx_hash, status=0)
+    confirmations.track_once()
+    assert (job.status, job.last_error, job.file.tx_status) == ("failed", "Transaction reverted", "failed")
+
+
+def test_dropped_transaction_is_requeued(user, node, monkeypatch):
+    # Nonce 0 was mined, but no receipt exists for our hash: someone else's transaction used it
+    job = submitted(user, monkeypatch)
+    node.mined_nonce = 1
+    confirmations.track_once()
+    assert (job.status, job.tx_hash, job.nonce) == ("pending", None, None)
+    assert job.file.tx_status == "pending"
+    assert node.resyncs == [SIGNER]
+
+
+def test_stuck_transaction_is_replaced_with_higher_fees(user, node, monkeypatch):
+    job = submitted(user, monkeypatch)
+    first_hash = job.tx_hash
+    job.submitted_at = datetime.utcnow() - confirmations.STUCK_AFTER
+    db.session.commit()
+    confirmations.track_once()
+    assert node.sends == [(0, (125, 2))]  # Same nonce, max fee raised by BUMP_PERCENT
+    assert job.nonce == 0 and job.tx_hash != first_hash
+    assert json.loads(job.previous_tx_hashes) == [first_hash]
+    assert job.file.tx_hash == job.tx_hash
+
+    # The original transaction may still be the one that gets mined
+    node.receipts[first_hash] = receipt(first_hash)
+    node.mined_nonce = 1
+    assert confirmations.track_once() == 1
+    assert (job.status, job.tx_hash, job.file.tx_hash) == ("confirmed", first_hash, first_hash)
+
+
+def test_bumps_stop_at_the_limit(user, node, monkeypatch):
+    job = submitted(user, monkeypatch)
+    job.previous_tx_hashes = json.dumps([tx_hash(90 + n) for n in range(confirmations.MAX_BUMPS)])
+    job.submitted_at = datetime.utcnow() - confirmations.STUCK_AFTER
+    db.session.commit()
+    confirmations.track_once()
+    assert node.sends == []
@@ -0,0 +1,54 @@
+import io
+import os
+import time
+from content_cache import ContentCache
+
+
+def content_cache(tmp_path, **limits):
+    return ContentCache(str(tmp_path / "cache"), **limits)
+
+
+def test_memory_tier_hit(tmp_path):
+    cache = content_cache(tmp_path)
+    cache.put("QmSmall", b"hello", "text/plain")
+    source, size, content_type = cache.lookup("QmSmall")
+    assert isinstance(source, io.BytesIO) and source.read() == b"hello"
+    assert (size, content_type) == (5, "text/plain")
+    assert cache.read("QmSmall", 1, 3) == b"ell"
+
+
+def test_disk_tier_hit_and_slice(tmp_path):
+    cache = content_cache(tmp_path, max_memory_entry=4)
+    data = os.urandom(1000)
+    cache.put("QmLarge", data)
+    source, size, content_type = cache.lookup("QmLarge")
+    assert source == cache.path("QmLarge") and size == 1000
+    assert content_type == "application/octet-stream"
+    assert cache.read("QmLarge", 10, 20) == data[10:30]
+    assert cache.lookup("QmMissing") is None
+
+
+def test_partially_read_tee_is_not_cached(tmp_path):
+    cache = content_cache(tmp_path)
+    body = cache.tee("QmPartial", [b"a" * 10, b"b" * 10], expected_size=20)
+    next(body)
+    body.close()  # Client went away
+    assert cache.lookup("QmPartial") is None
+    assert not [name for _, _, names in os.walk(cache.directory) for name in names if name.endswith(".part")]
+
+
+def test_short_body_is_not_cached(tmp_path):
+    cache = content_cache(tmp_path)
+    assert b"".join(cache.tee("QmShort", [b"abc"], expected_size=10)) == b"abc"
+    assert cache.lookup("QmShort") is None
+
+
+def test_disk_eviction_drops_least_recently_used(tmp_path):
+    cache = content_cache(tmp_path, max_disk_bytes=2500, max_memory_bytes=0)
+    for index, cid in enumerate(["QmOne", "QmTwo"]):
+        cache.put(cid, os.urandom(1000))
+        os.utime(cache.path(cid), (time.time() - 1000 + index, time.time() - 1000 + index))
+    cache.lookup("QmOne")  # Bumps its mtime, so QmTwo is now the oldest
+    cache._disk_estimate = None  # Force a recount on the next write
+    cache.put("QmThree", os.urandom(1000))
+    assert [os.path.exists(cache.path(cid)) for cid in ("QmOne", "QmTwo", "QmThree")] == [True, False, True]
@@ -0,0 +1,68 @@
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+import database
+
+
+@pytest.fixture
+def routed(tmp_path):
+    """A separate app whose primary and replica are two SQLite files, each with a `note` table."""
+    app = Flask(__name__)
+    database.configure(app, f"sqlite:///{tmp_path}/primary.db", f"sqlite:///{tmp_path}/replica.db")
+    db = SQLAlchemy(app, session_options={"class_": database.RoutingSession})
+
+    class Note(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        body = db.Column(db.String(50))
+
+    with app.app_context():
+        for engine in db.engines.values():
+            db.metadata.create_all(engine)
+        with db.engines[database.REPLICA].begin() as conn:
+            conn.execute(text("INSERT INTO note (body) VALUES ('from the replica')"))
+        yield db, Note
+
+
+def bodies(Note):
+    return [note.body for note in Note.query.order_by(Note.id)]
+
+
+def test_selects_use_the_replica_only_inside_replica_reads(routed):
+    db, Note = routed
+    assert bodies(Note) == []
+    with database.replica_reads(db.session):
+        assert bodies(Note) == ["from the replica"]
+    assert bodies(Note) == []
+
+
+def test_writes_stay_on_the_primary(routed):
+    db, Note = routed
+    with database.replica_reads(db.session):
+        db.session.add(Note(body="written"))
+        db.session.commit()
+        db.session.execute(db.update(Note).values(body="updated"))
+        db.session.commit()
+    assert bodies(Note) == ["updated"]
+    with database.replica_reads(db.session):
+        assert bodies(Note) == ["from the replica"]
+
+
+def test_without_a_replica_reads_use_the_primary(tmp_path):
+    app = Flask(__name__)
+    database.configure(app, f"sqlite:///{tmp_path}/only.db")
+    db = SQLAlchemy(app, session_options={"class_": database.RoutingSession})
+    with app.app_context(), database.replica_reads(db.session):
+        assert db.session.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_database_url():
+    assert database.database_url("postgres://u:p@host/db") == "postgresql://u:p@host/db"
+    assert database.database_url("postgresql://u:p@host/db") == "postgresql://u:p@host/db"
+    assert database.database_url(None) is None
+
+
+def test_engine_options():
+    assert "pool_size" not in database.engine_options("sqlite:///x.db")
+    options = database.engine_options("postgresql://u:p@host/db")
+    assert (options["pool_size"], options["max_overflow"]) == (database.POOL_SIZE, database.MAX_OVERFLOW)
@@ -0,0 +1,64 @@
+import io
+import pytest
+from app import db
+from models import File, ContentIndex, PinJob
+from ipfs import pin_queue
+from ipfs.unixfs import cid_of
+from fakes import FakeBackend
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = FakeBackend()
+    monkeypatch.setattr("app.ipfs_backend", backend)
+    return backend
+
+
+@pytest.fixture
+def client(app, user, backend):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = user
+    return client
+
+
+def upload(client, data, filename="a.txt"):
+    response = client.post("/upload", data={"file": (io.BytesIO(data), filename)}, content_type="multipart/form-data")
+    assert response.status_code == 200
+    return response
+
+
+def test_second_upload_of_the_same_bytes_is_not_pinned(client, backend):
+    upload(client, b"same bytes")
+    upload(client, b"same bytes", "copy.txt")
+    assert backend.pinned == [b"same bytes"]
+    assert [file.file_hash for file in File.query] == [cid_of(b"same bytes")] * 2
+    assert ContentIndex.query.one().cid == cid_of(b"same bytes")
+
+
+def test_queued_pin_is_indexed_only_once_it_succeeds(client, monkeypatch):
+    monkeypatch.setattr(pin_queue, "ASYNC", True)
+    upload(client, b"queued")
+    assert ContentIndex.query.count() == 0
+
+    pin_queue.drain_pins(FakeBackend(error="Pinata is down"))
+    assert ContentIndex.query.count() == 0
+
+    job = PinJob.query.one()
+    job.next_attempt_at = job.created_at
+    db.session.commit()
+    pin_queue.drain_pins(FakeBackend())
+    assert ContentIndex.query.one().cid == cid_of(b"queued")
+
+
+def test_upload_after_a_failed_pin_queues_it_again(client, monkeypatch):
+    monkeypatch.setattr(pin_queue, "ASYNC", True)
+    monkeypatch.setattr(pin_queue, "MAX_ATTEMPTS", 1)
+    upload(client, b"unlucky")
+    pin_queue.drain_pins(FakeBackend(error="Pinata is down"))
+    assert PinJob.query.one().status == "failed"
+
+    upload(client, b"unlucky", "again.txt")
+    assert [job.status for job in PinJob.query.order_by(PinJob.id)] == ["failed", "pending"]
+    pin_queue.drain_pins(FakeBackend())
+    assert ContentIndex.query.one().cid == cid_of(b"unlucky")
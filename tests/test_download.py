@@ -0,0 +1,69 @@
+import pytest
+from bench.fakes import FakePinata
+from content_cache import ContentCache
+
+CID = "QmDownloadTest0000000000000000000000000000000"
+CONTENT = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def gateway(app, user, tmp_path, monkeypatch):
+    """A fake Pinata gateway holding CONTENT, and an empty content cache."""
+    pinata = FakePinata().start()
+    pinata.objects[CID] = CONTENT
+    monkeypatch.setattr("app.PINATA_GATEWAY_URL", pinata.url)
+    monkeypatch.setattr("app.content_cache", ContentCache(str(tmp_path / "cache")))
+    yield pinata
+    pinata.stop()
+
+
+@pytest.fixture
+def client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user"] = user
+    return client
+
+
+def test_full_download_is_cached(gateway, client):
+    response = client.get(f"/download/{CID}")
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.headers["ETag"] == f'"{CID}"'
+
+    del gateway.objects[CID]  # A cache hit must not go upstream
+    response = client.get(f"/download/{CID}")
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+
+def test_range_is_passed_through(gateway, client):
+    response = client.get(f"/download/{CID}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.data == CONTENT[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(CONTENT)}"
+
+
+def test_range_is_ignored_when_if_range_does_not_match(gateway, client):
+    response = client.get(f"/download/{CID}", headers={"Range": "bytes=10-19", "If-Range": '"QmSomethingElse000"'})
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+
+def test_matching_etag_is_not_modified(gateway, client):
+    response = client.get(f"/download/{CID}", headers={"If-None-Match": f'"{CID}"'})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_unknown_content_is_not_found(gateway, client):
+    assert client.get("/download/QmNotPinnedAnywhere000").status_code == 404
+
+
+def test_malformed_cid_is_not_found(gateway, client):
+    assert client.get("/download/not-a-cid").status_code == 404
+
+
+def test_login_required(gateway, app):
+    response = app.test_client().get(f"/download/{CID}")
+    assert response.status_code == 302
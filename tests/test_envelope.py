@@ -0,0 +1,94 @@
+import io
+import os
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from blockchain_system import SecureIPFSStorage, EnvelopeHeader, ENVELOPE_TAG_SIZE, ENVELOPE_MAGIC
+
+CHUNK = 1024
+
+
+@pytest.fixture(scope="module")
+def key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def storage():
+    return SecureIPFSStorage()
+
+
+def encrypt(storage, key, data):
+    return b"".join(storage.encrypt_stream([data[i:i + 700] for i in range(0, len(data), 700)] or [b""],
+                                           key.public_key(), chunk_size=CHUNK))
+
+
+def decrypt(storage, key, envelope, piece=333):
+    return b"".join(storage.decrypt_stream([envelope[i:i + piece] for i in range(0, len(envelope), piece)], key))
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK, CHUNK + 1, 5 * CHUNK + 17])
+def test_round_trip(storage, key, size):
+    data = os.urandom(size)
+    envelope = encrypt(storage, key, data)
+    assert envelope.startswith(ENVELOPE_MAGIC)
+    assert decrypt(storage, key, envelope) == data
+
+
+def header_size(envelope):
+    return EnvelopeHeader.parse(envelope).size
+
+
+def test_flipped_ciphertext_bit_fails(storage, key):
+    envelope = bytearray(encrypt(storage, key, os.urandom(4 * CHUNK + 10)))
+    envelope[header_size(envelope) + CHUNK + 5] ^= 1
+    with pytest.raises(ValueError, match="Chunk 0 failed authentication"):
+        decrypt(storage, key, bytes(envelope))
+
+
+def test_truncated_envelope_fails(storage, key):
+    # Dropping whole trailing chunks leaves a non-final chunk last
+    envelope = encrypt(storage, key, os.urandom(4 * CHUNK + 10))
+    with pytest.raises(ValueError):
+        decrypt(storage, key, envelope[:header_size(envelope) + 2 * (CHUNK + ENVELOPE_TAG_SIZE)])
+
+
+def test_reordered_chunks_fail(storage, key):
+    envelope = encrypt(storage, key, os.urandom(4 * CHUNK + 10))
+    start = header_size(envelope)
+    step = CHUNK + ENVELOPE_TAG_SIZE
+    first, second = envelope[start:start + step], envelope[start + step:start + 2 * step]
+    swapped = envelope[:start] + second + first + envelope[start + 2 * step:]
+    with pytest.raises(ValueError):
+        decrypt(storage, key, swapped)
+
+
+def test_chunk_from_another_file_fails(storage, key):
+    data = os.urandom(4 * CHUNK + 10)
+    one, other = encrypt(storage, key, data), encrypt(storage, key, data)
+    start = header_size(one)
+    spliced = one[:start] + other[start:start + CHUNK + ENVELOPE_TAG_SIZE] + one[start + CHUNK + ENVELOPE_TAG_SIZE:]
+    with pytest.raises(ValueError):
+        decrypt(storage, key, spliced)
+
+
+def test_tampered_header_fails(storage, key):
+    envelope = bytearray(encrypt(storage, key, os.urandom(2 * CHUNK)))
+    envelope[0] ^= 1
+    with pytest.raises(ValueError, match="Not an encrypted envelope"):
+        decrypt(storage, key, bytes(envelope))
+
+
+def test_wrong_key_fails(storage, key):
+    envelope = encrypt(storage, key, b"secret")
+    other = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with pytest.raises(ValueError):
+        decrypt(storage, other, envelope)
+
+
+def test_random_access_chunk(storage, key):
+    data = os.urandom(4 * CHUNK + 10)
+    envelope = io.BytesIO(encrypt(storage, key, data))
+    assert storage.read_chunk(envelope, 2, key) == data[2 * CHUNK:3 * CHUNK]
+    assert storage.read_chunk(envelope, 4, key) == data[4 * CHUNK:]
+    with pytest.raises(IndexError):
+        storage.read_chunk(envelope, 5, key)
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+from blockchain import fees
+from blockchain.fees import FeeOracle, length_class
+
+GWEI = 10 ** 9
+
+
+class Node:
+    def __init__(self, base_fee=10 * GWEI, tips=(2 * GWEI,)):
+        self.chain_id_reads = 0
+        self.fee_history_calls = 0
+        self.base_fee = base_fee
+        self.tips = tips
+
+    @property
+    def chain_id(self):
+        self.chain_id_reads += 1
+        return 43114
+
+    def fee_history(self, blocks, newest, percentiles):
+        self.fee_history_calls += 1
+        return {"baseFeePerGas": [1, self.base_fee], "reward": [[tip] for tip in self.tips]}
+
+
+def oracle(node):
+    # A long refresh interval keeps the background thread asleep for the whole test
+    return FeeOracle(lambda: SimpleNamespace(eth=node), refresh_interval=3600)
+
+
+class Call:
+    fn_name = "logTransaction"
+
+    def __init__(self, calldata):
+        self.calldata = calldata
+        self.estimates = 0
+
+    def _encode_transaction_data(self):
+        return "0x" + self.calldata.hex()
+
+    def estimate_gas(self, txn):
+        self.estimates += 1
+        return 50000
+
+
+def test_length_class():
+    assert [length_class(b"x" * n) for n in (0, 32, 33, 96, 100, 128, 129)] == [1, 1, 2, 4, 4, 4, 8]
+
+
+def test_chain_id_is_read_once():
+    node = Node()
+    fee_oracle = oracle(node)
+    assert fee_oracle.chain_id == fee_oracle.chain_id == 43114
+    assert node.chain_id_reads == 1
+
+
+def test_gas_is_estimated_once_per_size_class():
+    fee_oracle = oracle(Node())
+    first, same_size, longer = Call(b"a" * 100), Call(b"b" * 110), Call(b"c" * 200)
+    assert fee_oracle.gas_limit(first, "0xabc") == 50000 * fees.GAS_MARGIN_PERCENT // 100
+    fee_oracle.gas_limit(same_size, "0xabc")
+    fee_oracle.gas_limit(longer, "0xabc")
+    assert (first.estimates, same_size.estimates, longer.estimates) == (1, 0, 1)
+
+
+def test_fees_come_from_the_snapshot():
+    node = Node(base_fee=10 * GWEI, tips=(1 * GWEI, 3 * GWEI, 2 * GWEI))
+    fee_oracle = oracle(node)
+    assert fee_oracle.fees() == (22 * GWEI, 2 * GWEI)  # Twice the base fee plus the median tip
+    fee_oracle.fees()
+    assert node.fee_history_calls == 1
+
+
+def test_stale_snapshot_is_refreshed():
+    node = Node()
+    fee_oracle = oracle(node)
+    fee_oracle.fees()
+    fee_oracle._snapshot["updated_at"] -= fees.STALE_AFTER + 1
+    fee_oracle.fees()
+    assert node.fee_history_calls == 2
+
+
+def test_fee_bounds():
+    assert oracle(Node(tips=())).fees()[1] == fees.MIN_PRIORITY_FEE
+    assert oracle(Node(base_fee=10 ** 6 * GWEI)).fees()[0] == fees.MAX_FEE
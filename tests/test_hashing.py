@@ -0,0 +1,66 @@
+import threading
+import pytest
+from auth import hashing
+from auth.hashing import HashingService, HashingBusy
+
+FAST = "pbkdf2:sha256:1000"  # Cheap parameters keep the tests quick
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(hashing, "METHOD", FAST)
+    monkeypatch.setattr(hashing, "BCRYPT_ROUNDS", 4)
+    return HashingService(workers=2)
+
+
+def test_current_hash_is_kept(service):
+    stored = service.hash_password("secret")
+    assert stored.startswith(FAST)
+    assert service.verify_password(stored, "secret") == (True, None)
+    assert service.verify_password(stored, "wrong") == (False, None)
+
+
+def test_changed_method_rehashes_on_login(service, monkeypatch):
+    stored = service.hash_password("secret")
+    monkeypatch.setattr(hashing, "METHOD", "pbkdf2:sha256:2000")
+    matches, new_hash = service.verify_password(stored, "secret")
+    assert matches and new_hash.startswith("pbkdf2:sha256:2000$")
+    assert service.verify_password(new_hash, "secret") == (True, None)
+    assert service.verify_password(stored, "wrong") == (False, None)  # Never for a wrong password
+
+
+def test_legacy_bcrypt_hash_is_upgraded(service):
+    legacy = service.hash_bcrypt("secret").decode()
+    matches, new_hash = service.verify_password(legacy, "secret")
+    assert matches and new_hash.startswith(FAST)
+
+
+def test_changed_bcrypt_rounds_rehash_on_login(service, monkeypatch):
+    stored = service.hash_bcrypt("secret")
+    assert service.verify_bcrypt(stored, "secret") == (True, None)
+    monkeypatch.setattr(hashing, "BCRYPT_ROUNDS", 5)
+    matches, new_hash = service.verify_bcrypt(stored, "secret")
+    assert matches and new_hash.startswith(b"$2b$05$")
+
+
+def test_full_queue_is_busy(monkeypatch):
+    monkeypatch.setattr(hashing, "WAIT_TIMEOUT", 0.05)
+    service = HashingService(workers=1, max_pending=0)
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def hold():
+        started.release()
+        release.wait()
+
+    # With no room to queue, one call running on the worker fills every slot
+    caller = threading.Thread(target=service.run, args=(hold,))
+    caller.start()
+    started.acquire()
+    try:
+        with pytest.raises(HashingBusy):
+            service.run(len, "x")
+    finally:
+        release.set()
+        caller.join()
+    assert service.run(len, "x") == 1  # The slot is returned once the call finishes
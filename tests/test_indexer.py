@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+import pytest
+from eth_abi import encode
+from blockchain import indexer
+from blockchain.indexer import ChainIndexer, decode_log, TOPICS
+from models import ChainEvent
+
+TOPIC = {name: topic for topic, name in TOPICS.items()}
+WALLET = "0x" + "ab" * 20
+
+
+def uploaded(block, file_hash, log_index=0):
+    return {
+        "topics": [TOPIC["FileUploaded"], "0x" + "00" * 12 + WALLET[2:]],
+        "data": "0x" + encode(["string", "uint256"], [file_hash, 1700000000]).hex(),
+        "blockNumber": block,
+        "blockHash": f"0x{block:064x}",
+        "transactionHash": f"0x{block:062x}{log_index:02x}",
+        "logIndex": log_index,
+    }
+
+
+class Chain:
+    """Blocks 0..head with fake hashes, logs by block and a node-side eth_getLogs range limit."""
+
+    def __init__(self, head, logs=(), max_range=None):
+        self.block_number = head
+        self.hashes = {number: f"0x{number:064x}" for number in range(head + 1)}
+        self.logs = list(logs)
+        self.max_range = max_range
+        self.ranges = []
+
+    def get_block(self, number):
+        return {"hash": self.hashes[number]}
+
+    def get_logs(self, params):
+        start, end = params["fromBlock"], params["toBlock"]
+        if self.max_range and end - start + 1 > self.max_range:
+            raise ValueError({"message": "query returned more than 10000 results"})
+        self.ranges.append((start, end))
+        return [log for log in self.logs if start <= log["blockNumber"] <= end]
+
+
+@pytest.fixture
+def chain(app, monkeypatch):
+    chain = Chain(head=100)
+    monkeypatch.setattr(indexer, "get_w3", lambda: SimpleNamespace(eth=chain))
+    monkeypatch.setattr(indexer, "CONFIRMATIONS", 3)
+    monkeypatch.setattr(indexer, "START_BLOCK", 0)
+    monkeypatch.setattr(indexer, "REORG_DEPTH", 10)
+    return chain
+
+
+def test_decode_file_uploaded():
+    event = decode_log(uploaded(7, "QmHash"))
+    assert (event.event, event.file_hash, event.block_number) == ("FileUploaded", "QmHash", 7)
+    assert event.user_wallet.lower() == WALLET
+    assert event.block_timestamp.year == 2023
+
+
+def test_decode_batch_logged():
+    root = "cd" * 32
+    log = {
+        "topics": [TOPIC["BatchLogged"], "0x" + "00" * 12 + WALLET[2:], "0x" + root],
+        "data": "0x" + encode(["uint256", "uint256"], [12, 1700000000]).hex(),
+        "blockNumber": 3, "blockHash": "0x" + "11" * 32, "transactionHash": "0x" + "22" * 32, "logIndex": 1,
+    }
+    event = decode_log(log)
+    assert (event.event, event.merkle_root, event.file_count) == ("BatchLogged", root, 12)
+
+
+def test_unknown_topics_are_skipped():
+    assert decode_log({"topics": ["0x" + "00" * 32]}) is None
+    assert decode_log({"topics": []}) is None
+
+
+def test_indexes_up_to_the_safe_head(chain):
+    chain.logs = [uploaded(5, "QmFive"), uploaded(98, "QmTooNew")]
+    assert ChainIndexer().index_once() == 98  # Blocks 0..97 are 3 behind the head
+    assert [event.file_hash for event in ChainEvent.query] == ["QmFive"]
+    chain.block_number = 101
+    chain.hashes[101] = f"0x{101:064x}"
+    assert ChainIndexer().index_once() == 1
+    assert ChainIndexer().checkpoint().block_number == 98
+    assert ChainEvent.query.count() == 2
+
+
+def test_refused_ranges_are_halved(chain, monkeypatch):
+    monkeypatch.setattr(indexer, "RANGE_BLOCKS", 64)
+    chain.max_range = 20
+    chain.logs = [uploaded(number, f"Qm{number}") for number in (3, 40, 90)]
+    worker = ChainIndexer()
+    assert worker.index_once() == 98
+    assert all(end - start + 1 <= 20 for start, end in chain.ranges)
+    assert ChainEvent.query.count() == 3
+
+
+def test_reorg_rewinds_and_reindexes(chain):
+    chain.logs = [uploaded(80, "QmOld"), uploaded(95, "QmOrphaned")]
+    worker = ChainIndexer()
+    worker.index_once()
+    # Blocks from 90 on are replaced: the checkpointed block 97 has a new hash and the log moved
+    for number in range(90, 101):
+        chain.hashes[number] = f"0x{number + 1000:064x}"
+    chain.logs = [uploaded(80, "QmOld"), uploaded(96, "QmReplacement")]
+    worker.index_once()
+    assert sorted(event.file_hash for event in ChainEvent.query) == ["QmOld", "QmReplacement"]
+    assert worker.checkpoint().block_hash == chain.hashes[97]
@@ -0,0 +1,48 @@
+import copy
+from blockchain_system import Blockchain, EMPTY_MERKLE_ROOT
+
+
+def ledger_with(cids_per_block):
+    chain = Blockchain()
+    for cids in cids_per_block:
+        for cid in cids:
+            chain.add_transaction("0xabc", cid, "File stored in IPFS")
+        chain.create_block("block")
+    return chain
+
+
+def test_every_logged_cid_has_a_valid_proof():
+    chain = ledger_with([["Qm1", "Qm2", "Qm3"], ["Qm4"], [f"Qm{i}" for i in range(5, 22)]])
+    for i in range(1, 22):
+        proof = chain.prove(f"Qm{i}")
+        assert proof["transaction"]["cid"] == f"Qm{i}"
+        assert chain.verify(proof)
+    assert chain.prove("QmMissing") is None
+    assert chain.is_chain_valid(full=True)
+
+
+def test_tampered_proofs_fail():
+    chain = ledger_with([["Qm1", "Qm2", "Qm3"]])
+    proof = chain.prove("Qm2")
+
+    swapped = copy.deepcopy(proof)
+    swapped["transaction"]["user_wallet"] = "0xmallory"
+    assert not chain.verify(swapped)
+
+    other_cid = copy.deepcopy(proof)
+    other_cid["cid"] = "Qm1"
+    assert not chain.verify(other_cid)
+
+    wrong_block = dict(proof, block_hash="0" * 64)
+    assert not chain.verify(wrong_block)
+
+    missing_block = dict(proof, block_index=99)
+    assert not chain.verify(missing_block)
+
+
+def test_empty_block_and_tampering_are_detected():
+    chain = ledger_with([[], ["Qm1", "Qm2"]])
+    assert chain.get_block(1)["merkle_root"] == EMPTY_MERKLE_ROOT
+    assert chain.is_chain_valid()
+    chain.get_block(2)["transactions"][0]["cid"] = "QmForged"
+    assert not chain.is_chain_valid(full=True)
@@ -0,0 +1,89 @@
+import threading
+from datetime import datetime, timedelta
+import job_queue
+from app import db
+from models import File, ChainJob
+from blockchain import log_queue
+from blockchain.blockchain import SentTransaction
+
+SIGNER = "0x" + "19" * 20
+
+
+def queued_file(owner, cid="QmTest"):
+    file = File(file_hash=cid, owner_wallet=owner)
+    db.session.add(file)
+    log_queue.enqueue_log(file)
+    db.session.commit()
+    return file
+
+
+def sent(nonce=0):
+    return SentTransaction("0x" + f"{nonce:064x}", SIGNER, nonce, 100, 2)
+
+
+def test_submitted_job_updates_its_file(user, monkeypatch):
+    monkeypatch.setattr(log_queue, "log_transaction", lambda file_hash: sent(3))
+    file = queued_file(user)
+    assert log_queue.drain_once() == 1
+    job = ChainJob.query.one()
+    assert (job.status, job.sender, job.nonce) == ("submitted", SIGNER, 3)
+    assert (file.tx_status, file.tx_hash) == ("submitted", sent(3).tx_hash)
+    assert log_queue.drain_once() == 0
+
+
+def test_failed_job_backs_off_then_gives_up(user, monkeypatch):
+    def fail(file_hash):
+        raise Exception("RPC down")
+    monkeypatch.setattr(log_queue, "log_transaction", fail)
+    file = queued_file(user)
+
+    log_queue.drain_once()
+    job = ChainJob.query.one()
+    assert (job.status, job.attempts, job.last_error) == ("pending", 1, "RPC down")
+    assert job.next_attempt_at > datetime.utcnow()
+    assert log_queue.drain_once() == 0  # Not due yet
+
+    for _ in range(log_queue.MAX_ATTEMPTS - 1):
+        job.next_attempt_at = datetime.utcnow()
+        db.session.commit()
+        log_queue.drain_once()
+    assert job.status == "failed" and file.tx_status == "failed"
+
+
+def test_stale_processing_job_is_reclaimed(user):
+    queued_file(user)
+    [job] = log_queue.claim_jobs()
+    assert log_queue.claim_jobs() == []  # Still owned by the first worker
+    job.updated_at = datetime.utcnow() - log_queue.PROCESSING_TIMEOUT - timedelta(seconds=1)
+    db.session.commit()
+    assert [reclaimed.id for reclaimed in log_queue.claim_jobs()] == [job.id]
+    assert job.attempts == 2
+
+
+def test_worker_runs_after_round_until_stopped(app):
+    rounds = []
+    stop_event = threading.Event()
+
+    def drain():
+        rounds.append("drain")
+        if rounds.count("drain") == 3:
+            stop_event.set()
+        return 1
+
+    job_queue.run_worker(app, "Test worker", drain, 0, stop_event, after_round=lambda: rounds.append("after"))
+    assert rounds == ["drain", "after"] * 3
+
+
+def test_worker_survives_a_failed_round(app):
+    stop_event = threading.Event()
+    calls = []
+
+    def drain():
+        calls.append(1)
+        if len(calls) == 1:
+            raise Exception("database went away")
+        stop_event.set()
+        return 0
+
+    job_queue.run_worker(app, "Test worker", drain, 0, stop_event)
+    assert len(calls) == 2
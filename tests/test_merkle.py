@@ -0,0 +1,50 @@
+import pytest
+from blockchain.merkle import MerkleTree, hash_leaf, hash_node
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 5, 7, 8, 33])
+def test_every_leaf_proves_against_the_root(count):
+    leaves = [f"0xabc:Qm{i}" for i in range(count)]
+    tree = MerkleTree(leaves)
+    for index, leaf in enumerate(leaves):
+        proof = tree.proof(index)
+        assert len(proof) <= count.bit_length()
+        assert MerkleTree.verify(leaf, proof, tree.root)
+        assert MerkleTree.verify(leaf, proof, "0x" + tree.root_hex)
+
+
+def test_single_leaf_root_is_the_leaf_hash():
+    tree = MerkleTree([b"only"])
+    assert tree.root == hash_leaf(b"only")
+    assert tree.proof(0) == []
+
+
+def test_odd_leaf_is_carried_up():
+    tree = MerkleTree(["a", "b", "c"])
+    assert tree.root == hash_node(hash_node(hash_leaf("a"), hash_leaf("b")), hash_leaf("c"))
+    assert tree.proof(2) == [[hash_node(hash_leaf("a"), hash_leaf("b")).hex(), "L"]]
+
+
+def test_wrong_leaf_or_tampered_proof_fails():
+    leaves = ["a", "b", "c", "d", "e"]
+    tree = MerkleTree(leaves)
+    proof = tree.proof(1)
+    assert not MerkleTree.verify("x", proof, tree.root)
+    assert not MerkleTree.verify("a", proof, tree.root)  # Right sibling hashes, wrong position
+    flipped = [[sibling, "R" if side == "L" else "L"] for sibling, side in proof]
+    assert not MerkleTree.verify("b", flipped, tree.root)
+    assert not MerkleTree.verify("b", proof[:-1], tree.root)
+
+
+def test_an_inner_node_is_not_a_leaf():
+    # Domain separation: the two children of the root cannot be presented as a leaf
+    tree = MerkleTree(["a", "b"])
+    forged = hash_leaf("a") + hash_leaf("b")
+    assert not MerkleTree.verify(forged, [], tree.root)
+
+
+def test_bad_input():
+    with pytest.raises(ValueError):
+        MerkleTree([])
+    with pytest.raises(IndexError):
+        MerkleTree(["a"]).proof(1)
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+import metrics
+from metrics import Histogram, timed, registry
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def spans():
+    return {labels: histogram.count for (name, labels), histogram in registry.snapshot().items()
+            if name == "span_duration_seconds"}
+
+
+def test_timed_records_ok_and_error_outcomes():
+    with timed("work"):
+        pass
+
+    @timed("work")
+    def broken():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        broken()
+    assert spans() == {(("outcome", "ok"), ("span", "work")): 1, (("outcome", "error"), ("span", "work")): 1}
+
+
+def test_nested_and_concurrent_async_spans_pair_up():
+    @timed("outer")
+    async def outer(delay):
+        with timed("inner"):
+            await asyncio.sleep(delay)
+
+    async def main():
+        await asyncio.gather(outer(0.02), outer(0.0))
+
+    asyncio.run(main())
+    snapshot = registry.snapshot()
+    inner = snapshot[("span_duration_seconds", (("outcome", "ok"), ("span", "inner")))]
+    outer_ = snapshot[("span_duration_seconds", (("outcome", "ok"), ("span", "outer")))]
+    assert inner.count == outer_.count == 2
+    assert 0.02 <= outer_.sum < 1 and inner.sum <= outer_.sum
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.count == 5 and histogram.sum == 16.5
+    assert histogram.quantile(0.5) == pytest.approx(1.75)
+    assert histogram.quantile(0.99) == 4.0
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_metrics_endpoint_renders_prometheus_text(app):
+    client = app.test_client()
+    client.get("/healthz")
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    series = [line for line in text.splitlines() if line.startswith("http_request_duration_seconds_count")]
+    assert len(series) == 1 and 'route="/healthz"' in series[0] and 'status="200"' in series[0]
+    assert 'le="+Inf"} 1' in text
+
+
+def test_label_values_are_escaped():
+    registry.observe("span_duration_seconds", 0.1, span='say "hi"\n')
+    assert 'span="say \\"hi\\"\\n"' in registry.render()
+    assert metrics._escape("a\\b") == "a\\\\b"
@@ -0,0 +1,149 @@
+import threading
+from types import SimpleNamespace
+import pytest
+import requests
+from eth_account import Account
+from blockchain import blockchain
+from blockchain.nonce import NonceManager, is_nonce_error, is_transport_error
+
+PRIVATE_KEY = "0x" + "42" * 32
+SIGNER = Account.from_key(PRIVATE_KEY).address
+
+
+class Chain:
+    def __init__(self, counts):
+        self.counts = counts
+        self.calls = []
+
+    def __call__(self, address):
+        self.calls.append(address)
+        return self.counts[address]
+
+
+def test_allocates_sequentially_per_address_after_one_fetch(app):
+    chain = Chain({"0xa": 5, "0xb": 0})
+    nonces = NonceManager(chain)
+    assert [nonces.allocate("0xa") for _ in range(3)] == [5, 6, 7]
+    assert nonces.allocate("0xb") == 0
+    assert chain.calls == ["0xa", "0xb"]
+
+
+def test_processes_share_one_counter(app):
+    # Two managers stand in for two submitting processes sending from the same key
+    chain = Chain({"0xa": 5})
+    first, second = NonceManager(chain), NonceManager(chain)
+    assert [first.allocate("0xa"), second.allocate("0xa"), first.allocate("0xa")] == [5, 6, 7]
+    assert chain.calls == ["0xa"]
+
+
+def test_release_of_the_last_nonce_reuses_it(app):
+    nonces = NonceManager(Chain({"0xa": 5}))
+    nonce = nonces.allocate("0xa")
+    nonces.release("0xa", nonce)
+    assert nonces.allocate("0xa") == 5
+
+
+def test_release_behind_a_later_allocation_resyncs(app):
+    chain = Chain({"0xa": 5})
+    nonces = NonceManager(chain)
+    first = nonces.allocate("0xa")
+    nonces.allocate("0xa")
+    nonces.release("0xa", first)  # 6 is in flight, so 5 cannot simply be handed out again
+    chain.counts["0xa"] = 7
+    assert nonces.allocate("0xa") == 7
+    assert chain.calls == ["0xa", "0xa"]
+
+
+def test_resync_rereads_the_chain(app):
+    chain = Chain({"0xa": 5})
+    nonces = NonceManager(chain)
+    nonces.allocate("0xa")
+    chain.counts["0xa"] = 9
+    nonces.resync("0xa")
+    assert nonces.allocate("0xa") == 9
+
+
+def test_concurrent_allocations_never_share_a_nonce(app):
+    nonces = NonceManager(Chain({"0xa": 0}))
+    allocated = []
+    lock = threading.Lock()
+
+    def allocate():
+        with app.app_context():
+            for _ in range(50):
+                nonce = nonces.allocate("0xa")
+                with lock:
+                    allocated.append(nonce)
+
+    threads = [threading.Thread(target=allocate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(allocated) == list(range(200))
+
+
+def test_error_classification():
+    assert is_nonce_error(ValueError({"message": "nonce too low"}))
+    assert is_nonce_error(Exception("already known"))
+    assert is_nonce_error(Exception("replacement transaction underpriced"))
+    assert not is_nonce_error(Exception("insufficient funds for gas"))
+    assert is_transport_error(requests.exceptions.ReadTimeout())
+    assert is_transport_error(requests.exceptions.ConnectionError())
+    assert not is_transport_error(ValueError({"message": "insufficient funds for gas"}))
+
+
+@pytest.fixture
+def signer(app, monkeypatch):
+    """send_contract_call against a fake node; `sends` collects raw transactions, `fail` makes the next send raise."""
+    node = SimpleNamespace(sends=[], fail=None, counted=[], estimated=[])
+
+    def send_raw_transaction(raw):
+        if node.fail:
+            error, node.fail = node.fail, None
+            raise error
+        node.sends.append(raw)
+        return b"\x01" * 32
+
+    fake_w3 = SimpleNamespace(
+        eth=SimpleNamespace(account=Account, send_raw_transaction=send_raw_transaction),
+        to_hex=lambda value: "0x" + value.hex(),
+    )
+    monkeypatch.setattr(blockchain, "get_w3", lambda: fake_w3)
+    monkeypatch.setattr(blockchain, "PRIVATE_KEY", PRIVATE_KEY)
+    monkeypatch.setattr(blockchain, "_signer", None)
+    monkeypatch.setattr(blockchain, "nonce_manager", NonceManager(lambda address: node.counted.append(address) or 7))
+    monkeypatch.setattr(blockchain, "fee_oracle", SimpleNamespace(
+        chain_id=43114, fees=lambda: (100, 2), gas_limit=lambda call, sender: node.estimated.append(sender) or 60000,
+    ))
+    return node
+
+
+CALL = SimpleNamespace(build_transaction=lambda txn: dict(txn, to=blockchain.CONTRACT_ADDRESS, data="0x", value=0))
+
+
+def test_logs_are_sent_from_the_signer(signer):
+    # Regression: the tx must come from (and take its nonce from) the PRIVATE_KEY account,
+    # not the uploader's wallet, or signing fails and every job retries until it is failed
+    result = blockchain.send_contract_call(CALL)
+    assert (result.sender, result.nonce) == (SIGNER, 7)
+    assert signer.counted == signer.estimated == [SIGNER]
+    assert len(signer.sends) == 1
+
+
+def test_rejected_send_returns_its_nonce(signer):
+    signer.fail = ValueError({"message": "insufficient funds for gas"})
+    with pytest.raises(ValueError):
+        blockchain.send_contract_call(CALL)
+    assert blockchain.send_contract_call(CALL).nonce == 7
+    assert signer.counted == [SIGNER]
+
+
+def test_timed_out_send_does_not_reuse_its_nonce(signer):
+    # The node may have taken the transaction; the next nonce comes from its pending count
+    signer.fail = requests.exceptions.ReadTimeout("read timed out")
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        blockchain.send_contract_call(CALL)
+    assert signer.counted == [SIGNER]
+    blockchain.send_contract_call(CALL)
+    assert signer.counted == [SIGNER, SIGNER]
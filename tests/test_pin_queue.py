@@ -0,0 +1,62 @@
+import io
+import pytest
+from models import PinJob, PinSpoolChunk
+from ipfs import pin_queue
+from ipfs.backends import StorageBackend
+from ipfs.unixfs import cid_of
+from fakes import FakeBackend
+
+
+@pytest.fixture
+def spool(app, monkeypatch):
+    monkeypatch.setattr(pin_queue, "ASYNC", True)
+    monkeypatch.setattr(pin_queue, "SPOOL_CHUNK_SIZE", 1000)
+
+
+def test_backend_must_implement_add():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_enqueue_spools_to_the_database(spool):
+    data = bytes(range(256)) * 10
+    cid = pin_queue.enqueue_pin(io.BytesIO(data), "a.bin", None)
+    assert cid == cid_of(data)
+    assert PinSpoolChunk.query.count() == 3
+    source, size, content_type = pin_queue.lookup(cid)
+    body = open(source, "rb").read() if isinstance(source, str) else source.read()
+    assert (body, size, content_type) == (data, len(data), "application/octet-stream")
+
+
+def test_pinned_content_leaves_the_spool(spool):
+    data = b"x" * 2500
+    cid = pin_queue.enqueue_pin(io.BytesIO(data), "a.txt", "text/plain")
+    pin_queue.enqueue_pin(io.BytesIO(data), "copy.txt", "text/plain")  # Same content, spooled once
+    assert PinSpoolChunk.query.count() == 3
+    backend = FakeBackend()
+    assert pin_queue.drain_pins(backend) == 2
+    assert [job.status for job in PinJob.query.all()] == ["pinned", "pinned"]
+    assert backend.pinned == [data, data]
+    assert PinSpoolChunk.query.count() == 0
+    assert pin_queue.lookup(cid) is None
+
+
+def test_empty_file_spools_one_empty_row(spool):
+    cid = pin_queue.enqueue_pin(io.BytesIO(b""), "empty.txt", None)
+    assert [chunk.data for chunk in PinSpoolChunk.query.all()] == [b""]
+    pin_queue.drain_pins(FakeBackend())
+    assert PinJob.query.one().status == "pinned"
+    assert cid == cid_of(b"")
+
+
+def test_cid_mismatch_is_retried_and_keeps_the_spool(spool):
+    pin_queue.enqueue_pin(io.BytesIO(b"data"), "a.txt", None)
+    pin_queue.drain_pins(FakeBackend(wrong_cid=True))
+    job = PinJob.query.one()
+    assert job.status == "pending" and "expected" in job.last_error
+    assert PinSpoolChunk.query.count() == 1
+
+
+def test_spool_lookup_is_skipped_when_pinning_synchronously(app):
+    assert not pin_queue.ASYNC
+    assert pin_queue.lookup("QmAnything") is None
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import pytest
+import resumable
+from models import File, ChainJob, UploadChunk, UploadSession
+from ipfs.unixfs import cid_of
+from fakes import FakeBackend
+
+CHUNK = 1000
+
+
+@pytest.fixture
+def client(app, user, monkeypatch):
+    monkeypatch.setattr(resumable, "CHUNK_BYTES", CHUNK)
+    monkeypatch.setattr("app.ipfs_backend", FakeBackend())
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = user
+    return client
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def open_upload(client, data, **fields):
+    response = client.post("/uploads", json={"filename": "big.pdf", "size": len(data), **fields})
+    assert response.status_code == 201
+    return response.get_json()["upload_id"]
+
+
+def put(client, upload_id, position, data):
+    return client.put(f"/uploads/{upload_id}/chunks/{position}", data=data,
+                      headers={"X-Chunk-SHA256": sha256(data)})
+
+
+def put_all(client, upload_id, data, positions=None):
+    chunks = [data[i:i + CHUNK] for i in range(0, len(data), CHUNK)]
+    for position in positions if positions is not None else reversed(range(len(chunks))):
+        assert put(client, upload_id, position, chunks[position]).status_code == 200
+
+
+def test_finalize_assembles_chunks_in_order(client):
+    data = os.urandom(3 * CHUNK + 123)
+    upload_id = open_upload(client, data, sha256=sha256(data))
+    put_all(client, upload_id, data)
+    assert client.get(f"/uploads/{upload_id}").get_json()["received"] == [0, 1, 2, 3]
+
+    result = client.post(f"/uploads/{upload_id}/finalize").get_json()
+    assert (result["status"], result["cid"], result["tx_status"]) == ("complete", cid_of(data), "pending")
+    assert UploadChunk.query.count() == 0
+    assert ChainJob.query.count() == 1
+
+    # A retried finalize (its response was lost) reports the same file
+    assert client.post(f"/uploads/{upload_id}/finalize").get_json()["cid"] == cid_of(data)
+    assert File.query.count() == 1
+
+
+def test_missing_chunk_keeps_the_session_open(client):
+    data = os.urandom(3 * CHUNK)
+    upload_id = open_upload(client, data)
+    put_all(client, upload_id, data, positions=[0, 2])
+    response = client.post(f"/uploads/{upload_id}/finalize")
+    assert response.status_code == 409 and "[1]" in response.get_json()["error"]
+    assert UploadSession.query.one().status == "open"
+
+    put_all(client, upload_id, data, positions=[1])
+    assert client.post(f"/uploads/{upload_id}/finalize").get_json()["status"] == "complete"
+
+
+def test_bad_chunks_are_refused(client):
+    data = os.urandom(2 * CHUNK)
+    upload_id = open_upload(client, data)
+    response = client.put(f"/uploads/{upload_id}/chunks/0", data=data[:CHUNK], headers={"X-Chunk-SHA256": sha256(b"x")})
+    assert response.status_code == 422
+    assert put(client, upload_id, 0, data[:CHUNK - 1]).status_code == 400
+    assert put(client, upload_id, 0, data[:CHUNK + 1]).status_code == 400
+    assert put(client, upload_id, 2, data[:CHUNK]).status_code == 400
+    assert UploadChunk.query.count() == 0
+
+
+def test_whole_file_checksum_is_checked(client):
+    data = os.urandom(2 * CHUNK)
+    upload_id = open_upload(client, data, sha256=sha256(b"something else"))
+    put_all(client, upload_id, data)
+    assert client.post(f"/uploads/{upload_id}/finalize").status_code == 422
+    assert UploadSession.query.one().status == "open"
+
+
+def test_failed_pin_can_be_finalized_again(client, monkeypatch):
+    data = os.urandom(CHUNK + 1)
+    upload_id = open_upload(client, data)
+    put_all(client, upload_id, data)
+    monkeypatch.setattr("app.ipfs_backend", FakeBackend(error="Pinata is down"))
+    assert client.post(f"/uploads/{upload_id}/finalize").status_code == 502
+    assert UploadChunk.query.count() == 2
+
+    monkeypatch.setattr("app.ipfs_backend", FakeBackend())
+    assert client.post(f"/uploads/{upload_id}/finalize").get_json()["cid"] == cid_of(data)
+
+
+def test_sessions_are_private(client, app):
+    data = b"hello"
+    upload_id = open_upload(client, data)
+    other = app.test_client()
+    with other.session_transaction() as session:
+        session["user"] = "0xother"
+    assert other.get(f"/uploads/{upload_id}").status_code == 404
+    assert put(other, upload_id, 0, data).status_code == 404
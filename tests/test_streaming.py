@@ -0,0 +1,52 @@
+import hashlib
+import io
+import pytest
+from streaming import MultipartFileStream, multipart_body
+
+BOUNDARY = "test-boundary"
+
+
+def form(parts):
+    """multipart/form-data body for [(name, filename or None, content_type, data)]."""
+    body = b""
+    for name, filename, content_type, data in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n".encode()
+        if content_type:
+            body += f"Content-Type: {content_type}\r\n".encode()
+        body += b"\r\n" + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 64 * 1024])
+def test_reads_the_file_part(chunk_size):
+    data = bytes(range(256)) * 300 + b"\r\n--not-the-boundary\r\n"
+    body = form([("note", None, None, b"hello"), ("file", "a.pdf", "application/pdf", data)])
+    stream = MultipartFileStream(io.BytesIO(body), BOUNDARY, chunk_size=chunk_size)
+
+    assert stream.open() == "a.pdf"
+    assert stream.content_type == "application/pdf"
+    assert b"".join(stream) == data
+    assert stream.size == len(data)
+    assert stream.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_missing_file_part():
+    stream = MultipartFileStream(io.BytesIO(form([("note", None, None, b"hello")])), BOUNDARY)
+    assert stream.open() is None
+
+
+def test_truncated_upload():
+    body = form([("file", "a.txt", "text/plain", b"x" * 1000)])
+    stream = MultipartFileStream(io.BytesIO(body[:500]), BOUNDARY, chunk_size=100)
+    assert stream.open() == "a.txt"
+    with pytest.raises(ValueError):
+        b"".join(stream)
+
+
+def test_round_trip_through_multipart_body():
+    chunks = [b"first ", b"second"]
+    body = b"".join(multipart_body(chunks, 'we"ird.txt', "text/plain", BOUNDARY))
+    stream = MultipartFileStream(io.BytesIO(body), BOUNDARY)
+    assert stream.open() == 'we"ird.txt'
+    assert b"".join(stream) == b"first second"
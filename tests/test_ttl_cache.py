@@ -0,0 +1,60 @@
+from auth.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    cache = TTLCache(ttl=10, max_entries=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_is_dropped():
+    cache = TTLCache(ttl=60, max_entries=2, clock=Clock())
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_get_or_load_caches_hits_but_not_misses():
+    cache = TTLCache(ttl=60, max_entries=10, clock=Clock())
+    loads = []
+
+    def load(key):
+        loads.append(key)
+        return {"a": 1}.get(key)
+
+    assert cache.get_or_load("a", load) == 1
+    assert cache.get_or_load("a", load) == 1
+    assert cache.get_or_load("b", load) is None
+    assert cache.get_or_load("b", load) is None
+    assert loads == ["a", "b", "b"]
+
+
+def test_invalidation_during_a_load_discards_the_stale_value():
+    cache = TTLCache(ttl=60, max_entries=10, clock=Clock())
+
+    def slow_load(key):
+        cache.invalidate(key)  # A writer changed the user while this load was reading it
+        return "stale"
+
+    assert cache.get_or_load("a", slow_load) == "stale"
+    assert cache.get("a") is None
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = TTLCache(ttl=0, max_entries=10)
+    cache.put("a", 1)
+    assert cache.get("a") is None
@@ -0,0 +1,43 @@
+import hashlib
+import io
+from ipfs.unixfs import BLOCK_SIZE, compute_cid, cid_of, cid_string
+from ipfs.car import write_car, read_car
+from go_rand import random_bytes
+
+# CIDs from `ipfs add` with kubo's defaults. The 5 MiB file is kubo's own sharness vector
+# (`random 5242880 41`, t0040-add-and-cat.sh): 20 leaves under one branch node.
+HELLO_CID = "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"
+EMPTY_CID = "QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH"
+RANDOM_5MB_SHA1 = "5620fb92eb5a49c9986b5c6844efda37e471660e"
+RANDOM_5MB_CID = "QmSr7FqYkxYWGoSfy8ZiaMWQ5vosb18DQGCzjwEQnVHkTb"
+
+
+def random_5mb():
+    data = random_bytes(5242880, 41)
+    assert hashlib.sha1(data).hexdigest() == RANDOM_5MB_SHA1
+    return data
+
+
+def test_single_block_cids():
+    assert cid_of(b"hello world\n") == HELLO_CID
+    assert cid_of(b"") == EMPTY_CID
+
+
+def test_multi_block_cid_matches_kubo():
+    data = random_5mb()
+    assert len(data) > BLOCK_SIZE
+    assert compute_cid(io.BytesIO(data)) == RANDOM_5MB_CID
+    assert cid_of(data) == RANDOM_5MB_CID
+
+
+def test_car_round_trip():
+    data = random_5mb()
+    out = io.BytesIO()
+    assert write_car(iter([data[:100000], data[100000:]]), out) == RANDOM_5MB_CID
+    out.seek(0)
+    root, blocks = read_car(out)
+    assert cid_string(root) == RANDOM_5MB_CID
+    assert len(blocks) == 21  # 20 leaves and the root
+    for digest, block in blocks:
+        assert digest == b"\x12\x20" + hashlib.sha256(block).digest()
+    assert blocks[-1][0] == root
@@ -0,0 +1,49 @@
+import os
+from collections import namedtuple
+from models import db, User
+from auth.cache import TTLCache
+from database import replica_reads
+
+# Identity lookups by wallet address (login, registration, the CLI) go through a per-process
+# TTL cache, so a repeated login costs a dictionary lookup instead of a users query. Cached
+# values are plain tuples rather than ORM objects, which would be bound to the session that
+# loaded them. Anything that changes a user calls invalidate() or set_password_hash().
+TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # Seconds; 0 disables the cache
+MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+Identity = namedtuple("Identity", "id first_name last_name wallet_address password_hash")
+
+cache = TTLCache(TTL, MAX_ENTRIES)
+
+
+def _query(wallet_address):
+    row = (
+        db.session.query(User.id, User.first_name, User.last_name, User.wallet_address, User.password_hash)
+        .filter_by(wallet_address=wallet_address)
+        .first()
+    )
+    return Identity(*row) if row else None
+
+
+def _load(wallet_address):
+    # Read from the replica if there is one; a miss is checked on the primary, since a
+    # wallet that has only just registered may not have replicated yet
+    with replica_reads(db.session):
+        user = _query(wallet_address)
+    return user or _query(wallet_address)
+
+
+def find_user(wallet_address):
+    """Identity for `wallet_address`, or None if no such user is registered."""
+    return cache.get_or_load(wallet_address, _load)
+
+
+def invalidate(wallet_address):
+    cache.invalidate(wallet_address)
+
+
+def set_password_hash(wallet_address, password_hash):
+    """Store a new password hash (password change or rehash on login) and commit."""
+    User.query.filter_by(wallet_address=wallet_address).update({"password_hash": password_hash})
+    db.session.commit()
+    invalidate(wallet_address)